@@ -0,0 +1,88 @@
+"""Benchmark of per-request dependency injection overhead
+
+Compare the scoped bindings of AppBuilder.configure with unscoped bindings
+(new service instances for every request and every decorator-injected argument).
+Both are measured by resolving services directly, and by requests through the Flask test client.
+
+    python -m benchmarks.di_bench --number 20000
+"""
+import argparse
+import json
+import sys
+import time
+import timeit
+
+from flask import Flask
+from flask_injector import FlaskInjector
+from injector import Binder
+
+from controllers.apis import api
+from controllers.auth_controller import auth_endpoints
+from core.application import AppBuilder
+from core.initialize import AppInitializer, IAppInitializer
+from services.jwt_service import IJwtService, JwtService
+from services.simple_token_service import ISimpleTokenService, SimpleTokenService
+from services.weather_service import IWeatherService, WeatherService
+
+
+def unscoped(binder: Binder) -> None:
+    """Bindings without scope, as AppBuilder.configure used to bind stateless services
+    """
+
+    binder.bind(IAppInitializer, to=AppInitializer)
+    binder.bind(ISimpleTokenService, to=SimpleTokenService)
+    binder.bind(IJwtService, to=JwtService)
+    binder.bind(IWeatherService, to=WeatherService)
+    return
+
+
+def build_app(scoped: bool) -> Flask:
+    app = Flask(__name__)
+    app.register_blueprint(api)
+    app.register_blueprint(auth_endpoints)
+
+    modules = [AppBuilder.configure] if scoped else [AppBuilder.configure, unscoped]
+    AppBuilder.service = FlaskInjector(app=app, modules=modules)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=20000, help="count of resolutions and requests per case")
+    args = parser.parse_args()
+    number: int = args.number
+
+    # server settings are parsed from argv too
+    del sys.argv[1:]
+
+    results = {}
+    for name, scoped in [("unscoped", False), ("scoped", True)]:
+        app = build_app(scoped)
+        injector = AppBuilder.get_service().injector
+        client = app.test_client()
+
+        token = injector.get(IJwtService).create_token(username="admin")
+        headers = {"Authorization": token}
+
+        resolve_seconds = min(timeit.repeat(lambda: injector.get(IJwtService), number=number, repeat=5))
+
+        client.get("/api/weather/jwt", headers=headers)
+        started_at = time.perf_counter()
+        for _ in range(number // 10):
+            response = client.get("/api/weather/jwt", headers=headers)
+            assert response.status_code == 200
+        request_seconds = time.perf_counter() - started_at
+
+        results[name] = {
+            "resolve_usec": round(resolve_seconds / number * 1e6, 3),
+            "request_usec": round(request_seconds / (number // 10) * 1e6, 1),
+        }
+
+    print(json.dumps({"benchmark": "di", "results": results}, indent=2))
+
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Benchmark of a scanner-style flood with and without the fast reject middleware
+
+Request unknown paths (404, or the index of the catch-all route) and protected endpoints without `Authorization` header,
+cycling through the paths like a vulnerability scanner. Compare the app behind FastRejectMiddleware
+with the Flask app called directly (in process), and/or local servers with `FLASK_FAST_REJECT_ENABLED` true and false.
+Rate limiting is disabled, so every request reaches the app.
+
+    python -m benchmarks.fast_reject_bench --target client --number 5000
+    python -m benchmarks.fast_reject_bench --target server --duration 5 --threads 8 --output results.json
+
+Console logs of the in-process app (404 errors) are written to stdout too, so use --output to get clean JSON.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import sys
+import typing as t
+
+from werkzeug.test import Client
+
+from benchmarks.harness import LocalServer, environment, run_case
+from core.application import AppBuilder
+from core.setting import AppSettings
+
+
+# (method, path, expected status)
+UNKNOWN_PATHS = [
+    ("GET", "/.env", 200),
+    ("GET", "/wp-login.php", 200),
+    ("GET", "/admin/config.php", 200),
+    ("GET", "/api/v1/users", 404),
+    ("GET", "/api/.git/config", 404),
+    ("GET", "/api/weather/admin", 404),
+    ("GET", "/api/healthcheck/status", 404),
+    ("HEAD", "/api/swagger.json", 404),
+]
+
+MISSING_AUTH = [
+    ("GET", "/api/weather/jwt", 401),
+    ("GET", "/api/weather/sts", 401),
+    ("GET", "/api/weather/batch/jwt", 401),
+    ("POST", "/auth/introspect", 401),
+    ("POST", "/auth/revoke", 401),
+]
+
+CASES = {
+    "unknown_path": UNKNOWN_PATHS,
+    "missing_auth": MISSING_AUTH,
+    "scanner_mix": UNKNOWN_PATHS + MISSING_AUTH,
+}
+
+SETTINGS_ENV = {AppSettings.FLASK_RATE_LIMIT_ENABLED_KEY: "false"}
+
+
+def run_client(args: argparse.Namespace) -> t.Dict[str, t.Any]:
+    os.environ.update(SETTINGS_ENV)
+    os.environ[AppSettings.FLASK_FAST_REJECT_ENABLED_KEY] = "true"
+
+    from server import create_app
+
+    app = create_app()
+    # the Flask app behind the middleware
+    apps = {"fast_reject": app.wsgi_app, "flask": app.wsgi_app.wsgi_app}
+
+    results: t.Dict[str, t.Any] = {}
+    for (name, wsgi_app) in apps.items():
+        results[name] = {}
+        for (case_name, requests) in CASES.items():
+            def make_worker() -> t.Callable[[], bool]:
+                client = Client(wsgi_app)
+                cycle = itertools.cycle(requests)
+
+                def case() -> bool:
+                    (method, path, expected_status) = next(cycle)
+                    response = client.open(path, method=method)
+                    response.get_data()
+                    return response.status_code == expected_status
+
+                return case
+
+            results[name][case_name] = run_case(make_worker, threads=1, number=args.number, duration=args.duration)
+
+    AppBuilder.shutdown()
+
+    return results
+
+
+def run_server(args: argparse.Namespace) -> t.Dict[str, t.Any]:
+    server_args = ["-W", str(args.workers), "-T", str(args.server_threads)]
+
+    results: t.Dict[str, t.Any] = {}
+    for (name, enabled) in [("fast_reject", "true"), ("flask", "false")]:
+        env = {**SETTINGS_ENV, AppSettings.FLASK_FAST_REJECT_ENABLED_KEY: enabled}
+        with LocalServer(args.port, server_args, env=env) as server:
+            results[name] = {}
+            for (case_name, requests) in CASES.items():
+                def make_worker() -> t.Callable[[], bool]:
+                    connection = [server.connect()]
+                    cycle = itertools.cycle(requests)
+
+                    def case() -> bool:
+                        (method, path, expected_status) = next(cycle)
+                        try:
+                            connection[0].request(method, path)
+                            response = connection[0].getresponse()
+                            response.read()
+                        except (OSError, http.client.HTTPException):
+                            connection[0].close()
+                            connection[0] = server.connect()
+                            return False
+
+                        return response.status == expected_status
+
+                    return case
+
+                results[name][case_name] = run_case(make_worker, threads=args.threads, number=args.number, duration=args.duration)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=["client", "server", "all"], default="client", help="in process app, local server or both")
+    parser.add_argument("-n", "--number", type=int, default=None, help="count of requests per thread and case")
+    parser.add_argument("-d", "--duration", type=float, default=3.0, help="seconds per case (when --number is not set)")
+    parser.add_argument("-t", "--threads", type=int, default=8, help="count of client threads against the local server")
+    parser.add_argument("-p", "--port", type=int, default=5099, help="port of the local server")
+    parser.add_argument("-W", "--workers", type=int, default=2, help="worker processes of the local server")
+    parser.add_argument("-T", "--server-threads", type=int, default=4, help="threads per worker of the local server")
+    parser.add_argument("-o", "--output", type=str, default=None, help="file to write the results (default: stdout)")
+    args = parser.parse_args()
+
+    # server settings are parsed from argv too
+    del sys.argv[1:]
+
+    results: t.Dict[str, t.Any] = {"benchmark": "fast_reject", "environment": environment(), "options": vars(args), "results": {}}
+    if args.target in ["client", "all"]:
+        results["results"]["client"] = run_client(args)
+    if args.target in ["server", "all"]:
+        results["results"]["server"] = run_server(args)
+
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Common parts of benchmarks
+
+Run a case for a count of iterations or seconds, from one or more threads, and summarize
+throughput and latency percentiles as a JSON-serializable dict.
+"""
+import http.client
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import threading
+import time
+import typing as t
+
+
+ROOT_DIR_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_latencies: t.List[float], p: float) -> float:
+    """Percentile (nearest rank) in milliseconds
+    """
+
+    if len(sorted_latencies) == 0:
+        return 0.0
+
+    index = min(int(len(sorted_latencies) * p), len(sorted_latencies) - 1)
+    return round(sorted_latencies[index] * 1000, 4)
+
+
+def summarize(latencies: t.List[float], elapsed: float, errors: int = 0) -> t.Dict[str, t.Any]:
+    """Summary of a case
+
+    Args:
+        latencies (t.List[float]): seconds of each successful iteration
+        elapsed (float): wall clock seconds of the case
+        errors (int, optional): count of failed iterations. Defaults to 0.
+    """
+
+    latencies = sorted(latencies)
+
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "throughput_per_sec": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+        "p999_ms": percentile(latencies, 0.999),
+    }
+
+
+def run_case(
+        make_worker: t.Callable[[], t.Callable[[], bool]],
+        threads: int = 1,
+        number: t.Optional[int] = None,
+        duration: t.Optional[float] = None,
+        warmup: int = 10) -> t.Dict[str, t.Any]:
+    """Call a case repeatedly and measure every call
+
+    Args:
+        make_worker (t.Callable[[], t.Callable[[], bool]]): called once per thread, returns the case (True if it succeeded).
+            Per thread state (like a connection) is created here.
+        threads (int, optional): count of threads. Defaults to 1.
+        number (t.Optional[int], optional): count of calls per thread.
+        duration (t.Optional[float], optional): seconds to call (used when number is None).
+        warmup (int, optional): count of calls per thread before measurement. Defaults to 10.
+    """
+
+    if number is None and duration is None:
+        raise Exception("number or duration is required.")
+
+    latencies: t.List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    ready = threading.Barrier(threads + 1)
+
+    def run() -> None:
+        case = make_worker()
+        for _ in range(warmup):
+            case()
+
+        local_latencies = []
+        local_errors = 0
+        ready.wait()
+        deadline = time.perf_counter() + (duration or 0.0)
+
+        count = 0
+        while (count < number) if number is not None else (time.perf_counter() < deadline):
+            started_at = time.perf_counter()
+            try:
+                succeeded = case()
+            except Exception:
+                succeeded = False
+            if succeeded:
+                local_latencies.append(time.perf_counter() - started_at)
+            else:
+                local_errors += 1
+            count += 1
+
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+        return
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+
+    ready.wait()
+    started_at = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started_at
+
+    return summarize(latencies, elapsed, errors[0])
+
+
+def environment() -> t.Dict[str, t.Any]:
+    """Where the results were measured, to compare results between commits
+    """
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR_PATH, capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+class LocalServer:
+    """`server.py` started on a local port in a new process group
+
+        with LocalServer(port, ["-W", "2"]) as server:
+            connection = server.connect()
+    """
+
+    def __init__(self, port: int, args: t.Sequence[str] = (), env: t.Optional[t.Dict[str, str]] = None, timeout: float = 30.0) -> None:
+        self.port = port
+        self.args = list(args)
+        self.env = env
+        self.timeout = timeout
+        self.process: t.Optional[subprocess.Popen] = None
+        return
+
+    def __enter__(self) -> 'LocalServer':
+        self.process = subprocess.Popen(
+            [sys.executable, "server.py", "-P", str(self.port), *self.args],
+            cwd=ROOT_DIR_PATH,
+            env={**os.environ, **(self.env or {})},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True)
+
+        try:
+            self.wait_for_ready()
+        except Exception:
+            self.stop()
+            raise
+
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+        return
+
+    def connect(self, timeout: float = 10.0) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout)
+
+    def request(
+            self, method: str, path: str, body: t.Optional[t.Dict] = None,
+            headers: t.Optional[t.Dict[str, str]] = None) -> t.Tuple[int, bytes]:
+        """Send a request on a new connection
+
+        Returns:
+            t.Tuple[int, bytes]: (status, body)
+        """
+
+        connection = self.connect()
+        try:
+            request_headers = dict(headers or {})
+            encoded = None
+            if body is not None:
+                encoded = json.dumps(body)
+                request_headers["Content-Type"] = "application/json"
+            connection.request(method, path, body=encoded, headers=request_headers)
+            response = connection.getresponse()
+            return (response.status, response.read())
+        finally:
+            connection.close()
+
+    def wait_for_ready(self) -> None:
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            try:
+                (status, _) = self.request("GET", "/readyz")
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+
+        raise Exception(f"server is not started on port {self.port}")
+
+    def stop(self) -> None:
+        if self.process is None:
+            return
+
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self.process.wait(timeout=60)
+        self.process = None
+
+        return
+
+
+def http_case(server: LocalServer, method: str, path: str, headers: t.Optional[t.Dict[str, str]] = None,
+              body: t.Optional[bytes] = None, expected_status: int = 200) -> t.Callable[[], t.Callable[[], bool]]:
+    """Case factory of a request on a keep-alive connection per thread
+    """
+
+    def make_worker() -> t.Callable[[], bool]:
+        connection = [server.connect()]
+
+        def case() -> bool:
+            try:
+                connection[0].request(method, path, body=body, headers=headers or {})
+                response = connection[0].getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                connection[0].close()
+                connection[0] = server.connect()
+                return False
+
+            return response.status == expected_status
+
+        return case
+
+    return make_worker
@@ -0,0 +1,73 @@
+"""Benchmark of the batch token introspection endpoint (POST /auth/introspect)
+
+Send batches of distinct tokens through the Flask test client, and compare
+with verifying the same tokens one request at a time on /api/weather/jwt.
+
+    python -m benchmarks.introspect_bench --batch 1000 --repeat 5
+"""
+import argparse
+import json
+import sys
+import time
+
+from flask import Flask
+
+from core.application import AppBuilder
+from services.jwt_service import IJwtService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-b", "--batch", type=int, default=1000, help="count of tokens per introspection request")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="count of introspection requests")
+    args = parser.parse_args()
+    batch: int = args.batch
+    repeat: int = args.repeat
+
+    # server settings are parsed from argv too
+    del sys.argv[1:]
+
+    app = Flask(__name__)
+    service = AppBuilder.build(app=app).get_service()
+    client = app.test_client()
+
+    jwt_service = service.injector.get(IJwtService)
+    caller_token = jwt_service.create_token(username="gateway")
+
+    results = {}
+
+    # cold: every request carries tokens which have never been verified
+    elapsed = 0.0
+    for _ in range(repeat):
+        tokens = [jwt_service.create_token(username=f"user{i}") for i in range(batch)]
+        started_at = time.perf_counter()
+        response = client.post("/auth/introspect", headers={"Authorization": caller_token}, json={"tokens": tokens})
+        elapsed += time.perf_counter() - started_at
+        assert response.status_code == 200
+
+    results["introspect_cold"] = {"tokens_per_sec": round(batch * repeat / elapsed)}
+
+    # warm: the same tokens again, answered from the verified token cache
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        client.post("/auth/introspect", headers={"Authorization": caller_token}, json={"tokens": tokens})
+    elapsed = time.perf_counter() - started_at
+
+    results["introspect_warm"] = {"tokens_per_sec": round(batch * repeat / elapsed)}
+
+    # one request per token, for reference
+    tokens = [jwt_service.create_token(username=f"single{i}") for i in range(batch)]
+    started_at = time.perf_counter()
+    for token in tokens:
+        client.get("/api/weather/jwt", headers={"Authorization": token})
+    elapsed = time.perf_counter() - started_at
+
+    results["single_requests"] = {"tokens_per_sec": round(batch / elapsed)}
+
+    print(json.dumps({"benchmark": "introspect", "batch": batch, "repeat": repeat, "results": results}, indent=2))
+
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark of JSON responses
+
+Create the response of a weather data by `jsonify` of a built dict (as views did before)
+and by JsonProvider from the model (with json of the standard library, and with orjson if it's installed).
+Also compare encoding only, and the health check body by `jsonify` and pre-encoded.
+
+    python -m benchmarks.json_bench --number 100000
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime
+from flask import Flask, jsonify
+
+from controllers.healthcheck_controller import healthcheck
+from core.json_provider import HAS_ORJSON, JsonProvider, json_response, register_json_provider
+from models.weather import Weather
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=100000, help="count of responses per case")
+    args = parser.parse_args()
+    number: int = args.number
+
+    weather = Weather(temperature=24.5, forecast=Weather.SUNNY)
+    providers = {"stdlib": JsonProvider(use_orjson=False)}
+    if HAS_ORJSON:
+        providers["orjson"] = JsonProvider()
+
+    def jsonify_weather():
+        return jsonify({"temperature": weather.temperature, "forecast": weather.forecast})
+
+    def jsonify_health():
+        return jsonify({"health": "OK", "now": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+
+    app = Flask(__name__)
+    results = {}
+    with app.app_context():
+        cases = {
+            "weather_jsonify": jsonify_weather,
+            "health_jsonify": jsonify_health,
+            "health_pre_encoded": healthcheck,
+        }
+        for (name, provider) in providers.items():
+            cases[f"weather_provider_{name}"] = lambda provider=provider: provider.response(weather)
+            cases[f"encode_{name}"] = lambda provider=provider: provider.dumps(weather)
+        cases["encode_jsonify_dumps"] = lambda: app.json_encoder(separators=(",", ":")).encode(weather.to_dict())
+
+        for (name, case) in cases.items():
+            seconds = min(timeit.repeat(case, number=number, repeat=5))
+            results[name] = {"usec_per_response": round(seconds / number * 1e6, 3)}
+
+        # the registered provider as views use it
+        register_json_provider(app)
+        seconds = min(timeit.repeat(lambda: json_response(weather), number=number, repeat=5))
+        results["weather_json_response"] = {"usec_per_response": round(seconds / number * 1e6, 3)}
+
+    print(json.dumps({"benchmark": "json", "orjson": HAS_ORJSON, "results": results}, indent=2))
+
+    return
+
+
+if __name__ == "__main__":
+    main()
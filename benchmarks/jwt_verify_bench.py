@@ -0,0 +1,84 @@
+"""Micro benchmark of JwtService.verify_token
+
+Compare verification over the raw signing input with the previous path,
+which re-encoded the header and payload and keyed a new HMAC on every call.
+
+    python -m benchmarks.jwt_verify_bench --number 100000
+"""
+import argparse
+import base64
+import hmac
+import json
+import logging
+import os
+import tempfile
+import timeit
+from datetime import datetime
+from hashlib import sha256
+
+from core.metrics import AppMetrics
+from core.setting import AppSettings
+from repositories.revocation_repos import SqliteRevocationRepository
+from services.jwt_service import JwtService, JwtToken
+from services.key_ring import JwtKeyRing
+from services.revocation_service import RevocationService
+
+
+def legacy_verify_token(jwt_service: JwtService, app_settings: AppSettings, jwt_token: JwtToken) -> bool:
+    """verify_token as it was implemented before verifying the raw signing input
+    """
+
+    header_b64 = jwt_service.to_base64(jwt_token.header)
+    payload_b64 = jwt_service.to_base64(jwt_token.payload)
+    unsigned_token = f"{header_b64}.{payload_b64}"
+
+    secret_key = app_settings.jwt_secret.encode("utf-8")
+    signature_bytes = base64.urlsafe_b64encode(hmac.new(secret_key, unsigned_token.encode("utf-8"), sha256).digest())
+    signature = signature_bytes.decode("utf-8").rstrip("=")
+
+    if jwt_token.signature != signature:
+        return False
+
+    now = datetime.now()
+    return datetime.fromtimestamp(jwt_token.nbf) <= now <= datetime.fromtimestamp(jwt_token.exp)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=100000, help="count of verifications per case")
+    args = parser.parse_args()
+    number: int = args.number
+
+    # revoked tokens are stored in a temporary database (the check of a not revoked token is included in verification)
+    os.environ[AppSettings.FLASK_REVOCATION_DB_PATH_KEY] = os.path.join(tempfile.mkdtemp(), "revocation.sqlite")
+    app_settings = AppSettings().load_environment()
+    logger = logging.getLogger("benchmark")
+    revocations = RevocationService(logger=logger, app_settings=app_settings, repos=SqliteRevocationRepository(app_settings=app_settings))
+    jwt_service = JwtService(
+        logger=logger,
+        app_settings=app_settings,
+        key_ring=JwtKeyRing(logger=logger, app_settings=app_settings),
+        metrics=AppMetrics(app_settings=app_settings),
+        revocations=revocations)
+    jwt_token = jwt_service.decode_token(jwt_service.create_token(username="admin"))
+
+    cases = {
+        "legacy": lambda: legacy_verify_token(jwt_service, app_settings, jwt_token),
+        "signing_input": lambda: jwt_service.verify_token(jwt_token),
+    }
+
+    results = {}
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=number, repeat=5))
+        results[name] = {
+            "ops_per_sec": round(number / seconds),
+            "usec_per_op": round(seconds / number * 1e6, 3),
+        }
+
+    print(json.dumps({"benchmark": "jwt_verify", "number": number, "results": results}, indent=2))
+
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark of log formatters
+
+Format the same records by the `simple` formatter of logger.json and JsonFormatter
+(with orjson if it's installed, and with json of the standard library).
+Also compare a filtered out logging call with an f-string message and with lazy arguments.
+
+    python -m benchmarks.log_format_bench --number 100000
+"""
+import argparse
+import json
+import logging
+import timeit
+
+from core.logger import HAS_ORJSON, JsonFormatter
+
+
+def make_record(i: int) -> logging.LogRecord:
+    record = logging.LogRecord(
+        name="production",
+        level=logging.ERROR,
+        pathname="core/auth.py",
+        lineno=62,
+        msg="invalid token requested by username: '%s'",
+        args=(f"user{i}",),
+        exc_info=None)
+    record.auth_scheme = "simple"
+    record.user = f"user{i}"
+    record.auth_result = "invalid_password"
+
+    return record
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=100000, help="count of formatted records per case")
+    args = parser.parse_args()
+    number: int = args.number
+
+    records = [make_record(i) for i in range(1024)]
+    formatters = {
+        "simple": logging.Formatter("%(asctime)s %(filename)s:%(lineno)s [%(levelname)s]: %(message)s"),
+        "json_stdlib": JsonFormatter(use_orjson=False),
+    }
+    if HAS_ORJSON:
+        formatters["json_orjson"] = JsonFormatter()
+
+    results = {}
+    for name, formatter in formatters.items():
+        index = iter(range(number * 5))
+        seconds = min(timeit.repeat(lambda: formatter.format(records[next(index) % 1024]), number=number, repeat=5))
+        results[name] = {"usec_per_record": round(seconds / number * 1e6, 3)}
+
+    # DEBUG is filtered out, only the cost of the call and the message
+    logger = logging.getLogger("benchmark.filtered")
+    logger.setLevel(logging.ERROR)
+    values = {"kid": "secret", "sub": "admin", "claims": list(range(16))}
+    filtered = {
+        "fstring": lambda: logger.debug(f"jwt token is rejected. kid: {values['kid']}, sub: {values['sub']}, claims: {values['claims']}"),
+        "lazy": lambda: logger.debug("jwt token is rejected. kid: %s, sub: %s, claims: %s", values["kid"], values["sub"], values["claims"]),
+    }
+    for name, call in filtered.items():
+        seconds = min(timeit.repeat(call, number=number, repeat=5))
+        results[f"filtered_{name}"] = {"usec_per_call": round(seconds / number * 1e6, 3)}
+
+    print(json.dumps({"benchmark": "log_format", "results": results}, indent=2))
+
+    return
+
+
+if __name__ == "__main__":
+    main()
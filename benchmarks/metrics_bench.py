@@ -0,0 +1,67 @@
+"""Benchmark of request instrumentation
+
+Measure the cost of the metric updates done for every request
+(request counter, latency histogram and auth outcome counter), from 1 and more threads,
+and the cost of collecting metrics for /metrics.
+
+    python -m benchmarks.metrics_bench --number 200000 --threads 4
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import timeit
+
+from core.metrics import AppMetrics
+from core.setting import AppSettings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=200000, help="count of instrumented requests per case")
+    parser.add_argument("-t", "--threads", type=int, default=4, help="count of threads of concurrent case")
+    args = parser.parse_args()
+    number: int = args.number
+    threads: int = args.threads
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.environ[AppSettings.FLASK_METRICS_DIR_KEY] = temp_dir
+        metrics = AppMetrics(app_settings=AppSettings().load_environment())
+
+        def instrument() -> None:
+            metrics.requests.inc(("api.weather", "/api/weather/jwt", "GET", 200))
+            metrics.request_duration.observe(0.0042, ("api.weather", "/api/weather/jwt"))
+            metrics.auth_outcomes.inc(("jwt", "cached"))
+            return
+
+        results = {}
+
+        seconds = min(timeit.repeat(instrument, number=number, repeat=5))
+        results["single_thread"] = {"usec_per_request": round(seconds / number * 1e6, 3)}
+
+        def run() -> None:
+            for _ in range(number // threads):
+                instrument()
+            return
+
+        workers = [threading.Thread(target=run) for _ in range(threads)]
+        started_at = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started_at
+        results[f"{threads}_threads"] = {"usec_per_request": round(elapsed / (number // threads * threads) * 1e6, 3)}
+
+        seconds = min(timeit.repeat(metrics.collect, number=100, repeat=3))
+        results["collect"] = {"usec_per_scrape": round(seconds / 100 * 1e6, 1)}
+
+    print(json.dumps({"benchmark": "metrics", "results": results}, indent=2))
+
+    return
+
+
+if __name__ == "__main__":
+    main()
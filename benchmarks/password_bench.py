@@ -0,0 +1,87 @@
+"""Benchmark of password verification (logins/sec)
+
+Verify passwords from concurrent request threads through PasswordService,
+for each count of worker processes, and report logins/sec per core.
+The verified credential cache is measured separately.
+
+    python -m benchmarks.password_bench --workers 1,2,4 --logins 200
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.metrics import AppMetrics
+from core.setting import AppSettings
+from models.user import User
+from services.password_service import PasswordService, hash_password
+
+
+def run_logins(password_service: PasswordService, user: User, logins: int, threads: int) -> float:
+    """Verify the password `logins` times from `threads` threads
+
+    Returns:
+        float: elapsed seconds
+    """
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(lambda _: password_service.verify_password(user, "password"), range(logins)))
+    elapsed = time.perf_counter() - started_at
+
+    assert all(results)
+
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-w", "--workers", type=str, default=f"1,{os.cpu_count()}", help="comma separated counts of worker processes")
+    parser.add_argument("-l", "--logins", type=int, default=200, help="count of logins per case")
+    parser.add_argument("-t", "--threads", type=int, default=16, help="count of request threads")
+    args = parser.parse_args()
+    logins: int = args.logins
+    threads: int = args.threads
+
+    user = User(username="benchmark", password_hash=hash_password("password"))
+    logger = logging.getLogger("benchmark")
+    metrics = AppMetrics(app_settings=AppSettings().load_environment())
+
+    results = []
+    for workers in [int(workers) for workers in args.workers.split(",")]:
+        os.environ[AppSettings.FLASK_PASSWORD_WORKERS_KEY] = str(workers)
+        os.environ[AppSettings.FLASK_PASSWORD_QUEUE_SIZE_KEY] = str(threads)
+
+        # every login runs KDF
+        os.environ[AppSettings.FLASK_PASSWORD_CACHE_TTL_KEY] = "0"
+        password_service = PasswordService(logger=logger, app_settings=AppSettings().load_environment(), metrics=metrics)
+        password_service.verify_password(user, "password")  # start worker processes
+
+        elapsed = run_logins(password_service, user, logins, threads)
+        password_service.shutdown()
+
+        cores = max(workers, 1)
+        results.append({
+            "workers": workers,
+            "logins_per_sec": round(logins / elapsed, 1),
+            "logins_per_sec_per_core": round(logins / elapsed / cores, 1),
+        })
+
+    # the same credential again, answered by the verified credential cache
+    os.environ[AppSettings.FLASK_PASSWORD_CACHE_TTL_KEY] = "60"
+    password_service = PasswordService(logger=logger, app_settings=AppSettings().load_environment(), metrics=metrics)
+    password_service.verify_password(user, "password")
+    elapsed = run_logins(password_service, user, logins * 100, threads)
+    password_service.shutdown()
+
+    cached = {"logins_per_sec": round(logins * 100 / elapsed, 1)}
+
+    print(json.dumps({"benchmark": "password", "threads": threads, "results": results, "cached": cached}, indent=2))
+
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Throughput of the production server compared with the Flask development server
+
+Start `server.py --dev` and `server.py` (gunicorn) on a local port in turn,
+and request GET /api/healthcheck and GET /api/weather/jwt from concurrent clients.
+
+    python -m benchmarks.server_bench --clients 16 --duration 10
+"""
+import argparse
+import json
+import os
+
+from benchmarks.harness import LocalServer, http_case, run_case
+from core.setting import AppSettings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--clients", type=int, default=16, help="count of concurrent clients")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds per case")
+    parser.add_argument("-p", "--port", type=int, default=5099, help="port to start servers on")
+    parser.add_argument("-W", "--workers", type=int, default=os.cpu_count(), help="worker processes of production server")
+    parser.add_argument("-T", "--threads", type=int, default=4, help="threads per worker of production server")
+    args = parser.parse_args()
+
+    servers = {
+        "dev": ["--dev"],
+        "production": ["-W", str(args.workers), "-T", str(args.threads)],
+    }
+
+    results = {}
+    for name, server_args in servers.items():
+        with LocalServer(args.port, server_args, env={AppSettings.FLASK_RATE_LIMIT_ENABLED_KEY: "false"}) as server:
+            (_, body) = server.request("POST", "/auth/jwt", body={"username": "admin", "password": "admin"})
+            token = json.loads(body)["jwt"]
+
+            results[name] = {
+                "healthcheck": run_case(http_case(server, "GET", "/api/healthcheck"), threads=args.clients, duration=args.duration),
+                "weather_jwt": run_case(
+                    http_case(server, "GET", "/api/weather/jwt", headers={"Authorization": token}),
+                    threads=args.clients, duration=args.duration),
+            }
+
+    print(json.dumps({"benchmark": "server", "clients": args.clients, "results": results}, indent=2))
+
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Benchmark suite of the auth and weather endpoints
+
+Run every case against the Flask test client (in process) and/or a local server (`server.py` on gunicorn),
+and print throughput and p50/p99/p999 latency as JSON. Save the output of two commits and compare them.
+
+    python -m benchmarks.suite --target client --number 2000
+    python -m benchmarks.suite --target server --duration 5 --threads 8 --output results.json
+
+Console logs of the in-process app are written to stdout too, so use --output to get clean JSON.
+
+cases:
+    issue_jwt       POST /auth/jwt (the password is answered by the verified credential cache after the first login)
+    weather_jwt     GET /api/weather/jwt with a valid JWT
+    weather_sts     GET /api/weather/sts with a valid simple token
+    weather_batch   GET /api/weather/batch/jwt?count=100 (JSON array)
+    weather_stream  GET /api/weather/batch/jwt?count=10000&format=ndjson (streamed)
+    bad_jwt         GET /api/weather/jwt with a JWT of invalid signature (401 flood)
+    unknown_path    GET /api/<unknown> (404 flood)
+    decode_token    JwtService.decode_token (micro)
+    verify_token    JwtService.verify_token (micro)
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import typing as t
+
+from flask import Flask
+
+from benchmarks.harness import LocalServer, environment, http_case, run_case
+from core.application import AppBuilder
+from core.setting import AppSettings
+from services.jwt_service import IJwtService
+
+
+CREDENTIALS = {"username": "admin", "password": "admin"}
+SIMPLE_TOKEN = base64.b64encode(b"admin:admin").decode()
+# the cases flood the endpoints from one client address and user
+SETTINGS_ENV = {AppSettings.FLASK_RATE_LIMIT_ENABLED_KEY: "false"}
+
+
+def tamper(token: str) -> str:
+    """The same token with another signature
+    """
+
+    (signing_input, signature) = token.rsplit(".", 1)
+    return f"{signing_input}.{signature[::-1]}"
+
+
+def request_cases(token: str) -> t.Dict[str, t.Tuple[str, str, t.Dict[str, str], t.Optional[t.Dict], int]]:
+    """(method, path, headers, json body, expected status) by case name
+    """
+
+    return {
+        "issue_jwt": ("POST", "/auth/jwt", {}, CREDENTIALS, 200),
+        "weather_jwt": ("GET", "/api/weather/jwt", {"Authorization": token}, None, 200),
+        "weather_sts": ("GET", "/api/weather/sts", {"Authorization": SIMPLE_TOKEN}, None, 200),
+        "weather_batch": ("GET", "/api/weather/batch/jwt?count=100", {"Authorization": token}, None, 200),
+        "weather_stream": ("GET", "/api/weather/batch/jwt?count=10000&format=ndjson", {"Authorization": token}, None, 200),
+        "bad_jwt": ("GET", "/api/weather/jwt", {"Authorization": tamper(token)}, None, 401),
+        "unknown_path": ("GET", "/api/unknown/path", {}, None, 404),
+    }
+
+
+def run_client(args: argparse.Namespace) -> t.Dict[str, t.Any]:
+    os.environ.update(SETTINGS_ENV)
+    app = Flask(__name__)
+    service = AppBuilder.build(app=app).get_service()
+    jwt_service = service.injector.get(IJwtService)
+    token = jwt_service.create_token(username="admin")
+
+    results: t.Dict[str, t.Any] = {}
+    for (name, (method, path, headers, body, expected_status)) in request_cases(token).items():
+        if not selected(args, name):
+            continue
+
+        def make_worker() -> t.Callable[[], bool]:
+            client = app.test_client()
+
+            def case() -> bool:
+                response = client.open(path, method=method, headers=headers, json=body)
+                # streamed bodies are generated while they're read
+                response.get_data()
+                return response.status_code == expected_status
+
+            return case
+
+        results[name] = run_case(make_worker, threads=1, number=args.number, duration=args.duration)
+
+    jwt_token = jwt_service.decode_token(token)
+    micro_cases: t.Dict[str, t.Callable[[], bool]] = {
+        "decode_token": lambda: jwt_service.decode_token(token) is not None,
+        "verify_token": lambda: jwt_service.verify_token(jwt_token),
+    }
+    for (name, case) in micro_cases.items():
+        if selected(args, name):
+            results[name] = run_case(lambda: case, threads=1, number=args.number * 10 if args.number else None, duration=args.duration)
+
+    AppBuilder.shutdown()
+
+    return results
+
+
+def run_server(args: argparse.Namespace) -> t.Dict[str, t.Any]:
+    server_args = ["-W", str(args.workers), "-T", str(args.server_threads)]
+
+    results: t.Dict[str, t.Any] = {}
+    with LocalServer(args.port, server_args, env=SETTINGS_ENV) as server:
+        (_, body) = server.request("POST", "/auth/jwt", body=CREDENTIALS)
+        token = json.loads(body)["jwt"]
+
+        for (name, (method, path, headers, json_body, expected_status)) in request_cases(token).items():
+            if not selected(args, name):
+                continue
+
+            request_headers = dict(headers)
+            encoded = None
+            if json_body is not None:
+                encoded = json.dumps(json_body).encode("utf-8")
+                request_headers["Content-Type"] = "application/json"
+
+            make_worker = http_case(server, method, path, headers=request_headers, body=encoded, expected_status=expected_status)
+            results[name] = run_case(make_worker, threads=args.threads, number=args.number, duration=args.duration)
+
+    return results
+
+
+def selected(args: argparse.Namespace, name: str) -> bool:
+    return args.cases is None or name in args.cases.split(",")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=["client", "server", "all"], default="client", help="Flask test client, local server or both")
+    parser.add_argument("-c", "--cases", type=str, default=None, help="comma separated case names (default: all)")
+    parser.add_argument("-n", "--number", type=int, default=None, help="count of requests per thread and case")
+    parser.add_argument("-d", "--duration", type=float, default=3.0, help="seconds per case (when --number is not set)")
+    parser.add_argument("-t", "--threads", type=int, default=8, help="count of client threads against the local server")
+    parser.add_argument("-p", "--port", type=int, default=5099, help="port of the local server")
+    parser.add_argument("-W", "--workers", type=int, default=2, help="worker processes of the local server")
+    parser.add_argument("-T", "--server-threads", type=int, default=4, help="threads per worker of the local server")
+    parser.add_argument("-o", "--output", type=str, default=None, help="file to write the results (default: stdout)")
+    args = parser.parse_args()
+
+    # server settings are parsed from argv too
+    del sys.argv[1:]
+
+    results: t.Dict[str, t.Any] = {"benchmark": "suite", "environment": environment(), "options": vars(args), "results": {}}
+    if args.target in ["client", "all"]:
+        results["results"]["client"] = run_client(args)
+    if args.target in ["server", "all"]:
+        results["results"]["server"] = run_server(args)
+
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark of user lookup by username
+
+Compare IndexedUserRepository with the linear scan the built-in repository used to do,
+from 10 to 1M users. The linear scan is measured up to --linear-max users.
+
+    python -m benchmarks.user_lookup_bench --sizes 10,1000,100000,1000000
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import tempfile
+import timeit
+
+from core.setting import AppSettings
+from repositories.user_repos import IndexedUserRepository, UserChangeNotifier
+
+
+def write_users(path: str, size: int) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["username", "password_hash"])
+        writer.writerows((f"user{i}", f"password{i}") for i in range(size))
+
+    return
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--sizes", type=str, default="10,1000,100000,1000000", help="comma separated user counts")
+    parser.add_argument("-n", "--number", type=int, default=100000, help="count of lookups per size")
+    parser.add_argument("--linear-max", type=int, default=10000, help="max user count to measure the linear scan")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    number: int = args.number
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in sizes:
+            path = os.path.join(temp_dir, f"users_{size}.csv")
+            write_users(path, size)
+
+            os.environ[AppSettings.FLASK_USER_STORE_FILE_KEY] = path
+            os.environ[AppSettings.FLASK_USER_STORE_RELOAD_INTERVAL_KEY] = "0"
+            repos = IndexedUserRepository(
+                logger=logging.getLogger("benchmark"),
+                app_settings=AppSettings().load_environment(),
+                notifier=UserChangeNotifier())
+
+            usernames = [f"user{random.randrange(size)}" for _ in range(1024)]
+            lookups = iter(usernames * (number // len(usernames) + 1))
+
+            seconds = min(timeit.repeat(lambda: repos.get_first_user(next(lookups)), number=number // 5, repeat=5))
+            result = {"users": size, "indexed_usec_per_lookup": round(seconds / (number // 5) * 1e6, 3)}
+
+            if size <= args.linear_max:
+                users = list(IndexedUserRepository.load_users(path).values())
+
+                def linear_scan(username: str):
+                    for user in users:
+                        if username == user.username:
+                            return user
+                    return None
+
+                linear_number = max(number // size, 10)
+                seconds = min(timeit.repeat(lambda: linear_scan(random.choice(usernames)), number=linear_number, repeat=3))
+                result["linear_usec_per_lookup"] = round(seconds / linear_number * 1e6, 3)
+                pass
+
+            results.append(result)
+
+    print(json.dumps({"benchmark": "user_lookup", "results": results}, indent=2))
+
+    return
+
+
+if __name__ == "__main__":
+    main()
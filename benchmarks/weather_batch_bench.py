@@ -0,0 +1,86 @@
+"""Benchmark of weather generation for large batches
+
+Generate `count` weather datas and encode them to NDJSON:
+
+    loop            WeatherService.iter_weathers (a Weather object per data) and json.dumps per data
+    batch_stdlib    WeatherGenerator with random.Random into array.array, encoded by WeatherBatch
+    batch_numpy     WeatherGenerator with numpy (when it's installed)
+
+Datas are generated in batches of --batch-size like the streamed endpoint, so memory doesn't grow with the count.
+
+    python -m benchmarks.weather_batch_bench --counts 10000,100000,1000000
+    python -m benchmarks.weather_batch_bench --counts 10000000 --cases batch_stdlib,batch_numpy
+"""
+import argparse
+import json
+import time
+import typing as t
+
+from models.weather import HAS_NUMPY, WeatherGenerator
+from services.weather_service import WeatherService
+
+
+def loop_case(count: int, batch_size: int) -> int:
+    size = 0
+    lines: t.List[str] = []
+    for weather in WeatherService().iter_weathers(count):
+        lines.append(json.dumps({"temperature": weather.temperature, "forecast": weather.forecast}))
+        if len(lines) >= batch_size:
+            size += len("\n".join(lines)) + 1
+            lines = []
+
+    if len(lines) > 0:
+        size += len("\n".join(lines)) + 1
+
+    return size
+
+
+def batch_case(use_numpy: bool) -> t.Callable[[int, int], int]:
+    def case(count: int, batch_size: int) -> int:
+        generator = WeatherGenerator(seed=0, use_numpy=use_numpy)
+        size = 0
+        for start in range(0, count, batch_size):
+            size += len(generator.generate(min(batch_size, count - start)).to_ndjson())
+        return size
+
+    return case
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--counts", type=str, default="10000,100000,1000000", help="comma separated counts of datas")
+    parser.add_argument("--cases", type=str, default=None, help="comma separated case names (default: all)")
+    parser.add_argument("--batch-size", type=int, default=1024, help="count of datas per batch")
+    args = parser.parse_args()
+
+    cases: t.Dict[str, t.Callable[[int, int], int]] = {
+        "loop": loop_case,
+        "batch_stdlib": batch_case(use_numpy=False),
+    }
+    if HAS_NUMPY:
+        cases["batch_numpy"] = batch_case(use_numpy=True)
+
+    names = args.cases.split(",") if args.cases else list(cases.keys())
+
+    results: t.Dict[str, t.Dict[str, t.Any]] = {}
+    for count in [int(count) for count in args.counts.split(",")]:
+        for name in names:
+            if name not in cases:
+                continue
+
+            started_at = time.perf_counter()
+            size = cases[name](count, args.batch_size)
+            seconds = time.perf_counter() - started_at
+            results.setdefault(str(count), {})[name] = {
+                "seconds": round(seconds, 4),
+                "items_per_sec": round(count / seconds),
+                "bytes": size,
+            }
+
+    print(json.dumps({"benchmark": "weather_batch", "numpy": HAS_NUMPY, "batch_size": args.batch_size, "results": results}, indent=2))
+
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 from flask import Blueprint, Response
 from logging import Logger
 
+from core.fast_reject import constant_response
+
 from controllers.healthcheck_controller import healthcheck_api
 from controllers.weather_controller import weather_api
 
@@ -9,9 +11,9 @@ api = Blueprint("api", __name__, url_prefix="/api")
 
 @api.route("/", defaults={"path": "/"}, strict_slashes=False)
 @api.route("/<path:path>")
+@constant_response(status=404)
 def error_404(path: str, logger: Logger) -> Response:
-    log = "path: '/{0}/{1}' is 404 not found.".format(api.name, path.lstrip("/"))
-    logger.error(log)
+    logger.error("path: '/%s/%s' is 404 not found.", api.name, path.lstrip("/"))
     return Response(status=404)
 
 
@@ -1,32 +1,198 @@
-from flask import Blueprint, request, Response, jsonify
+from flask import Blueprint, request, Response
 from logging import Logger
 
+from core import auth, profiler
+from core.access_log import set_auth_context, set_auth_outcome
+from core.json_provider import json_response, raw_json_response
+from core.setting import AppSettings
 from repositories.user_repos import IUserRepository
-from services.jwt_service import IJwtService
+from services.jwt_service import IJwtService, JwtService, JwtTokenCache
+from services.password_service import IPasswordService, PasswordServiceBusyError
+from services.refresh_token_service import IRefreshTokenService
+from services.revocation_service import IRevocationService
 
 auth_endpoints = Blueprint("auth", __name__, url_prefix="/auth")
 
+REVOKED_BODY = b'{"revoked":true}'
+
 
 @auth_endpoints.route("/jwt", methods=["POST"])
-def authenticate_jwt(logger: Logger, user_repos: IUserRepository, jwt_service: IJwtService):
-    if "username" not in request.json or "password" not in request.json:
+def authenticate_jwt(
+        logger: Logger,
+        app_settings: AppSettings,
+        user_repos: IUserRepository,
+        jwt_service: IJwtService,
+        password_service: IPasswordService,
+        refresh_token_service: IRefreshTokenService):
+    if not isinstance(request.json, dict) or "username" not in request.json or "password" not in request.json:
         return Response(status=400)
 
     username: str = request.json["username"]
     password: str = request.json["password"]
+    # the username is a key of user lookups
+    if not isinstance(username, str):
+        return Response(status=400)
+
+    set_auth_context("password", username)
+
+    with profiler.span("user_lookup"):
+        user = user_repos.get_first_user(username)
+    if user is None:
+        set_auth_outcome("unknown_user")
+        return Response(status=400)
+
+    try:
+        with profiler.span("auth_verify"):
+            verified = password_service.verify_password(user, password)
+    except PasswordServiceBusyError:
+        set_auth_outcome("busy")
+        return Response(status=503, headers={"Retry-After": "1"})
 
-    user = user_repos.get_first_user(username)
-    if user is None or user.password != password:
+    if not verified:
+        set_auth_outcome("invalid_password")
         return Response(status=400)
 
+    set_auth_outcome("ok")
+    auth.upgrade_password_hash(logger, user_repos, password_service, user, password)
+
     try:
-        jwt_token = jwt_service.create_token(username=username)
+        with profiler.span("token_issue"):
+            jwt_token = jwt_service.create_token(username=username)
+            refresh_token = refresh_token_service.issue(username)
     except Exception as e:
-        logger.error(f"create jwt token error : {e}")
+        logger.error("create jwt token error : %s", e, extra={"auth_scheme": "password", "user": username})
         return Response(status=500)
 
     response = {
         "jwt": jwt_token,
+        "refresh_token": refresh_token,
+        "expires_in": app_settings.jwt_access_token_ttl,
     }
 
-    return jsonify(response)
+    return json_response(response)
+
+
+@auth_endpoints.route("/refresh", methods=["POST"])
+def refresh_jwt(
+        logger: Logger,
+        app_settings: AppSettings,
+        user_repos: IUserRepository,
+        jwt_service: IJwtService,
+        refresh_token_service: IRefreshTokenService):
+    """Issue a JWT and the next refresh token by a refresh token (without password)
+
+    request: {"refresh_token": "<refresh token>"}
+    """
+
+    refresh_token = request.json.get("refresh_token") if isinstance(request.json, dict) else None
+    if not isinstance(refresh_token, str):
+        return Response(status=400)
+
+    set_auth_context("refresh", None)
+
+    try:
+        with profiler.span("refresh_rotate"):
+            (outcome, username, next_refresh_token) = refresh_token_service.rotate(refresh_token)
+    except Exception as e:
+        logger.error("rotate refresh token error : %s", e, extra={"auth_scheme": "refresh"})
+        set_auth_outcome("error")
+        return Response(status=500)
+
+    set_auth_context("refresh", username, outcome)
+    if username is None or next_refresh_token is None:
+        return Response(status=400)
+
+    # the user may be deleted after the login
+    with profiler.span("user_lookup"):
+        user = user_repos.get_first_user(username)
+    if user is None:
+        set_auth_outcome("unknown_user")
+        return Response(status=400)
+
+    try:
+        with profiler.span("token_issue"):
+            jwt_token = jwt_service.create_token(username=username)
+    except Exception as e:
+        logger.error("create jwt token error : %s", e, extra={"auth_scheme": "refresh", "user": username})
+        return Response(status=500)
+
+    response = {
+        "jwt": jwt_token,
+        "refresh_token": next_refresh_token,
+        "expires_in": app_settings.jwt_access_token_ttl,
+    }
+
+    return json_response(response)
+
+
+@auth_endpoints.route("/introspect", methods=["POST"])
+@auth.jwt_token_required
+def introspect_jwt(app_settings: AppSettings, jwt_service: IJwtService, token_cache: JwtTokenCache, **kwargs):
+    """Verify a batch of JWT for gateways and other services
+
+    request: {"tokens": ["<jwt>", ...]}
+    """
+
+    tokens = request.json.get("tokens") if isinstance(request.json, dict) else None
+    if not isinstance(tokens, list) or not all(isinstance(token, str) for token in tokens):
+        return Response(status=400)
+
+    if len(tokens) > app_settings.introspect_max_tokens:
+        return Response(status=413)
+
+    results = jwt_service.introspect_tokens(tokens, token_cache=token_cache)
+
+    response = {
+        "results": [
+            {
+                "active": result.active,
+                "sub": result.sub,
+                "exp": result.exp,
+                "reason": result.reason,
+            } for result in results
+        ],
+    }
+
+    return json_response(response)
+
+
+@auth_endpoints.route("/revoke", methods=["POST"])
+@auth.jwt_token_required
+def revoke_jwt(jwt_service: IJwtService, revocations: IRevocationService, refresh_token_service: IRefreshTokenService, **kwargs):
+    """Revoke a JWT of the authorized user until it expires (logout)
+
+    request: {"token": "<jwt>"}, or no body to revoke the token of this request.
+    With "refresh_token", the refresh token and all tokens rotated from the same login are revoked too.
+    """
+
+    username: str = kwargs["username"]
+    body = request.get_json(silent=True)
+    refresh_token = body.get("refresh_token") if isinstance(body, dict) else None
+    if refresh_token is not None and not isinstance(refresh_token, str):
+        return Response(status=400)
+
+    token = body.get("token") if isinstance(body, dict) and "token" in body else request.headers.get("Authorization")
+    if not isinstance(token, str):
+        return Response(status=400)
+
+    try:
+        jwt_token = jwt_service.decode_token(token)
+    except Exception:
+        return Response(status=400)
+
+    # an expired token is already invalid, and revoking a revoked token again does nothing
+    reason = jwt_service.verify_token_reason(jwt_token)
+    if reason not in [None, JwtService.REASON_REVOKED, JwtService.REASON_EXPIRED] or jwt_token.jti is None:
+        return Response(status=400)
+
+    if jwt_token.sub != username:
+        return Response(status=403)
+
+    # nothing is revoked until the JWT and its owner are checked, then the refresh family and the JWT are revoked together
+    if refresh_token is not None and not refresh_token_service.revoke(refresh_token, username):
+        return Response(status=400)
+
+    if reason is None:
+        revocations.revoke(jwt_token.jti, jwt_token.exp)
+
+    return raw_json_response(REVOKED_BODY)
@@ -1,24 +1,37 @@
-from flask import jsonify, Blueprint, Response
+from flask import Blueprint, Response
 from datetime import datetime
+import time
+import typing as t
+
+from core.fast_reject import constant_response
+from core.json_provider import raw_json_response
 
 
 healthcheck_api = Blueprint("healthcheck", __name__, url_prefix="/healthcheck")
 
+# the fields other than "now" are encoded once, and the body is reused within the same second
+HEALTH_BODY_FORMAT = '{"health":"OK","now":"%s"}'
+_health_body: t.Tuple[int, bytes] = (-1, b"")
+
 
 @healthcheck_api.route("", methods=["GET"])
 def healthcheck() -> Response:
     """HTTP Health Check
     """
 
-    response = {
-        "health": "OK",
-        "now": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
+    global _health_body
+
+    (second, body) = _health_body
+    now = int(time.time())
+    if second != now:
+        body = (HEALTH_BODY_FORMAT % datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")).encode("utf-8")
+        _health_body = (now, body)
 
-    return jsonify(response)
+    return raw_json_response(body)
 
 
 @healthcheck_api.route("/", defaults={"path": "/"}, strict_slashes=False)
 @healthcheck_api.route("/<path:path>")
+@constant_response(status=404)
 def error_404(path) -> Response:
     return Response(status=404)
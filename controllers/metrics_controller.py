@@ -0,0 +1,14 @@
+from flask import Blueprint, Response
+
+from core.metrics import AppMetrics
+
+
+metrics_api = Blueprint("metrics", __name__, url_prefix="/metrics")
+
+
+@metrics_api.route("", methods=["GET"])
+def metrics(app_metrics: AppMetrics) -> Response:
+    """Metrics of all worker processes in Prometheus text exposition format
+    """
+
+    return Response(app_metrics.collect(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,26 @@
+from flask import Blueprint, Response
+
+from services.health_service import IHealthService
+
+
+probe_api = Blueprint("probe", __name__)
+
+
+@probe_api.route("/livez", methods=["GET"])
+def livez(health_service: IHealthService) -> Response:
+    """Liveness probe. Restart the process when it fails
+    """
+
+    (alive, body) = health_service.liveness()
+    return Response(body, status=200 if alive else 503, mimetype="application/json")
+
+
+@probe_api.route("/readyz", methods=["GET"])
+def readyz(health_service: IHealthService) -> Response:
+    """Readiness probe. Stop routing requests to the process while it fails
+
+    The result of the last background check is returned.
+    """
+
+    (ready, body) = health_service.readiness()
+    return Response(body, status=200 if ready else 503, mimetype="application/json")
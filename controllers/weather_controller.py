@@ -1,6 +1,9 @@
-from flask import Blueprint, Response, jsonify
+from flask import Blueprint, Response, request
 
 from core import auth
+from core.fast_reject import constant_response
+from core.json_provider import JSON_MIMETYPE, json_response
+from core.setting import AppSettings
 from services.weather_service import IWeatherService
 
 
@@ -10,29 +13,65 @@ weather_api = Blueprint("weather", __name__, url_prefix="/weather")
 @weather_api.route("/sts", methods=["GET"])
 @auth.simple_token_required
 def get_weather_by_sts(weather_service: IWeatherService, **kwargs):
-    weather = weather_service.create_weather()
-    response = {
-        "temperature": weather.temperature,
-        "forecast": weather.forecast,
-    }
-
-    return jsonify(response)
+    return json_response(weather_service.create_weather())
 
 
 @weather_api.route("/jwt", methods=["GET"])
 @auth.jwt_token_required
 def get_weather_by_jwt(weather_service: IWeatherService, **kwargs):
     # username: str = kwargs.get("username")  # you can get the user's identifier like this
-    weather = weather_service.create_weather()
-    response = {
-        "temperature": weather.temperature,
-        "forecast": weather.forecast,
-    }
+    return json_response(weather_service.create_weather())
+
+
+@weather_api.route("/batch/sts", methods=["GET"])
+@auth.simple_token_required
+def get_weathers_by_sts(weather_service: IWeatherService, app_settings: AppSettings, **kwargs):
+    return batch_response(weather_service, app_settings)
+
+
+@weather_api.route("/batch/jwt", methods=["GET"])
+@auth.jwt_token_required
+def get_weathers_by_jwt(weather_service: IWeatherService, app_settings: AppSettings, **kwargs):
+    return batch_response(weather_service, app_settings)
+
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# count of weather datas generated and encoded into a chunk of streamed response
+STREAM_CHUNK_SIZE = 1024
+
+
+def batch_response(weather_service: IWeatherService, app_settings: AppSettings) -> Response:
+    """Response of `count` weather datas (query parameter)
+
+    A JSON array by default, or NDJSON (a JSON object per line) streamed in chunks
+    with `format=ndjson` query parameter or `Accept: application/x-ndjson` header.
+    Streamed datas are created while the response is written, so memory doesn't grow with the count.
+    `seed` query parameter (0 or more) makes the datas reproducible, on servers with the same packages
+    (numpy and its fallback generate different datas from the same seed).
+    """
+
+    stream = request.args.get("format") == "ndjson" or (
+        "format" not in request.args and request.accept_mimetypes.best == NDJSON_MIMETYPE)
+    max_count = app_settings.weather_stream_max_count if stream else app_settings.weather_batch_max_count
+
+    count = request.args.get("count", type=int)
+    if count is None or count < 1 or count > max_count:
+        return Response(f"count must be 1 to {max_count}.", status=400)
+
+    seed = request.args.get("seed", type=int)
+    if seed is not None and seed < 0:
+        return Response("seed must be 0 or more.", status=400)
+
+    if not stream:
+        return Response(weather_service.create_weather_batch(count, seed).to_json(), mimetype=JSON_MIMETYPE)
 
-    return jsonify(response)
+    batches = weather_service.iter_weather_batches(count, STREAM_CHUNK_SIZE, seed)
+    return Response((batch.to_ndjson() for batch in batches), mimetype=NDJSON_MIMETYPE)
 
 
 @weather_api.route("/", defaults={"path": "/"}, strict_slashes=False)
 @weather_api.route("/<path:path>")
+@constant_response(status=404)
 def error_404(path: str) -> Response:
     return Response(status=404)
@@ -0,0 +1,76 @@
+import time
+from flask import Flask, Response, g, request
+from logging import INFO, Logger, getLogger
+import typing as t
+
+
+def set_auth_context(scheme: str, username: t.Optional[str], outcome: t.Optional[str] = None) -> None:
+    """Record how the request is authenticated, for the access log and metrics
+
+    Args:
+        scheme (str): "jwt", "simple" or "password"
+        username (t.Optional[str]): authenticated (or claimed) username
+        outcome (t.Optional[str], optional): "ok", "cached" or failure reason. Defaults to None (not decided yet).
+    """
+
+    g.auth_scheme = scheme
+    g.auth_user = username
+    g.auth_outcome = outcome
+    return
+
+
+def set_auth_outcome(outcome: str) -> None:
+    """Record the outcome of the authentication of the request
+
+    Args:
+        outcome (str): "ok", "cached" or failure reason
+    """
+
+    g.auth_outcome = outcome
+    return
+
+
+def register_access_log(app: Flask, logger: t.Optional[Logger] = None) -> None:
+    """Log one record per request from `after_request` hook
+
+    Fields: method, path, status, latency_ms, auth_scheme, user (as `extra`, structured by JsonFormatter).
+    Nothing is built when "access" logger doesn't emit INFO.
+
+    Args:
+        app (Flask): application
+        logger (t.Optional[Logger], optional): access logger. Defaults to "access" logger.
+    """
+
+    access_logger = logger if logger is not None else getLogger("access")
+
+    @app.before_request
+    def start_timer() -> None:
+        if "request_started_at" not in g:
+            g.request_started_at = time.perf_counter()
+        return
+
+    @app.after_request
+    def log_access(response: Response) -> Response:
+        if not access_logger.isEnabledFor(INFO):
+            return response
+
+        started_at: t.Optional[float] = g.get("request_started_at")
+        latency_ms = round((time.perf_counter() - started_at) * 1000, 3) if started_at is not None else None
+
+        access_logger.info(
+            "%s %s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "latency_ms": latency_ms,
+                "auth_scheme": g.get("auth_scheme"),
+                "user": g.get("auth_user"),
+            })
+
+        return response
+
+    return
@@ -2,40 +2,98 @@ from flask import Flask
 from flask_cors import CORS
 from flask_injector import FlaskInjector
 from injector import Binder, singleton
+import typing as t
 from logging import Logger, getLogger
+from core.access_log import register_access_log
+from core.fast_reject import register_fast_reject
 from core.initialize import AppInitializer, IAppInitializer
+from core.json_provider import JsonProvider, register_json_provider
+from core.metrics import AppMetrics, register_metrics
+from core.profiler import ProfiledInjector, register_profiler
+from core.rate_limit import RateLimiter, register_rate_limit
 
 from core.setting import SettingLoader, AppSettings
 from core.logger import LoggerBuilder
 from controllers.apis import api
 from controllers.auth_controller import auth_endpoints
-from repositories.user_repos import IUserRepository, TempUserRepository
-from services.jwt_service import IJwtService, JwtService
+from controllers.metrics_controller import metrics_api
+from controllers.probe_controller import probe_api
+from repositories.refresh_token_repos import IRefreshTokenRepository, SqliteRefreshTokenRepository
+from repositories.revocation_repos import IRevocationRepository, SqliteRevocationRepository
+from repositories.user_repos import (
+    CachedUserRepository, IUserRepository, IndexedUserRepository, SqliteUserRepository, TempUserRepository, UserChangeNotifier,
+    UserGenerations
+)
+from services.health_service import HealthService, IHealthService
+from services.jwt_service import IJwtService, JwtService, JwtTokenCache
+from services.password_service import IPasswordService, PasswordService
+from services.refresh_token_service import IRefreshTokenService, RefreshTokenService
+from services.revocation_service import IRevocationService, RevocationService
+from services.key_ring import IJwtKeyRing, JwtKeyRing
 from services.weather_service import IWeatherService, WeatherService
-from services.simple_token_service import ISimpleTokenService, SimpleTokenService
+from services.simple_token_service import ISimpleTokenService, SimpleTokenService, SimpleTokenCache
 
 
 class AppBuilder:
     service = None
 
+    # singleton services constructed by construct_singletons()
+    EAGER_SERVICES = [
+        Logger,
+        IAppInitializer,
+        AppMetrics,
+        RateLimiter,
+        UserChangeNotifier,
+        IUserRepository,
+        ISimpleTokenService,
+        SimpleTokenCache,
+        IPasswordService,
+        IJwtKeyRing,
+        IRevocationService,
+        IJwtService,
+        IRefreshTokenService,
+        JwtTokenCache,
+        IWeatherService,
+        IHealthService,
+    ]
+
     def __init__(self) -> None:
         return
 
     @classmethod
-    def build(self, app: Flask, cors_enable=True) -> 'AppBuilder':
+    def build(self, app: Flask, cors_enable=True, json_provider: t.Optional[JsonProvider] = None) -> 'AppBuilder':
         app.register_blueprint(api)
         app.register_blueprint(auth_endpoints)
+        app.register_blueprint(metrics_api)
+        app.register_blueprint(probe_api)
 
         if cors_enable:
             CORS(app=app)
 
-        self.service = FlaskInjector(app=app, modules=[self.configure])
+        register_access_log(app=app)
+        register_json_provider(app=app, provider=json_provider)
+
+        self.service = FlaskInjector(app=app, modules=[self.configure], injector=ProfiledInjector())
+        self.construct_singletons()
+
+        register_metrics(app=app, metrics=self.service.injector.get(AppMetrics))
+        register_rate_limit(app=app, rate_limiter=self.service.injector.get(RateLimiter))
+        register_profiler(app=app, app_settings=self.service.injector.get(AppSettings))
+        register_fast_reject(
+            app=app,
+            app_settings=self.service.injector.get(AppSettings),
+            metrics=self.service.injector.get(AppMetrics),
+            # the header flask_cors adds to responses of requests without Origin header
+            headers=[("Access-Control-Allow-Origin", "*")] if cors_enable else [])
 
         return self
 
     @classmethod
     def configure(self, binder: Binder) -> None:
         """Configure dependency  injections
+
+        Services hold no per-request state, so they are singletons (one instance per process).
+        Bind with `flask_injector.request` scope only for a service which keeps state of a request.
         """
 
         # Configure application settings
@@ -45,14 +103,77 @@ class AppBuilder:
         LoggerBuilder.setup()
 
         binder.bind(AppSettings, to=app_settings, scope=singleton)
-        binder.bind(Logger, to=getLogger("production"))
-        binder.bind(IAppInitializer, to=AppInitializer)
+        binder.bind(Logger, to=getLogger("production"), scope=singleton)
+        binder.bind(IAppInitializer, to=AppInitializer, scope=singleton)
+        binder.bind(AppMetrics, to=AppMetrics, scope=singleton)
+        binder.bind(RateLimiter, to=RateLimiter, scope=singleton)
+
+        if app_settings.user_db_path:
+            user_repos_class = SqliteUserRepository
+        elif app_settings.user_store_file:
+            user_repos_class = IndexedUserRepository
+        else:
+            user_repos_class = TempUserRepository
+
+        binder.bind(UserChangeNotifier, to=UserChangeNotifier, scope=singleton)
+        binder.bind(UserGenerations, to=UserGenerations, scope=singleton)
+        binder.bind(user_repos_class, to=user_repos_class, scope=singleton)
+        if app_settings.user_cache_size > 0:
+            binder.bind(
+                IUserRepository,
+                to=lambda: CachedUserRepository(
+                    repos=binder.injector.get(user_repos_class),
+                    app_settings=app_settings,
+                    notifier=binder.injector.get(UserChangeNotifier),
+                    generations=binder.injector.get(UserGenerations),
+                    metrics=binder.injector.get(AppMetrics)),
+                scope=singleton)
+        else:
+            binder.bind(IUserRepository, to=lambda: binder.injector.get(user_repos_class), scope=singleton)
+        binder.bind(ISimpleTokenService, to=SimpleTokenService, scope=singleton)
+        binder.bind(SimpleTokenCache, to=SimpleTokenCache, scope=singleton)
+        binder.bind(IPasswordService, to=PasswordService, scope=singleton)
+        binder.bind(IJwtKeyRing, to=JwtKeyRing, scope=singleton)
+        binder.bind(IRevocationRepository, to=SqliteRevocationRepository, scope=singleton)
+        binder.bind(IRevocationService, to=RevocationService, scope=singleton)
+        binder.bind(IJwtService, to=JwtService, scope=singleton)
+        binder.bind(IRefreshTokenRepository, to=SqliteRefreshTokenRepository, scope=singleton)
+        binder.bind(IRefreshTokenService, to=RefreshTokenService, scope=singleton)
+        binder.bind(JwtTokenCache, to=JwtTokenCache, scope=singleton)
+
+        binder.bind(IWeatherService, to=WeatherService, scope=singleton)
+        binder.bind(IHealthService, to=HealthService, scope=singleton)
+        return
+
+    @classmethod
+    def construct_singletons(self) -> None:
+        """Construct singleton services at startup
+
+        Keys, indexes and caches are loaded before the first request (and before fork with preloaded app),
+        not on a request thread. Process-bound resources (connections, worker processes) are still created lazily per process.
+        """
+
+        injector = self.get_service().injector
+        for interface in self.EAGER_SERVICES:
+            injector.get(interface)
+
+        return
+
+    @classmethod
+    def shutdown(self) -> None:
+        """Release resources held by services (like worker processes) and flush queued logs
+        """
+
+        if isinstance(self.service, FlaskInjector):
+            password_service = self.service.injector.get(IPasswordService)
+            if isinstance(password_service, PasswordService):
+                password_service.shutdown()
+
+            self.service.injector.get(AppMetrics).close()
 
-        binder.bind(IUserRepository, to=TempUserRepository)
-        binder.bind(ISimpleTokenService, to=SimpleTokenService)
-        binder.bind(IJwtService, to=JwtService)
+        # queued log records are emitted before the process exits
+        LoggerBuilder.shutdown()
 
-        binder.bind(IWeatherService, to=WeatherService)
         return
 
     @classmethod
@@ -1,10 +1,91 @@
 from flask import request, Response
 from logging import Logger
 from functools import wraps
+import typing as t
 
+from core import profiler
+from core.access_log import set_auth_context, set_auth_outcome
+from core.rate_limit import RateLimiter
+from models.user import User
 from repositories.user_repos import IUserRepository
-from services.jwt_service import IJwtService
-from services.simple_token_service import ISimpleTokenService
+from services.jwt_service import IJwtService, JwtTokenCache
+from services.password_service import IPasswordService, PasswordServiceBusyError
+from services.revocation_service import IRevocationService
+from services.simple_token_service import ISimpleTokenService, SimpleTokenCache
+
+
+def upgrade_password_hash(
+        logger: Logger, user_repos: IUserRepository, password_service: IPasswordService, user: User, password: str) -> None:
+    """Rehash the verified password if the stored hash is not by the current policy
+    """
+
+    if not password_service.needs_rehash(user.password_hash):
+        return
+
+    try:
+        user_repos.update_password_hash(user.username, password_service.hash_password(password))
+    except Exception as e:
+        logger.error("upgrade password hash error : %s", e, extra={"user": user.username})
+
+    return
+
+
+def verify_simple_token(
+        logger: Logger,
+        sts: ISimpleTokenService,
+        user_repos: IUserRepository,
+        password_service: IPasswordService,
+        token_cache: SimpleTokenCache,
+        simple_token: str) -> t.Union[User, Response]:
+    """Verify simple token, and cache the verified user
+
+    Returns:
+        t.Union[User, Response]: verified user, or error response
+    """
+
+    try:
+        with profiler.span("auth_decode"):
+            (username, password) = sts.decode_token(simple_token)
+    except Exception as e:
+        logger.error("invalid token error : %s", e, extra={"auth_scheme": "simple", "auth_result": "malformed"})
+        set_auth_outcome("malformed")
+        return Response(status=401)
+
+    # read before the lookup, so the entry is dropped if the user is changed while it's verified
+    generation = token_cache.generation(username)
+
+    try:
+        with profiler.span("user_lookup"):
+            user = user_repos.get_first_user(username)
+    except Exception as e:
+        logger.error("user repository error : %s", e, extra={"auth_scheme": "simple", "user": username})
+        set_auth_outcome("error")
+        return Response(status=401)  # this may be better status=500
+
+    if user is None:
+        logger.error(
+            "username: '%s' is not exist.", username, extra={"auth_scheme": "simple", "user": username, "auth_result": "unknown_user"})
+        set_auth_outcome("unknown_user")
+        return Response(status=401)
+
+    try:
+        with profiler.span("auth_verify"):
+            verified = password_service.verify_password(user, password)
+    except PasswordServiceBusyError:
+        set_auth_outcome("busy")
+        return Response(status=503, headers={"Retry-After": "1"})
+
+    if not verified:
+        logger.error(
+            "invalid token requested by username: '%s'", username,
+            extra={"auth_scheme": "simple", "user": username, "auth_result": "invalid_password"})
+        set_auth_outcome("invalid_password")
+        return Response(status=401)
+
+    token_cache.put_user(simple_token, user, generation)
+    upgrade_password_hash(logger, user_repos, password_service, user, password)
+
+    return user
 
 
 def simple_token_required(action):
@@ -19,33 +100,36 @@ def simple_token_required(action):
         logger: Logger = kwargs.pop("__simple_token_required_logger")
         sts: ISimpleTokenService = kwargs.pop("__simple_token_required_sts")
         user_repos: IUserRepository = kwargs.pop("__simple_token_required_user_repos")
+        password_service: IPasswordService = kwargs.pop("__simple_token_required_password_service")
+        token_cache: SimpleTokenCache = kwargs.pop("__simple_token_required_token_cache")
+        rate_limiter: RateLimiter = kwargs.pop("__simple_token_required_rate_limiter")
 
         header_key = "Authorization"
         simple_token = request.headers.get(header_key)
+        set_auth_context("simple", None)
 
         if simple_token is None:
-            logger.error(f"'{header_key}' is not set.")
+            logger.error("'%s' is not set.", header_key, extra={"auth_scheme": "simple", "auth_result": "missing"})
+            set_auth_outcome("missing")
             return Response(status=401)
 
-        try:
-            (username, password) = sts.decode_token(simple_token)
-        except Exception as e:
-            logger.error(f"invalid token error : {str(e)}")
-            return Response(status=401)
+        # A token verified recently skips decoding, user lookup and password verification
+        user = token_cache.get_user(simple_token)
+        outcome = "cached"
+        if user is None:
+            verified_user = verify_simple_token(logger, sts, user_repos, password_service, token_cache, simple_token)
+            if isinstance(verified_user, Response):
+                return verified_user
 
-        try:
-            user = user_repos.get_first_user(username)
-        except Exception as e:
-            logger.error(f"user repository error : {e}")
-            return Response(status=401)  # this may be better status=500
+            user = verified_user
+            outcome = "ok"
+            pass
 
-        if user is None:
-            logger.error(f"username: '{username}' is not exist.")
-            return Response(status=401)
+        set_auth_context("simple", user.username, outcome)
 
-        if user.password != password:
-            logger.error(f"invalid token requested by username: '{username}'")
-            return Response(status=401)
+        limited = rate_limiter.limit_user(user.username)
+        if limited is not None:
+            return limited
 
         response = action(user=user, *args, **kwargs)
 
@@ -56,6 +140,12 @@ def simple_token_required(action):
     authorize.__annotations__["__simple_token_required_logger"] = Logger
     authorize.__annotations__["__simple_token_required_sts"] = ISimpleTokenService
     authorize.__annotations__["__simple_token_required_user_repos"] = IUserRepository
+    authorize.__annotations__["__simple_token_required_password_service"] = IPasswordService
+    authorize.__annotations__["__simple_token_required_token_cache"] = SimpleTokenCache
+    authorize.__annotations__["__simple_token_required_rate_limiter"] = RateLimiter
+
+    # requests without the header are rejected by core.fast_reject before dispatch
+    authorize.auth_scheme = "simple"  # type: ignore
 
     return authorize
 
@@ -71,20 +161,47 @@ def jwt_token_required(action):
     def authorize(*args, **kwargs):
         logger: Logger = kwargs.pop("__jwt_token_required_logger")
         jwt_service: IJwtService = kwargs.pop("__jwt_token_required_jwt_service")
+        token_cache: JwtTokenCache = kwargs.pop("__jwt_token_required_token_cache")
+        revocations: IRevocationService = kwargs.pop("__jwt_token_required_revocations")
+        rate_limiter: RateLimiter = kwargs.pop("__jwt_token_required_rate_limiter")
 
         token = request.headers.get("Authorization")
+        set_auth_context("jwt", None)
 
         if token is None:
+            set_auth_outcome("missing")
             return Response(status=401)
 
-        try:
-            jwt_token = jwt_service.decode_token(token)
-        except Exception as e:
-            logger.error(f"invalid jwt token error : {e}")
+        # A token which has been verified once is valid until it expires
+        jwt_token = token_cache.get_token(token)
+        outcome = "cached"
+        if jwt_token is None:
+            try:
+                with profiler.span("auth_decode"):
+                    jwt_token = jwt_service.decode_token(token)
+            except Exception as e:
+                logger.error("invalid jwt token error : %s", e, extra={"auth_scheme": "jwt", "auth_result": "malformed"})
+                set_auth_outcome("malformed")
+                return Response(status=401)
+
+            with profiler.span("auth_verify"):
+                reason = jwt_service.verify_token_reason(jwt_token)
+            if reason is not None:
+                set_auth_context("jwt", jwt_token.sub, reason)
+                return Response(status=401)
+
+            token_cache.put_token(token, jwt_token)
+            outcome = "ok"
+        elif revocations.is_revoked(jwt_token.jti):
+            # the token was revoked after it's cached (the revocation is checked by verification otherwise)
+            set_auth_context("jwt", jwt_token.sub, "revoked")
             return Response(status=401)
 
-        if not jwt_service.verify_token(jwt_token):
-            return Response(status=401)
+        set_auth_context("jwt", jwt_token.sub, outcome)
+
+        limited = rate_limiter.limit_user(jwt_token.sub)
+        if limited is not None:
+            return limited
 
         response = action(username=jwt_token.sub, *args, **kwargs)
 
@@ -92,5 +209,11 @@ def jwt_token_required(action):
 
     authorize.__annotations__["__jwt_token_required_logger"] = Logger
     authorize.__annotations__["__jwt_token_required_jwt_service"] = IJwtService
+    authorize.__annotations__["__jwt_token_required_token_cache"] = JwtTokenCache
+    authorize.__annotations__["__jwt_token_required_revocations"] = IRevocationService
+    authorize.__annotations__["__jwt_token_required_rate_limiter"] = RateLimiter
+
+    # requests without the header are rejected by core.fast_reject before dispatch
+    authorize.auth_scheme = "jwt"  # type: ignore
 
     return authorize
@@ -0,0 +1,152 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import time
+import typing as t
+
+from core.file_lock import ProcessFileLock
+
+
+class SharedBloomFilter:
+    """Bloom filter in a file mapped to memory, shared by processes on the host
+
+    Layout: header <magic: uint32><active: uint32><bits: uint64><count: uint64><rebuilt_at: float64> (padded to 64 bytes),
+    then two bit arrays. Readers probe the active array without a lock, so a key added by any process is seen at once.
+    Writers hold a lock of the file (flock), and rebuild fills the inactive array and switches `active`,
+    so readers never see a partly built filter.
+
+    Keys can't be removed, so the filter is rebuilt from the source of the keys to drop them.
+    With 10 bits per key the false positive rate is about 1%.
+    """
+
+    MAGIC = 0x424C4F4D
+    HEADER = struct.Struct("<IIQQd")
+    HEADER_SIZE = 64
+    HASHES = 7
+
+    def __init__(self, path: str, bits: int) -> None:
+        """
+        Args:
+            path (str): file path (created if it's not exist or has another size)
+            bits (int): bits of the filter (rounded up to a multiple of 8)
+        """
+
+        if bits <= 0:
+            raise Exception("value error. bits must be positive")
+
+        self.path = path
+        self.__bits = bits + (-bits % 8)
+        self.__array_size = self.__bits // 8
+        size = self.HEADER_SIZE + self.__array_size * 2
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            header = os.pread(fd, self.HEADER.size, 0)
+            valid = os.fstat(fd).st_size == size and len(header) == self.HEADER.size and \
+                self.HEADER.unpack(header)[0] == self.MAGIC and self.HEADER.unpack(header)[2] == self.__bits
+            if not valid:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, self.HEADER.pack(self.MAGIC, 0, self.__bits, 0, 0.0), 0)
+        finally:
+            os.close(fd)
+
+        self.__file = open(path, "r+b")
+        self.__mmap = mmap.mmap(self.__file.fileno(), size)
+        self.__lock = ProcessFileLock(path)
+
+        return
+
+    @property
+    def bits(self) -> int:
+        return self.__bits
+
+    @property
+    def count(self) -> int:
+        """Count of keys added since the last rebuild (duplicates are counted)
+        """
+        return self.HEADER.unpack_from(self.__mmap, 0)[3]
+
+    @property
+    def rebuilt_at(self) -> float:
+        """Unix timestamp of the last rebuild (0.0 if it's never rebuilt)
+        """
+        return self.HEADER.unpack_from(self.__mmap, 0)[4]
+
+    def __contains__(self, key: str) -> bool:
+        offset = self.__array_offset(self.HEADER.unpack_from(self.__mmap, 0)[1])
+        data = self.__mmap
+        for position in self.positions(key):
+            if not data[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+
+        return True
+
+    def add(self, key: str) -> None:
+        with self.__lock:
+            (magic, active, bits, count, rebuilt_at) = self.HEADER.unpack_from(self.__mmap, 0)
+            self.__set_bits(self.__array_offset(active), [key])
+            self.HEADER.pack_into(self.__mmap, 0, magic, active, bits, count + 1, rebuilt_at)
+
+        return
+
+    def rebuild(self, load_keys: t.Callable[[], t.Iterable[str]], max_age: t.Optional[float] = None) -> bool:
+        """Replace the keys with the loaded keys
+
+        The keys are loaded while the lock is held, so a key added to the source and then to the filter
+        by another process is not lost.
+
+        Args:
+            load_keys (t.Callable[[], t.Iterable[str]]): returns all current keys
+            max_age (t.Optional[float], optional): rebuild only if the last rebuild (by any process) is older than this seconds.
+                Defaults to None (always).
+
+        Returns:
+            bool: True if it's rebuilt
+        """
+
+        with self.__lock:
+            (magic, active, bits, _, rebuilt_at) = self.HEADER.unpack_from(self.__mmap, 0)
+            if max_age is not None and time.time() - rebuilt_at < max_age:
+                return False
+
+            inactive = 1 - active
+            offset = self.__array_offset(inactive)
+            self.__mmap[offset:offset + self.__array_size] = bytes(self.__array_size)
+            count = self.__set_bits(offset, load_keys())
+
+            self.HEADER.pack_into(self.__mmap, 0, magic, inactive, bits, count, time.time())
+
+        return True
+
+    def positions(self, key: str) -> t.Iterator[int]:
+        """Bit positions of a key (double hashing of a 128-bit blake2b digest)
+        """
+
+        (h1, h2) = struct.unpack("<QQ", hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest())
+        h2 |= 1
+        for i in range(self.HASHES):
+            yield (h1 + i * h2) % self.__bits
+
+    def close(self) -> None:
+        self.__mmap.close()
+        self.__file.close()
+        return
+
+    def __array_offset(self, index: int) -> int:
+        return self.HEADER_SIZE + self.__array_size * index
+
+    def __set_bits(self, offset: int, keys: t.Iterable[str]) -> int:
+        count = 0
+        data = self.__mmap
+        for key in keys:
+            for position in self.positions(key):
+                data[offset + (position >> 3)] |= 1 << (position & 7)
+            count += 1
+
+        return count
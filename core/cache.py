@@ -0,0 +1,146 @@
+import time
+import threading
+from collections import OrderedDict
+
+import typing as t
+
+
+class TtlCache:
+    """Bounded LRU cache whose entries expire at an absolute unix timestamp
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: t.Optional[float] = None) -> None:
+        """
+        Args:
+            max_size (int, optional): max count of entries. Defaults to 1024.
+            ttl (t.Optional[float], optional): default lifetime (seconds) of an entry. Defaults to None (no expiration).
+        """
+
+        if max_size <= 0:
+            raise Exception("value error. max_size must be positive")
+
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__entries: 'OrderedDict[t.Hashable, t.Tuple[t.Any, t.Optional[float]]]' = OrderedDict()
+        self.__lock = threading.Lock()
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+        return
+
+    def get(self, key: t.Hashable, default: t.Any = None) -> t.Any:
+        """Get cached value
+
+        Args:
+            key (t.Hashable): cache key
+            default (t.Any, optional): returned value if the key is not cached or expired. Defaults to None.
+
+        Returns:
+            t.Any: cached value or default
+        """
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self.__entries[key]
+                self.__misses += 1
+                self.__evictions += 1
+                return default
+
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+
+        return value
+
+    def put(self, key: t.Hashable, value: t.Any, expires_at: t.Optional[float] = None, ttl: t.Optional[float] = None) -> None:
+        """Store value
+
+        Args:
+            key (t.Hashable): cache key
+            value (t.Any): cached value
+            expires_at (t.Optional[float], optional): unix timestamp at the entry expired. Defaults to None.
+            ttl (t.Optional[float], optional): lifetime (seconds) overriding the default ttl. Defaults to None.
+        """
+
+        lifetime = ttl if ttl is not None else self.__ttl
+        if lifetime is not None:
+            ttl_expires_at = time.time() + lifetime
+            expires_at = ttl_expires_at if expires_at is None else min(expires_at, ttl_expires_at)
+            pass
+
+        with self.__lock:
+            self.__entries[key] = (value, expires_at)
+            self.__entries.move_to_end(key)
+
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+        return
+
+    def invalidate(self, key: t.Hashable) -> None:
+        """Remove an entry if it is cached
+        """
+
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+        return
+
+    def clear(self) -> None:
+        """Remove all entries
+        """
+
+        with self.__lock:
+            self.__entries.clear()
+
+        return
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def max_size(self) -> int:
+        """Max count of entries
+        """
+        return self.__max_size
+
+    @property
+    def hits(self) -> int:
+        """Count of lookups answered from the cache
+        """
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        """Count of lookups not answered from the cache (including expired entries)
+        """
+        return self.__misses
+
+    @property
+    def evictions(self) -> int:
+        """Count of entries removed by capacity or expiration
+        """
+        return self.__evictions
+
+    @property
+    def stats(self) -> t.Dict[str, int]:
+        """Snapshot of cache counters
+        """
+
+        stats = {
+            "size": len(self.__entries),
+            "max_size": self.__max_size,
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "evictions": self.__evictions,
+        }
+
+        return stats
@@ -0,0 +1,224 @@
+import re
+import time
+from flask import Flask, Response
+import typing as t
+
+from core.metrics import AppMetrics
+from core.setting import AppSettings
+
+
+V = t.TypeVar("V", bound=t.Callable)
+
+# catch-all rule, like "/api/<path:path>"
+CATCH_ALL_RULE = re.compile(r"^([^<]*)<path:\w+>$")
+
+
+class ConstantResponse:
+    """WSGI status, headers and body of a response encoded once
+    """
+
+    __slots__ = ("status", "status_code", "headers", "body")
+
+    def __init__(self, response: Response) -> None:
+        self.status = response.status
+        self.status_code = response.status_code
+        self.headers = response.headers.to_wsgi_list()
+        self.body = response.get_data()
+        return
+
+
+class _Reject:
+    __slots__ = ("response", "blueprint", "route", "auth_scheme")
+
+    def __init__(self, response: ConstantResponse, endpoint: str, route: str, auth_scheme: t.Optional[str] = None) -> None:
+        self.response = response
+        # labels of metrics, the same as request.blueprint and request.url_rule
+        self.blueprint = endpoint.rpartition(".")[0]
+        self.route = route
+        self.auth_scheme = auth_scheme
+        return
+
+
+def constant_response(status: int = 200, body: t.Union[str, bytes] = b"", mimetype: t.Optional[str] = None) -> t.Callable[[V], V]:
+    """Mark a view which always returns the same response, like catch-all 404 routes
+
+    FastRejectMiddleware answers the requests of its rules by the response encoded once, without dispatch and DI.
+    The view still handles requests passed through (or all requests when the middleware is disabled), so it must return the same response.
+
+        @api.route("/<path:path>")
+        @constant_response(status=404)
+        def error_404(path: str) -> Response:
+            return Response(status=404)
+    """
+
+    response = ConstantResponse(Response(body, status=status, mimetype=mimetype))
+
+    def decorator(view: V) -> V:
+        view.constant_response = response  # type: ignore
+        return view
+
+    return decorator
+
+
+def view_attribute(view: t.Callable, name: str) -> t.Any:
+    """Attribute of the view, or of the function wrapped by decorators (functools.wraps)
+    """
+
+    while view is not None:
+        if name in getattr(view, "__dict__", {}):
+            return view.__dict__[name]
+        view = getattr(view, "__wrapped__", None)
+
+    return None
+
+
+class FastRejectMiddleware:
+    """WSGI middleware which answers requests that are rejected anyway, before Flask dispatch
+
+    - a path matched only by a catch-all rule of a view marked by `constant_response` (unknown paths)
+    - a request of a view protected by core.auth without `Authorization` header (401)
+
+    They're answered by responses encoded once, without request context, hooks and DI (no service is constructed).
+    Request metrics and auth outcomes are counted as the hooks do, but they're not written to the access log.
+    Other requests, and requests with `Origin` header (CORS headers by the origin are added by flask_cors), are passed to the app.
+    `headers` are added to every answered response, like the wildcard CORS header flask_cors adds without `Origin` header.
+
+    The routes are read from the URL map at the first request, after all rules are registered.
+    """
+
+    def __init__(self, app: Flask, metrics: AppMetrics, headers: t.Sequence[t.Tuple[str, str]] = ()) -> None:
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.__metrics = metrics
+        self.__headers = list(headers)
+
+        # path -> method -> reject (None: pass to the app)
+        self.__exact: t.Optional[t.Dict[str, t.Dict[str, t.Optional[_Reject]]]] = None
+        # (path prefix, method -> reject), longest prefix first
+        self.__catch_alls: t.List[t.Tuple[str, t.Dict[str, _Reject]]] = []
+        # prefixes of rules with other arguments, passed to the app
+        self.__dynamic_prefixes: t.Tuple[str, ...] = ()
+
+        return
+
+    def __call__(self, environ: t.Dict[str, t.Any], start_response: t.Callable) -> t.Iterable[bytes]:
+        started_at = time.perf_counter()
+        if self.__exact is None:
+            self.build_routes()
+
+        reject = self.match(environ)
+        if reject is None:
+            return self.wsgi_app(environ, start_response)
+
+        response = reject.response
+        start_response(response.status, response.headers + self.__headers)
+
+        method = environ["REQUEST_METHOD"]
+        self.__metrics.requests.inc((reject.blueprint, reject.route, method, response.status_code))
+        self.__metrics.request_duration.observe(time.perf_counter() - started_at, (reject.blueprint, reject.route))
+        if reject.auth_scheme is not None:
+            self.__metrics.auth_outcomes.inc((reject.auth_scheme, "missing"))
+
+        return [] if method == "HEAD" else [response.body]
+
+    def match(self, environ: t.Dict[str, t.Any]) -> t.Optional[_Reject]:
+        """Reject of the request, or None to pass it to the app
+        """
+
+        if self.__exact is None or "HTTP_ORIGIN" in environ:
+            return None
+
+        path: str = environ.get("PATH_INFO") or "/"
+        method: str = environ["REQUEST_METHOD"]
+
+        methods = self.__exact.get(path)
+        if methods is not None:
+            reject = methods.get(method)
+            if reject is None or (reject.auth_scheme is not None and "HTTP_AUTHORIZATION" in environ):
+                return None
+            return reject
+
+        # merged slashes are redirected by the app
+        if "//" in path or path.startswith(self.__dynamic_prefixes):
+            return None
+
+        for (prefix, rejects) in self.__catch_alls:
+            if path.startswith(prefix):
+                return rejects.get(method)
+
+        return None
+
+    def build_routes(self) -> None:
+        """Read the routes from the URL map of the app
+        """
+
+        exact: t.Dict[str, t.Dict[str, t.Optional[_Reject]]] = {}
+        catch_alls: t.Dict[str, t.Dict[str, _Reject]] = {}
+        dynamic_prefixes: t.List[str] = []
+        unauthorized = ConstantResponse(Response(b"", status=401))
+
+        rules = list(self.app.url_map.iter_rules())
+
+        # views of constant responses first, other views of the same path take precedence over them
+        for rule in rules:
+            response: t.Optional[ConstantResponse] = view_attribute(self.app.view_functions[rule.endpoint], "constant_response")
+            if response is None:
+                continue
+
+            # automatic OPTIONS responses are left to the app
+            methods = (rule.methods or set()) - {"OPTIONS"}
+            reject = _Reject(response, rule.endpoint, rule.rule)
+            matched = CATCH_ALL_RULE.match(rule.rule)
+            if matched is not None:
+                catch_alls.setdefault(matched.group(1), {}).update({method: reject for method in methods})
+            elif "<" not in rule.rule:
+                paths = [rule.rule]
+                if not rule.strict_slashes and rule.rule.endswith("/") and len(rule.rule) > 1:
+                    paths.append(rule.rule.rstrip("/"))
+                for path in paths:
+                    exact.setdefault(path, {}).update({method: reject for method in methods})
+            else:
+                dynamic_prefixes.append(rule.rule.split("<", 1)[0])
+
+        for rule in rules:
+            view = self.app.view_functions[rule.endpoint]
+            if view_attribute(view, "constant_response") is not None:
+                continue
+
+            if "<" in rule.rule:
+                dynamic_prefixes.append(rule.rule.split("<", 1)[0])
+                continue
+
+            auth_scheme: t.Optional[str] = view_attribute(view, "auth_scheme")
+            reject = _Reject(unauthorized, rule.endpoint, rule.rule, auth_scheme) if auth_scheme is not None else None
+            methods = (rule.methods or set()) - {"OPTIONS"}
+            exact.setdefault(rule.rule, {}).update({method: reject for method in methods})
+
+            # a rule ending with a slash redirects the path without it
+            if rule.rule.endswith("/") and len(rule.rule) > 1:
+                exact.setdefault(rule.rule.rstrip("/"), {})
+
+        self.__catch_alls = sorted(catch_alls.items(), key=lambda item: len(item[0]), reverse=True)
+        self.__dynamic_prefixes = tuple(dynamic_prefixes)
+        self.__exact = exact
+
+        return
+
+
+def register_fast_reject(
+        app: Flask, app_settings: AppSettings, metrics: AppMetrics, headers: t.Sequence[t.Tuple[str, str]] = ()) -> None:
+    """Put FastRejectMiddleware in front of the app (unless `FLASK_FAST_REJECT_ENABLED` is false)
+
+    Args:
+        app (Flask): application
+        app_settings (AppSettings): settings
+        metrics (AppMetrics): metrics
+        headers (t.Sequence[t.Tuple[str, str]], optional): headers added to answered responses. Defaults to ().
+    """
+
+    if not app_settings.fast_reject_enabled:
+        return
+
+    app.wsgi_app = FastRejectMiddleware(app, metrics, headers)  # type: ignore
+
+    return
@@ -0,0 +1,46 @@
+import fcntl
+import os
+import threading
+
+
+class ProcessFileLock:
+    """Exclusive lock of a file among threads and processes
+
+    Threads of a process are excluded by a thread lock, and processes by flock of the process's own file descriptor.
+    A file descriptor opened before fork shares its flock with the parent, so a forked process opens its own.
+
+        with lock:
+            ...
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.__reset()
+        os.register_at_fork(after_in_child=self.__reset)
+        return
+
+    def __enter__(self) -> None:
+        self.__thread_lock.acquire()
+        try:
+            if self.__fd < 0:
+                self.__fd = os.open(self.path, os.O_RDONLY)
+
+            fcntl.flock(self.__fd, fcntl.LOCK_EX)
+        except BaseException:
+            self.__thread_lock.release()
+            raise
+
+        return
+
+    def __exit__(self, *args) -> None:
+        try:
+            fcntl.flock(self.__fd, fcntl.LOCK_UN)
+        finally:
+            self.__thread_lock.release()
+
+        return
+
+    def __reset(self) -> None:
+        self.__thread_lock = threading.Lock()
+        self.__fd = -1
+        return
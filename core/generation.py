@@ -0,0 +1,84 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import typing as t
+
+from core.file_lock import ProcessFileLock
+
+
+class SharedGenerationTable:
+    """Generation counters in a file mapped to memory, shared by processes on the host
+
+    Layout: header <magic: uint32><reserved: uint32><slots: uint64> (padded to 64 bytes), then the counter of all keys
+    and `slots` counters of keys (uint64). A key is counted in the slot of its hash, so a bump of a key
+    also changes the generation of other keys in the same slot (they're dropped too early, never too late).
+    Readers read the counters without a lock, and writers hold a lock of the file (flock).
+    """
+
+    MAGIC = 0x47454E53
+    HEADER = struct.Struct("<IIQ")
+    HEADER_SIZE = 64
+    COUNTER = struct.Struct("<Q")
+
+    def __init__(self, path: str, slots: int) -> None:
+        """
+        Args:
+            path (str): file path (created if it's not exist or has another size)
+            slots (int): count of counters of keys
+        """
+
+        if slots <= 0:
+            raise Exception("value error. slots must be positive")
+
+        self.path = path
+        self.__slots = slots
+        size = self.HEADER_SIZE + self.COUNTER.size * (slots + 1)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            header = os.pread(fd, self.HEADER.size, 0)
+            valid = os.fstat(fd).st_size == size and len(header) == self.HEADER.size and \
+                self.HEADER.unpack(header)[0] == self.MAGIC and self.HEADER.unpack(header)[2] == slots
+            if not valid:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, self.HEADER.pack(self.MAGIC, 0, slots), 0)
+        finally:
+            os.close(fd)
+
+        self.__file = open(path, "r+b")
+        self.__mmap = mmap.mmap(self.__file.fileno(), size)
+        self.__lock = ProcessFileLock(path)
+
+        return
+
+    def get(self, key: str) -> t.Tuple[int, int]:
+        """(generation of all keys, generation of the key)
+        """
+
+        unpack_from = self.COUNTER.unpack_from
+        return (unpack_from(self.__mmap, self.HEADER_SIZE)[0], unpack_from(self.__mmap, self.__offset(key))[0])
+
+    def bump(self, key: t.Optional[str]) -> None:
+        """Change the generation of the key (None: of all keys)
+        """
+
+        offset = self.HEADER_SIZE if key is None else self.__offset(key)
+        with self.__lock:
+            self.COUNTER.pack_into(self.__mmap, offset, self.COUNTER.unpack_from(self.__mmap, offset)[0] + 1)
+
+        return
+
+    def close(self) -> None:
+        self.__mmap.close()
+        self.__file.close()
+        return
+
+    def __offset(self, key: str) -> int:
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+        return self.HEADER_SIZE + self.COUNTER.size * (1 + key_hash % self.__slots)
@@ -0,0 +1,101 @@
+import json
+from flask import Flask, Response, current_app
+import typing as t
+
+from core import profiler
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+JSON_MIMETYPE = "application/json"
+
+EXTENSION_KEY = "json_provider"
+
+
+class JsonProvider:
+    """Encoder of JSON response bodies
+
+    Use orjson (C-accelerated, encodes to bytes directly) when it's installed. It's optional (not in Pipfile),
+    and without it a compact `json.JSONEncoder` created once (not per call like `jsonify`) is used.
+    Models with `to_dict()` (like Weather) are encoded by the dict.
+    """
+
+    def __init__(self, sort_keys: bool = True, use_orjson: bool = True) -> None:
+        self.sort_keys = sort_keys
+        self.use_orjson = use_orjson and HAS_ORJSON
+
+        # encode to UTF-8 JSON (bound once, without dispatch per call)
+        self.dumps: t.Callable[[t.Any], bytes]
+        if self.use_orjson:
+            self.__orjson_option = orjson.OPT_SORT_KEYS if sort_keys else 0
+            self.dumps = self.__orjson_dumps
+        else:
+            self.__encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys, default=self.default).encode
+            self.dumps = self.__stdlib_dumps
+
+        return
+
+    def response(self, obj: t.Any, status: int = 200, headers: t.Optional[t.Dict[str, str]] = None) -> Response:
+        """JSON response of the object
+        """
+
+        with profiler.span("serialize"):
+            body = self.dumps(obj)
+
+        return current_app.response_class(body, status=status, headers=headers, content_type=JSON_MIMETYPE)
+
+    @staticmethod
+    def default(obj: t.Any) -> t.Any:
+        to_dict = getattr(obj, "to_dict", None)
+        if to_dict is None:
+            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+        return to_dict()
+
+    def __orjson_dumps(self, obj: t.Any) -> bytes:
+        return orjson.dumps(obj, default=self.default, option=self.__orjson_option)
+
+    def __stdlib_dumps(self, obj: t.Any) -> bytes:
+        return self.__encode(obj).encode("utf-8")
+
+
+# used by apps without a registered provider (like apps not built by AppBuilder)
+DEFAULT_PROVIDER = JsonProvider()
+
+
+def register_json_provider(app: Flask, provider: t.Optional[JsonProvider] = None) -> JsonProvider:
+    """Register the provider used by `json_response` of the app
+
+    Args:
+        app (Flask): application
+        provider (t.Optional[JsonProvider], optional): provider. Defaults to None (by `JSON_SORT_KEYS` config of the app).
+    """
+
+    if provider is None:
+        provider = JsonProvider(sort_keys=app.config.get("JSON_SORT_KEYS", True))
+
+    app.extensions[EXTENSION_KEY] = provider
+
+    return provider
+
+
+def json_response(obj: t.Any, status: int = 200, headers: t.Optional[t.Dict[str, str]] = None) -> Response:
+    """JSON response by the provider of the current app (instead of `jsonify`), or by DEFAULT_PROVIDER
+
+        return json_response({"revoked": True})
+        return json_response(weather)
+    """
+
+    provider: JsonProvider = current_app.extensions.get(EXTENSION_KEY, DEFAULT_PROVIDER)
+    return provider.response(obj, status=status, headers=headers)
+
+
+def raw_json_response(body: bytes, status: int = 200, headers: t.Optional[t.Dict[str, str]] = None) -> Response:
+    """JSON response of a pre-encoded body (for constant bodies encoded once at import)
+    """
+
+    return current_app.response_class(body, status=status, headers=headers, content_type=JSON_MIMETYPE)
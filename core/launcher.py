@@ -0,0 +1,67 @@
+from flask import Flask
+from gunicorn.app.base import BaseApplication
+import typing as t
+
+from core.setting import AppSettings
+
+
+class ProductionServer(BaseApplication):
+    """Pre-fork production server (gunicorn)
+
+    The application is built once in the master process (settings, DI graph, initializer),
+    then worker processes are forked from it. SIGTERM stops workers after running requests are finished.
+    `on_worker_exit` is called in each worker process before it exits, and `on_exit` in the master process.
+    """
+
+    def __init__(
+            self, app_factory: t.Callable[[], Flask], app_settings: AppSettings,
+            on_worker_exit: t.Optional[t.Callable[[], None]] = None, on_exit: t.Optional[t.Callable[[], None]] = None) -> None:
+        self.__app_factory = app_factory
+        self.__app_settings = app_settings
+        self.__on_worker_exit = on_worker_exit
+        self.__on_exit = on_exit
+
+        super().__init__()
+
+        return
+
+    def load_config(self) -> None:
+        app_settings = self.__app_settings
+
+        options = {
+            "bind": f"{app_settings.url}:{app_settings.listen_port}",
+            "workers": app_settings.workers,
+            "threads": app_settings.threads,
+            "worker_class": "gthread",
+            "backlog": app_settings.backlog,
+            "graceful_timeout": app_settings.graceful_timeout,
+            "preload_app": True,
+            "worker_exit": self.worker_exit,
+            "on_exit": self.on_exit,
+        }
+
+        for key, value in options.items():
+            self.cfg.set(key, value)
+
+        return
+
+    def load(self) -> Flask:
+        return self.__app_factory()
+
+    def worker_exit(self, server, worker) -> None:
+        """gunicorn hook called in the worker process just before it exits
+        """
+
+        if self.__on_worker_exit is not None:
+            self.__on_worker_exit()
+
+        return
+
+    def on_exit(self, server) -> None:
+        """gunicorn hook called in the master process just before it exits
+        """
+
+        if self.__on_exit is not None:
+            self.__on_exit()
+
+        return
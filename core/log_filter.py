@@ -0,0 +1,188 @@
+import abc
+import atexit
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import typing as t
+
+
+class SuppressingFilter(logging.Filter, metaclass=abc.ABCMeta):
+    """Base of filters which suppress similar records
+
+    Records are similar when they have the same logger, level and message template (not formatted message),
+    so log calls should pass arguments lazily (`logger.error("... '%s'", username)`).
+    The count of suppressed records is added to the next record of the same key which passes:
+
+        invalid token requested by username: 'admin' (suppressed 120 similar messages)
+
+    and it's also set to `suppressed` field of the record.
+
+    When no record of the key passes, the last suppressed record is emitted with the count by `flush()`,
+    every `flush_interval` seconds (0 disables the timer) and at exit. It's passed to the handlers of its logger directly,
+    so the filter should be set to loggers (not handlers).
+    """
+
+    def __init__(self, max_keys: int = 1024, levels: t.Optional[t.List[str]] = None, flush_interval: float = 60.0) -> None:
+        super().__init__()
+        self.max_keys = max_keys
+        self.levels = None if levels is None else {logging.getLevelName(level) for level in levels}
+        self.flush_interval = flush_interval
+
+        self.passed = 0
+        self.suppressed = 0
+        self._lock = threading.Lock()
+        self._states: "OrderedDict[t.Tuple[str, int, str], t.List]" = OrderedDict()
+
+        # key -> (last suppressed record, state). kept after the key is evicted from states, until it's flushed
+        self.__pending: t.Dict[t.Tuple[str, int, str], t.Tuple[logging.LogRecord, t.List]] = {}
+        # the timer thread is not inherited by fork, so it's started per process
+        self.__flusher_pid: t.Optional[int] = None
+
+        atexit.register(self.flush)
+
+        return
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.levels is not None and record.levelno not in self.levels:
+            return True
+
+        key = (record.name, record.levelno, str(record.msg))
+
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._new_state()
+                self._states[key] = state
+                if len(self._states) > self.max_keys:
+                    self._states.popitem(last=False)
+            else:
+                self._states.move_to_end(key)
+
+            if not self._accept(state):
+                state[0] += 1
+                self.suppressed += 1
+                self.__pending[key] = (record, state)
+                if self.flush_interval > 0 and self.__flusher_pid != os.getpid():
+                    self.__flusher_pid = os.getpid()
+                    threading.Thread(target=self.__flush_periodically, name="log-filter-flusher", daemon=True).start()
+                return False
+
+            suppressed = state[0]
+            state[0] = 0
+            self.__pending.pop(key, None)
+            self.passed += 1
+
+        if suppressed > 0:
+            record.msg = "%s (suppressed %d similar messages)" % (record.getMessage(), suppressed)
+            record.args = None
+            record.suppressed = suppressed
+
+        return True
+
+    def flush(self) -> None:
+        """Emit the last suppressed record of each key which no record has passed since
+        """
+
+        with self._lock:
+            pending = list(self.__pending.values())
+            self.__pending.clear()
+
+            records: t.List[logging.LogRecord] = []
+            for (record, state) in pending:
+                suppressed = state[0] - 1
+                state[0] = 0
+                if suppressed < 0:
+                    continue
+
+                record = logging.makeLogRecord(record.__dict__)
+                if suppressed > 0:
+                    record.msg = "%s (suppressed %d similar messages)" % (record.getMessage(), suppressed)
+                    record.args = None
+                    record.suppressed = suppressed
+                records.append(record)
+
+        for record in records:
+            logging.getLogger(record.name).callHandlers(record)
+
+        return
+
+    @property
+    def stats(self) -> t.Dict[str, int]:
+        """Counters of the filter
+        """
+        return {"keys": len(self._states), "passed": self.passed, "suppressed": self.suppressed}
+
+    def _new_state(self) -> t.List:
+        """State of a new key. The first item is the count of suppressed records
+        """
+        return [0]
+
+    @abc.abstractmethod
+    def _accept(self, state: t.List) -> bool:
+        """True if the record passes (called with the lock)
+        """
+        pass
+
+    def __flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+class RateLimitFilter(SuppressingFilter):
+    """Token bucket per message key
+
+    Up to `burst` records pass at once, then `rate` records per second.
+    Over the limit, a record still passes at probability `sample_rate` (0 drops all of them).
+
+    In logger.json:
+
+        "filters": {"rateLimit": {"()": "core.log_filter.RateLimitFilter", "rate": 1.0, "burst": 10}}
+    """
+
+    def __init__(
+            self, rate: float = 1.0, burst: int = 10, sample_rate: float = 0.0, max_keys: int = 1024,
+            levels: t.Optional[t.List[str]] = None, flush_interval: float = 60.0) -> None:
+        super().__init__(max_keys=max_keys, levels=levels, flush_interval=flush_interval)
+        self.rate = rate
+        self.burst = burst
+        self.sample_rate = sample_rate
+        return
+
+    def _new_state(self) -> t.List:
+        # [suppressed, tokens, updated_at]
+        return [0, float(self.burst), time.monotonic()]
+
+    def _accept(self, state: t.List) -> bool:
+        now = time.monotonic()
+        state[1] = min(float(self.burst), state[1] + (now - state[2]) * self.rate)
+        state[2] = now
+
+        if state[1] >= 1.0:
+            state[1] -= 1.0
+            return True
+
+        return self.sample_rate > 0.0 and random.random() < self.sample_rate
+
+
+class SamplingFilter(SuppressingFilter):
+    """Pass records at probability `sample_rate`
+
+    In logger.json:
+
+        "filters": {"sampling": {"()": "core.log_filter.SamplingFilter", "sample_rate": 0.1, "levels": ["INFO"]}}
+    """
+
+    def __init__(
+            self, sample_rate: float = 0.1, max_keys: int = 1024,
+            levels: t.Optional[t.List[str]] = None, flush_interval: float = 60.0) -> None:
+        super().__init__(max_keys=max_keys, levels=levels, flush_interval=flush_interval)
+        self.sample_rate = sample_rate
+        return
+
+    def _accept(self, state: t.List) -> bool:
+        return random.random() < self.sample_rate
@@ -1,12 +1,208 @@
+import atexit
 import os
 import pathlib
 import json
+import queue
+import threading
+import time
+import logging
 from logging import config
+from logging.handlers import QueueHandler, QueueListener
 
 import typing as t
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+OVERFLOW_DROP = "drop"
+OVERFLOW_SAMPLE = "sample"
+OVERFLOW_BLOCK = "block"
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Queue handler in front of a configured handler
+
+    Records are put to a bounded queue, and a listener thread emits them to the handler.
+    When the queue is full, the overflow policy is applied:
+
+    - drop: the record is dropped
+    - sample: 1 of every `sample_every` overflowed records waits for room (up to `block_timeout`), others are dropped
+    - block: the record waits for room up to `block_timeout` seconds, then it's dropped
+    """
+
+    def __init__(
+            self, name: str, handler: logging.Handler, max_size: int, overflow: str, sample_every: int, block_timeout: float) -> None:
+        if overflow not in [OVERFLOW_DROP, OVERFLOW_SAMPLE, OVERFLOW_BLOCK]:
+            raise Exception(f"unknown log queue overflow policy : {overflow}")
+
+        super().__init__(queue.Queue(maxsize=max_size))
+        self.set_name(name)
+        self.setLevel(handler.level)
+
+        self.handler = handler
+        self.max_size = max_size
+        self.overflow = overflow
+        self.sample_every = max(sample_every, 1)
+        self.block_timeout = block_timeout
+
+        self.dropped = 0
+        self.__overflowed = 0
+        self.__counter_lock = threading.Lock()
+        self.__listener: t.Optional[QueueListener] = None
+
+        return
+
+    def start(self) -> None:
+        """Start listener thread (with a new queue)
+        """
+
+        self.queue = queue.Queue(maxsize=self.max_size)
+        self.__listener = QueueListener(self.queue, self.handler, respect_handler_level=True)
+        self.__listener.start()
+
+        return
+
+    def stop(self) -> None:
+        """Emit queued records, and stop listener thread
+
+        Records logged after that are emitted synchronously.
+        """
+
+        listener = self.__listener
+        self.__listener = None
+        if listener is not None:
+            listener.stop()
+
+        return
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # only args are merged here (they may be changed after the call). formatting runs on the listener thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.__listener is None:
+            if record.levelno >= self.handler.level:
+                self.handler.handle(record)
+            return
+
+        super().emit(record)
+        return
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        wait = self.overflow == OVERFLOW_BLOCK
+        if self.overflow == OVERFLOW_SAMPLE:
+            with self.__counter_lock:
+                self.__overflowed += 1
+                wait = self.__overflowed % self.sample_every == 0
+
+        if wait:
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+                return
+            except queue.Full:
+                pass
+
+        with self.__counter_lock:
+            self.dropped += 1
+
+        return
+
+    @property
+    def stats(self) -> t.Dict[str, int]:
+        """Counters of the queue
+        """
+        return {"queued": self.queue.qsize(), "max_size": self.max_size, "dropped": self.dropped}
+
+
+# attributes of every LogRecord. other attributes are fields given by `extra`
+RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as a JSON line
+
+        {"time": "2024-01-01T00:00:00.000Z", "level": "ERROR", "logger": "production",
+         "location": "auth.py:62", "message": "...", <extra fields>}
+
+    The message is built from its arguments here, so it's evaluated only for records which are emitted.
+    Use orjson when it's installed.
+
+    In logger.json:
+
+        "json": {"()": "core.logger.JsonFormatter", "static_fields": {"service": "api"}}
+    """
+
+    def __init__(self, static_fields: t.Optional[t.Dict[str, t.Any]] = None, use_orjson: bool = True) -> None:
+        super().__init__()
+        self.static_fields = static_fields or {}
+        self.__dumps = self.__orjson_dumps if use_orjson and HAS_ORJSON else json.JSONEncoder(ensure_ascii=False, default=str).encode
+
+        # "<date>T<time>" of the last second, records in the same second share it
+        self.__second_cache: t.Tuple[int, str] = (-1, "")
+        return
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields: t.Dict[str, t.Any] = {
+            "time": self.format_time(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "location": f"{record.filename}:{record.lineno}",
+            "message": record.getMessage(),
+        }
+
+        if self.static_fields:
+            fields.update(self.static_fields)
+
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES:
+                fields[key] = value
+
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            fields["exception"] = record.exc_text
+        if record.stack_info:
+            fields["stack"] = self.formatStack(record.stack_info)
+
+        return self.__dumps(fields)
+
+    def format_time(self, record: logging.LogRecord) -> str:
+        """ISO 8601 time in UTC with milliseconds
+        """
+
+        second = int(record.created)
+        (cached_second, prefix) = self.__second_cache
+        if cached_second != second:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self.__second_cache = (second, prefix)
+
+        return "%s.%03dZ" % (prefix, record.msecs)
+
+    @staticmethod
+    def __orjson_dumps(fields: t.Dict[str, t.Any]) -> str:
+        return orjson.dumps(fields, default=str).decode("utf-8")
+
 
 class LoggerBuilder:
+    # queue handlers by handler name
+    queue_handlers: t.Dict[str, BoundedQueueHandler] = {}
+    __hooks_registered = False
+
     def __init__(self) -> None:
         return
 
@@ -14,6 +210,12 @@ class LoggerBuilder:
     def setup(self, path="settings/logger.json", path_type: t.Literal["rel", "abs"] = "rel") -> None:
         """Setup logger
 
+        When the setting has "queue" section, each handler is placed behind a bounded queue
+        and emitted by a listener thread, so a logging call doesn't wait for stream/file I/O.
+
+            "queue": {"max_size": 10000, "overflow": "drop", "sample_every": 10, "block_timeout": 1.0,
+                      "handlers": {"<handler name>": {<overrides>, "enabled": false}}}
+
         Args:
             path (str, optional): logger setting file path. Defaults to "settings/logger.json".
             path_type (t.Literal[&quot;rel&quot;, &quot;abs&quot;], optional): path type. Defaults to "rel".
@@ -50,6 +252,76 @@ class LoggerBuilder:
                 os.makedirs(log_dir_path, exist_ok=True)
                 pass
 
+        queue_settings: t.Optional[t.Dict] = logger_settings.pop("queue", None)
+
+        # handlers are closed by dictConfig, so queued records are emitted before that
+        self.shutdown()
         config.dictConfig(logger_settings)
 
+        if queue_settings is not None and queue_settings.get("enabled", True):
+            self.__setup_queue(logger_settings, queue_settings)
+
+        return
+
+    @classmethod
+    def __setup_queue(self, logger_settings: t.Dict, queue_settings: t.Dict) -> None:
+        handler_overrides: t.Dict[str, t.Dict] = queue_settings.get("handlers", {})
+
+        loggers = [logging.getLogger(name) for name in logger_settings.get("loggers", {}).keys()] + [logging.getLogger()]
+        handlers = {handler.name: handler for logger in loggers for handler in logger.handlers if handler.name is not None}
+
+        queue_handlers: t.Dict[str, BoundedQueueHandler] = {}
+        for name, handler in handlers.items():
+            handler_settings = {**queue_settings, **handler_overrides.get(name, {})}
+            if not handler_settings.get("enabled", True):
+                continue
+
+            queue_handlers[name] = BoundedQueueHandler(
+                name=name,
+                handler=handler,
+                max_size=int(handler_settings.get("max_size", 10000)),
+                overflow=handler_settings.get("overflow", OVERFLOW_DROP),
+                sample_every=int(handler_settings.get("sample_every", 10)),
+                block_timeout=float(handler_settings.get("block_timeout", 1.0)))
+
+        for logger in loggers:
+            logger.handlers = [queue_handlers.get(handler.name, handler) for handler in logger.handlers]
+
+        for queue_handler in queue_handlers.values():
+            queue_handler.start()
+
+        self.queue_handlers = queue_handlers
+
+        if not self.__hooks_registered:
+            # listener threads are not inherited by fork (pre-fork server workers)
+            os.register_at_fork(after_in_child=self.restart)
+            atexit.register(self.shutdown)
+            self.__hooks_registered = True
+
         return
+
+    @classmethod
+    def restart(self) -> None:
+        """Start listener threads again with new queues (in a forked process)
+        """
+
+        for queue_handler in self.queue_handlers.values():
+            queue_handler.start()
+
+        return
+
+    @classmethod
+    def shutdown(self) -> None:
+        """Emit queued records, and stop listener threads
+        """
+
+        for queue_handler in self.queue_handlers.values():
+            queue_handler.stop()
+
+        return
+
+    @classmethod
+    def queue_stats(self) -> t.Dict[str, t.Dict[str, int]]:
+        """Counters of log queues by handler name
+        """
+        return {name: queue_handler.stats for name, queue_handler in self.queue_handlers.items()}
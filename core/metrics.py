@@ -0,0 +1,443 @@
+import abc
+import atexit
+import bisect
+import glob
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from flask import Flask, Response, g, request
+from injector import inject
+import typing as t
+
+from core.setting import AppSettings, resolve_path
+
+
+class MetricFile:
+    """Values by key in a file mapped to memory, written by one process
+
+    Layout: <used bytes: uint64> then entries of <key length: uint32><key: utf-8, padded to 8 bytes><value: float64>.
+    An entry is written before `used` is updated, so readers in other processes see only complete entries.
+    A file left at the path (by an exited process with the same pid) is merged: its values are added to the written values,
+    so counters stay monotonic.
+    """
+
+    HEADER = struct.Struct("<Q")
+    KEY_LENGTH = struct.Struct("<I")
+    VALUE = struct.Struct("<d")
+
+    def __init__(self, path: str, initial_size: int = 64 * 1024) -> None:
+        self.path = path
+        self.__offsets: t.Dict[str, int] = {}
+
+        try:
+            self.__bases = dict(self.read(path))
+        except FileNotFoundError:
+            self.__bases = {}
+
+        # the merged file is written aside and replaces the old one at once, so readers never see it truncated
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.truncate(initial_size)
+
+        self.__file = open(temp_path, "r+b")
+        self.__mmap = mmap.mmap(self.__file.fileno(), initial_size)
+        self.__used = self.HEADER.size
+        self.HEADER.pack_into(self.__mmap, 0, self.__used)
+
+        for key in self.__bases.keys():
+            self.write(key, 0.0)
+        os.replace(temp_path, path)
+
+        return
+
+    def write(self, key: str, value: float) -> None:
+        offset = self.__offsets.get(key)
+        if offset is None:
+            offset = self.__append(key)
+
+        self.VALUE.pack_into(self.__mmap, offset, self.__bases.get(key, 0.0) + value)
+        return
+
+    def close(self) -> None:
+        self.__mmap.close()
+        self.__file.close()
+        return
+
+    def __append(self, key: str) -> int:
+        encoded = key.encode("utf-8")
+        padded_length = self.KEY_LENGTH.size + len(encoded)
+        padded_length += -padded_length % 8
+        entry_size = padded_length + self.VALUE.size
+
+        if self.__used + entry_size > len(self.__mmap):
+            size = len(self.__mmap)
+            while self.__used + entry_size > size:
+                size *= 2
+            self.__mmap.close()
+            self.__file.truncate(size)
+            self.__mmap = mmap.mmap(self.__file.fileno(), size)
+
+        offset = self.__used
+        self.KEY_LENGTH.pack_into(self.__mmap, offset, len(encoded))
+        self.__mmap[offset + self.KEY_LENGTH.size:offset + self.KEY_LENGTH.size + len(encoded)] = encoded
+        value_offset = offset + padded_length
+        self.VALUE.pack_into(self.__mmap, value_offset, 0.0)
+
+        self.__used += entry_size
+        self.HEADER.pack_into(self.__mmap, 0, self.__used)
+        self.__offsets[key] = value_offset
+
+        return value_offset
+
+    @classmethod
+    def read(self, path: str) -> t.Iterator[t.Tuple[str, float]]:
+        """Read entries of a metric file (of any process)
+        """
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        if len(data) < self.HEADER.size:
+            return
+
+        used = min(self.HEADER.unpack_from(data, 0)[0], len(data))
+        offset = self.HEADER.size
+        while offset + self.KEY_LENGTH.size <= used:
+            (length,) = self.KEY_LENGTH.unpack_from(data, offset)
+            padded_length = self.KEY_LENGTH.size + length
+            padded_length += -padded_length % 8
+            if offset + padded_length + self.VALUE.size > used:
+                break
+
+            key = data[offset + self.KEY_LENGTH.size:offset + self.KEY_LENGTH.size + length].decode("utf-8")
+            (value,) = self.VALUE.unpack_from(data, offset + padded_length)
+            yield (key, value)
+
+            offset += padded_length + self.VALUE.size
+
+        return
+
+
+class Metric(metaclass=abc.ABCMeta):
+    """Base of metrics
+
+    Values are added to a dict of the calling thread (no lock), and they are summed up at flush.
+    """
+
+    TYPE = ""
+
+    def __init__(self, metrics: 'Metrics', name: str, documentation: str, label_names: t.Sequence[str]) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        return
+
+    @abc.abstractmethod
+    def samples(self, values: t.Dict[t.Tuple, float]) -> t.List[str]:
+        """Lines of text exposition format from aggregated values of this metric
+
+        Args:
+            values (t.Dict[t.Tuple, float]): value by (sample suffix, label values, le)
+        """
+        pass
+
+    def format_labels(self, label_values: t.Tuple, le: t.Optional[str] = None) -> str:
+        pairs = [(name, str(value)) for name, value in zip(self.label_names, label_values)]
+        if le is not None:
+            pairs.append(("le", le))
+        if len(pairs) == 0:
+            return ""
+
+        escaped = ",".join(
+            '{0}="{1}"'.format(name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for (name, value) in pairs)
+        return "{" + escaped + "}"
+
+
+class Counter(Metric):
+    """Monotonic counter
+    """
+
+    TYPE = "counter"
+
+    def inc(self, label_values: t.Tuple = (), amount: float = 1.0) -> None:
+        values = self.metrics.thread_values()
+        key = (self.name, "", label_values, None)
+        values[key] = values.get(key, 0.0) + amount
+        return
+
+    def samples(self, values: t.Dict[t.Tuple, float]) -> t.List[str]:
+        return [f"{self.name}{self.format_labels(label_values)} {value}" for ((_, label_values, _), value) in sorted(values.items())]
+
+
+class Histogram(Metric):
+    """Histogram of fixed buckets
+    """
+
+    TYPE = "histogram"
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(
+            self, metrics: 'Metrics', name: str, documentation: str, label_names: t.Sequence[str],
+            buckets: t.Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(metrics, name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_labels = tuple(repr(float(bound)) for bound in self.buckets) + ("+Inf",)
+        return
+
+    def observe(self, value: float, label_values: t.Tuple = ()) -> None:
+        values = self.metrics.thread_values()
+        bucket_key = (self.name, "_bucket", label_values, self.bucket_labels[bisect.bisect_left(self.buckets, value)])
+        values[bucket_key] = values.get(bucket_key, 0.0) + 1.0
+        sum_key = (self.name, "_sum", label_values, None)
+        values[sum_key] = values.get(sum_key, 0.0) + value
+        return
+
+    def samples(self, values: t.Dict[t.Tuple, float]) -> t.List[str]:
+        series: t.Dict[t.Tuple, t.Dict[t.Tuple, float]] = {}
+        for (key, value) in values.items():
+            series.setdefault(key[1], {})[key] = value
+
+        lines = []
+        for label_values in sorted(series.keys()):
+            series_values = series[label_values]
+            cumulative = 0.0
+            for le in self.bucket_labels:
+                cumulative += series_values.get(("_bucket", label_values, le), 0.0)
+                lines.append(f"{self.name}_bucket{self.format_labels(label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self.format_labels(label_values)} {series_values.get(('_sum', label_values, None), 0.0)}")
+            lines.append(f"{self.name}_count{self.format_labels(label_values)} {cumulative}")
+
+        return lines
+
+
+class Metrics:
+    """Registry of metrics shared by worker processes
+
+    Each process writes its values to its own metric file in a directory every `FLASK_METRICS_FLUSH_INTERVAL` seconds,
+    and `collect()` sums up the files of all processes. Files of processes which have exited are kept (counters stay monotonic),
+    and removed when the registry is created again if the process is not alive.
+    Without `FLASK_METRICS_DIR` a temporary directory is used, and it's removed by `close()` of the process which created it.
+    """
+
+    @inject
+    def __init__(self, app_settings: AppSettings) -> None:
+        metrics_dir = app_settings.metrics_dir
+        if metrics_dir:
+            self.__dir = resolve_path(metrics_dir)
+            os.makedirs(self.__dir, exist_ok=True)
+            self.__temporary_dir_pid: t.Optional[int] = None
+        else:
+            self.__dir = tempfile.mkdtemp(prefix="flask_metrics_")
+            self.__temporary_dir_pid = os.getpid()
+        self.__flush_interval = app_settings.metrics_flush_interval
+
+        self.__metrics: t.Dict[str, Metric] = {}
+        self.__remove_dead_files()
+        self.__reset()
+
+        os.register_at_fork(after_in_child=self.__reset)
+        atexit.register(self.flush)
+
+        return
+
+    @property
+    def directory(self) -> str:
+        return self.__dir
+
+    def counter(self, name: str, documentation: str, label_names: t.Sequence[str] = ()) -> Counter:
+        metric = Counter(self, name, documentation, label_names)
+        self.__metrics[name] = metric
+        return metric
+
+    def histogram(
+            self, name: str, documentation: str, label_names: t.Sequence[str] = (),
+            buckets: t.Sequence[float] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(self, name, documentation, label_names, buckets)
+        self.__metrics[name] = metric
+        return metric
+
+    def thread_values(self) -> t.Dict[t.Tuple, float]:
+        """Values of the calling thread (in this process)
+        """
+
+        try:
+            return self.__local.values
+        except AttributeError:
+            pass
+
+        values: t.Dict[t.Tuple, float] = {}
+        with self.__lock:
+            self.__local.values = values
+            self.__thread_values.append(values)
+            if self.__flusher is None and self.__flush_interval > 0:
+                self.__flusher = threading.Thread(target=self.__flush_periodically, name="metrics-flusher", daemon=True)
+                self.__flusher.start()
+
+        return values
+
+    def flush(self) -> None:
+        """Write values of this process to its metric file
+        """
+
+        with self.__lock:
+            totals: t.Dict[t.Tuple, float] = {}
+            for values in self.__thread_values:
+                # a copy of dict is taken at once (under GIL) while the owner thread adds values
+                for (key, value) in values.copy().items():
+                    totals[key] = totals.get(key, 0.0) + value
+
+            if len(totals) == 0:
+                return
+
+            if self.__file is None:
+                self.__file = MetricFile(os.path.join(self.__dir, f"metrics_{os.getpid()}.db"))
+
+            for (key, value) in totals.items():
+                file_key = self.__file_keys.get(key)
+                if file_key is None:
+                    file_key = json.dumps(key)
+                    self.__file_keys[key] = file_key
+                self.__file.write(file_key, value)
+
+        return
+
+    def collect(self) -> str:
+        """Metrics of all processes in text exposition format
+        """
+
+        self.flush()
+
+        values: t.Dict[str, t.Dict[t.Tuple, float]] = {}
+        for path in glob.glob(os.path.join(self.__dir, "metrics_*.db")):
+            try:
+                entries = list(MetricFile.read(path))
+            except OSError:
+                continue
+
+            for (file_key, value) in entries:
+                (name, suffix, label_values, le) = json.loads(file_key)
+                key = (suffix, tuple(label_values), le)
+                metric_values = values.setdefault(name, {})
+                metric_values[key] = metric_values.get(key, 0.0) + value
+
+        lines = []
+        for (name, metric) in self.__metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.TYPE}")
+            lines.extend(metric.samples(values.get(name, {})))
+
+        return "\n".join(lines) + "\n"
+
+    def close(self) -> None:
+        """Flush values of this process, and remove the temporary directory in the process which created it
+
+        Other processes (forked workers) only flush, because the directory is still used by the others.
+        """
+
+        self.flush()
+
+        if self.__temporary_dir_pid == os.getpid():
+            atexit.unregister(self.flush)
+            shutil.rmtree(self.__dir, ignore_errors=True)
+
+        return
+
+    def __flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.__flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def __reset(self) -> None:
+        # state of this process. a forked process starts with empty values, its own file and flusher
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        self.__thread_values: t.List[t.Dict[t.Tuple, float]] = []
+        self.__file: t.Optional[MetricFile] = None
+        self.__file_keys: t.Dict[t.Tuple, str] = {}
+        self.__flusher: t.Optional[threading.Thread] = None
+        return
+
+    def __remove_dead_files(self) -> None:
+        for path in glob.glob(os.path.join(self.__dir, "metrics_*.db")):
+            try:
+                pid = int(os.path.basename(path)[len("metrics_"):-len(".db")])
+                os.kill(pid, 0)
+            except ValueError:
+                continue
+            except ProcessLookupError:
+                os.remove(path)
+            except PermissionError:
+                continue
+
+        return
+
+
+class AppMetrics(Metrics):
+    """Metrics of this application
+    """
+
+    @inject
+    def __init__(self, app_settings: AppSettings) -> None:
+        super().__init__(app_settings)
+
+        self.requests = self.counter(
+            "http_requests_total", "Count of HTTP requests", ["blueprint", "route", "method", "status"])
+        self.request_duration = self.histogram(
+            "http_request_duration_seconds", "Latency of HTTP requests", ["blueprint", "route"])
+        self.auth_outcomes = self.counter(
+            "auth_outcomes_total", "Count of authentications by scheme and outcome", ["scheme", "outcome"])
+        self.tokens_issued = self.counter(
+            "jwt_tokens_issued_total", "Count of issued JWT by signing key", ["kid"])
+        self.rate_limited = self.counter(
+            "http_rate_limited_total", "Count of requests rejected by rate limits", ["blueprint", "key"])
+        self.cache_lookups = self.counter(
+            "cache_lookups_total", "Count of cache lookups by cache and result", ["cache", "result"])
+
+        return
+
+
+def register_metrics(app: Flask, metrics: AppMetrics) -> None:
+    """Count requests and observe their latency from `after_request` hook
+
+    Requests are labeled by blueprint and URL rule (not the raw path), so the count of series is bounded.
+    Authentication outcome is counted from `g.auth_scheme` and `g.auth_outcome` set by core.auth.
+
+    Args:
+        app (Flask): application
+        metrics (AppMetrics): metrics
+    """
+
+    @app.before_request
+    def start_timer() -> None:
+        if "request_started_at" not in g:
+            g.request_started_at = time.perf_counter()
+        return
+
+    @app.after_request
+    def observe_request(response: Response) -> Response:
+        url_rule = request.url_rule
+        route = url_rule.rule if url_rule is not None else ""
+        blueprint = request.blueprint or ""
+
+        metrics.requests.inc((blueprint, route, request.method, response.status_code))
+
+        started_at: t.Optional[float] = g.get("request_started_at")
+        if started_at is not None:
+            metrics.request_duration.observe(time.perf_counter() - started_at, (blueprint, route))
+
+        outcome = g.get("auth_outcome")
+        if outcome is not None:
+            metrics.auth_outcomes.inc((g.get("auth_scheme"), outcome))
+
+        return response
+
+    return
@@ -0,0 +1,328 @@
+"""Per-request profiling
+
+A request is profiled when it's sampled (`FLASK_PROFILE_SAMPLE_RATE`) or it has a valid `X-Profile` header
+signed by `FLASK_PROFILE_SECRET`. Spans of named phases are recorded for profiled requests:
+
+    request;handler                      view function (with DI and auth decorators)
+    request;handler;inject               resolution of injected arguments
+    request;handler;auth_decode          token decoding
+    request;handler;user_lookup          user repository
+    request;handler;auth_verify          signature or password verification
+    request;handler;token_issue          JWT signing
+    request;handler;serialize            JSON encoding
+
+and written to "profile" logger, with cProfile stats (`FLASK_PROFILE_MODE`: "cprofile")
+or a collapsed stack file for flamegraph tools ("stack") in `FLASK_PROFILE_DIR`.
+
+Create the header value:
+
+    python -m core.profiler sign --ttl 300
+"""
+import argparse
+import cProfile
+import functools
+import hashlib
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from flask import Flask, Response, request
+from injector import Injector
+from logging import Logger, getLogger
+import typing as t
+
+from core.setting import AppSettings, SettingLoader, resolve_path
+
+
+PROFILE_HEADER = "X-Profile"
+
+MODE_SPANS = "spans"
+MODE_CPROFILE = "cprofile"
+MODE_STACK = "stack"
+
+# profile of the request which the current thread is handling
+_local = threading.local()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return
+
+    def __exit__(self, *args) -> None:
+        return
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profile", "name", "started_at")
+
+    def __init__(self, profile: 'RequestProfile', name: str) -> None:
+        self.profile = profile
+        self.name = name
+        self.started_at = 0.0
+        return
+
+    def __enter__(self) -> None:
+        self.profile.stack.append(self.name)
+        self.started_at = time.perf_counter()
+        return
+
+    def __exit__(self, *args) -> None:
+        elapsed = time.perf_counter() - self.started_at
+        path = ";".join(self.profile.stack)
+        self.profile.spans[path] = self.profile.spans.get(path, 0.0) + elapsed
+        self.profile.stack.pop()
+        return
+
+
+class RequestProfile:
+    """Spans of a profiled request
+    """
+
+    def __init__(self) -> None:
+        self.stack: t.List[str] = ["request"]
+        self.spans: t.Dict[str, float] = {}
+        self.started_at = time.perf_counter()
+        return
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+
+def span(name: str) -> t.Union[_Span, _NullSpan]:
+    """Span of a named phase
+
+        with profiler.span("auth_verify"):
+            ...
+
+    It does nothing (and costs an attribute lookup) when the request isn't profiled.
+    """
+
+    profile: t.Optional[RequestProfile] = getattr(_local, "profile", None)
+    if profile is None:
+        return NULL_SPAN
+
+    return _Span(profile, name)
+
+
+class ProfiledInjector(Injector):
+    """Injector which records resolution of injected arguments as "inject" span
+    """
+
+    def args_to_inject(self, function: t.Callable, bindings: t.Dict[str, type], owner_key: object) -> t.Dict[str, t.Any]:
+        if len(bindings) == 0 or getattr(_local, "profile", None) is None:
+            return super().args_to_inject(function, bindings, owner_key)
+
+        with span("inject"):
+            return super().args_to_inject(function, bindings, owner_key)
+
+
+class StackProfiler:
+    """Self time per call stack of the current thread (by sys.setprofile)
+
+    The result is collapsed stack format ("a;b;c <microseconds>") for flamegraph tools.
+    """
+
+    def __init__(self) -> None:
+        # [name, started_at, time of children]
+        self.__stack: t.List[t.List] = []
+        self.totals: t.Dict[str, float] = {}
+        return
+
+    def __call__(self, frame, event: str, arg) -> None:
+        if event == "call":
+            code = frame.f_code
+            self.__stack.append([f"{os.path.basename(code.co_filename)}:{code.co_name}", time.perf_counter(), 0.0])
+        elif event == "c_call":
+            self.__stack.append([getattr(arg, "__qualname__", str(arg)), time.perf_counter(), 0.0])
+        elif event in ["return", "c_return", "c_exception"]:
+            # returns from the frames which were called before profiling started
+            if len(self.__stack) == 0:
+                return
+
+            path = ";".join(entry[0] for entry in self.__stack)
+            (_, started_at, children) = self.__stack.pop()
+            elapsed = time.perf_counter() - started_at
+            self.totals[path] = self.totals.get(path, 0.0) + elapsed - children
+            if len(self.__stack) > 0:
+                self.__stack[-1][2] += elapsed
+
+        return
+
+    def enable(self) -> None:
+        sys.setprofile(self)
+        return
+
+    def disable(self) -> None:
+        sys.setprofile(None)
+        return
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for (stack, seconds) in self.totals.items():
+                f.write(f"{stack} {max(int(seconds * 1e6), 1)}\n")
+
+        return
+
+
+def sign_profile_token(secret: str, expires_at: int) -> str:
+    """Value of X-Profile header valid until expires_at (unix time)
+    """
+
+    signature = hmac.new(secret.encode("utf-8"), str(expires_at).encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"{expires_at}.{signature}"
+
+
+def verify_profile_token(secret: str, token: str) -> bool:
+    (expires_at, _, signature) = token.partition(".")
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+
+    return hmac.compare_digest(sign_profile_token(secret, int(expires_at)), token)
+
+
+def register_profiler(app: Flask, app_settings: AppSettings, logger: t.Optional[Logger] = None) -> None:
+    """Profile sampled requests and requests with a signed X-Profile header
+
+    Nothing is registered when profiling is disabled (no sample rate and no secret).
+    Call it after FlaskInjector, so the handler span includes DI.
+
+    Args:
+        app (Flask): application
+        app_settings (AppSettings): settings
+        logger (t.Optional[Logger], optional): logger of span timings. Defaults to "profile" logger.
+    """
+
+    sample_rate = app_settings.profile_sample_rate
+    secret = app_settings.profile_secret
+    mode = app_settings.profile_mode
+    if sample_rate <= 0 and not secret:
+        return
+
+    if mode not in [MODE_SPANS, MODE_CPROFILE, MODE_STACK]:
+        raise Exception(f"unknown profile mode : {mode}")
+
+    profile_logger = logger if logger is not None else getLogger("profile")
+    profile_dir = resolve_path(app_settings.profile_dir)
+    if mode != MODE_SPANS:
+        os.makedirs(profile_dir, exist_ok=True)
+
+    def is_profiled() -> bool:
+        token = request.headers.get(PROFILE_HEADER)
+        if token is not None and secret and verify_profile_token(secret, token):
+            return True
+        return sample_rate > 0 and random.random() < sample_rate
+
+    def start_profile() -> None:
+        if not is_profiled():
+            return
+
+        _local.profile = RequestProfile()
+        if mode == MODE_CPROFILE:
+            _local.profiler = cProfile.Profile()
+        elif mode == MODE_STACK:
+            _local.profiler = StackProfiler()
+        else:
+            _local.profiler = None
+
+        if _local.profiler is not None:
+            _local.profiler.enable()
+
+        return
+
+    def finish_profile(response: Response) -> Response:
+        profile: t.Optional[RequestProfile] = getattr(_local, "profile", None)
+        if profile is None:
+            return response
+
+        profiler = _local.profiler
+        if profiler is not None:
+            profiler.disable()
+
+        total = time.perf_counter() - profile.started_at
+        endpoint = request.endpoint or "unmatched"
+
+        if profiler is not None:
+            ext = "prof" if mode == MODE_CPROFILE else "folded"
+            file_name = f"{int(time.time() * 1000)}_{os.getpid()}_{endpoint.replace('.', '_')}.{ext}"
+            try:
+                if isinstance(profiler, cProfile.Profile):
+                    profiler.dump_stats(os.path.join(profile_dir, file_name))
+                else:
+                    profiler.dump(os.path.join(profile_dir, file_name))
+            except OSError as e:
+                profile_logger.error("profile dump error : %s", e)
+
+        profile_logger.info(
+            "%s %s %s %.3fms",
+            request.method,
+            request.path,
+            response.status_code,
+            total * 1000,
+            extra={
+                "endpoint": endpoint,
+                "status": response.status_code,
+                "total_ms": round(total * 1000, 3),
+                "spans_ms": {path: round(seconds * 1000, 3) for (path, seconds) in profile.spans.items()},
+            })
+
+        return response
+
+    def clear_profile(exception: t.Optional[BaseException]) -> None:
+        # the response isn't made when the view raises
+        profiler = getattr(_local, "profiler", None)
+        if getattr(_local, "profile", None) is not None and profiler is not None:
+            profiler.disable()
+        _local.profile = None
+        _local.profiler = None
+        return
+
+    # the first before_request hook, and the last after_request hook (they run in reverse order)
+    app.before_request_funcs.setdefault(None, []).insert(0, start_profile)
+    app.after_request_funcs.setdefault(None, []).insert(0, finish_profile)
+    app.teardown_request_funcs.setdefault(None, []).append(clear_profile)
+
+    for (endpoint, view) in list(app.view_functions.items()):
+        app.view_functions[endpoint] = profile_view(view)
+
+    return
+
+
+def profile_view(view: t.Callable) -> t.Callable:
+    """Record the view function (with DI and decorators) as "handler" span
+    """
+
+    @functools.wraps(view)
+    def profiled_view(*args, **kwargs):
+        with span("handler"):
+            return view(*args, **kwargs)
+
+    return profiled_view
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["sign"], help="print a value of X-Profile header")
+    parser.add_argument("--ttl", type=int, default=300, help="seconds the header is valid")
+    args = parser.parse_args()
+
+    # server settings are parsed from argv too
+    del sys.argv[1:]
+
+    app_settings = SettingLoader.load_setting().get_setting()
+    if not app_settings.profile_secret:
+        raise Exception(f"'{AppSettings.FLASK_PROFILE_SECRET_KEY}' is not set.")
+
+    print(sign_profile_token(app_settings.profile_secret, int(time.time()) + args.ttl))
+
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import fcntl
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from flask import Flask, Response, request
+from injector import inject
+import typing as t
+
+from core.file_lock import ProcessFileLock
+from core.metrics import AppMetrics
+from core.setting import AppSettings, resolve_path
+
+
+class GcraTable:
+    """GCRA state (theoretical arrival time per key) in a file mapped to memory, shared by processes on the host
+
+    Layout: header <magic: uint32><reserved: uint32><slots: uint64> (padded to 64 bytes), then slots of <key hash: uint64><tat: float64>.
+    A key is placed in one of PROBES slots from its hash. When they're all taken by other keys still limited,
+    the slot of the key nearest to its full burst is reused (the evicted key starts over with a full burst).
+    """
+
+    MAGIC = 0x47435241
+    HEADER = struct.Struct("<IIQ")
+    HEADER_SIZE = 64
+    SLOT = struct.Struct("<Qd")
+    PROBES = 8
+
+    def __init__(self, path: str, slots: int) -> None:
+        if slots <= 0:
+            raise Exception("value error. slots must be positive")
+
+        self.path = path
+        self.__slots = slots
+        size = self.HEADER_SIZE + self.SLOT.size * slots
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            header = os.pread(fd, self.HEADER.size, 0)
+            valid = os.fstat(fd).st_size == size and len(header) == self.HEADER.size and \
+                self.HEADER.unpack(header)[0] == self.MAGIC and self.HEADER.unpack(header)[2] == slots
+            if not valid:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, self.HEADER.pack(self.MAGIC, 0, slots), 0)
+        finally:
+            os.close(fd)
+
+        self.__file = open(path, "r+b")
+        self.__mmap = mmap.mmap(self.__file.fileno(), size)
+        self.__lock = ProcessFileLock(path)
+
+        return
+
+    def acquire(self, limits: t.Sequence[t.Tuple[str, float, float]], now: t.Optional[float] = None) -> t.Tuple[float, int]:
+        """Take a request from all limits, or from none of them
+
+        Args:
+            limits (t.Sequence[t.Tuple[str, float, float]]): (key, emission interval, tolerance) of each limit
+            now (t.Optional[float], optional): unix timestamp. Defaults to None (current time).
+
+        Returns:
+            t.Tuple[float, int]: (0.0, -1) if allowed, otherwise (seconds until it's allowed, index of the limit)
+        """
+
+        if now is None:
+            now = time.time()
+
+        # hash 0 marks an empty slot
+        key_hashes = [int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") | 1 for (key, _, _) in limits]
+        updates: t.List[t.Tuple[int, int, float]] = []
+        (wait, rejected_by) = (0.0, -1)
+
+        with self.__lock:
+            for (index, (_, interval, tolerance)) in enumerate(limits):
+                (offset, tat) = self.__find(key_hashes[index], now)
+                if tat < now:
+                    tat = now
+                if tat - now - tolerance > wait:
+                    (wait, rejected_by) = (tat - now - tolerance, index)
+                updates.append((offset, key_hashes[index], tat + interval))
+
+            if rejected_by < 0:
+                for (offset, key_hash, tat) in updates:
+                    self.SLOT.pack_into(self.__mmap, offset, key_hash, tat)
+
+        return (wait, rejected_by)
+
+    def close(self) -> None:
+        self.__mmap.close()
+        self.__file.close()
+        return
+
+    def __find(self, key_hash: int, now: float) -> t.Tuple[int, float]:
+        # (offset of the slot, tat of the key) or (offset of a free slot, 0.0)
+        (slots, unpack_from, data) = (self.__slots, self.SLOT.unpack_from, self.__mmap)
+        base = key_hash % slots
+        (free, oldest, oldest_tat) = (-1, -1, math.inf)
+        for i in range(self.PROBES):
+            offset = self.HEADER_SIZE + self.SLOT.size * ((base + i) % slots)
+            (slot_key, tat) = unpack_from(data, offset)
+            if slot_key == key_hash:
+                return (offset, tat)
+
+            # a key whose tat has passed has a full burst, the same as a new key
+            if free < 0 and (slot_key == 0 or tat <= now):
+                free = offset
+            if tat < oldest_tat:
+                (oldest, oldest_tat) = (offset, tat)
+
+        return (free if free >= 0 else oldest, 0.0)
+
+
+class RateLimitRule:
+    """Limit of `limit` requests per `period` seconds (and `burst` requests at once) for each value of the key
+
+    keys:
+        ip          client address (before authentication)
+        username    "username" of the JSON body (before authentication, like login attempts of an account)
+        user        authenticated user (JWT sub or simple token user)
+    """
+
+    KEYS = ["ip", "username", "user"]
+
+    def __init__(self, key: str, limit: int, period: float, burst: t.Optional[int] = None) -> None:
+        if key not in self.KEYS:
+            raise Exception(f"unknown rate limit key : {key}")
+        if limit <= 0 or period <= 0:
+            raise Exception("value error. limit and period must be positive")
+
+        self.key = key
+        self.interval = period / limit
+        self.tolerance = self.interval * (max(burst if burst is not None else limit, 1) - 1)
+        return
+
+
+class RateLimiter:
+    """Rate limits by the rules of blueprints in `FLASK_RATE_LIMIT_FILE` (GCRA, shared by all worker processes)
+
+    Rules of a blueprint apply to its nested blueprints too ("api" rules limit "api.weather").
+    Rules of an endpoint ("endpoints" section) replace the rules of its blueprint, with their own budget
+    (an empty list exempts the endpoint).
+    A request over a limit gets `429` with `Retry-After` header.
+    """
+
+    @inject
+    def __init__(self, app_settings: AppSettings, metrics: AppMetrics) -> None:
+        self.__metrics = metrics
+        self.__enabled = app_settings.rate_limit_enabled
+        self.__rules: t.Dict[str, t.List[RateLimitRule]] = {}
+        self.__endpoint_rules: t.Dict[str, t.List[RateLimitRule]] = {}
+        self.__rules_by_endpoint: t.Dict[t.Tuple[t.Optional[str], t.Optional[str]], t.Tuple[str, t.List[RateLimitRule]]] = {}
+        self.__table: t.Optional[GcraTable] = None
+
+        if not self.__enabled:
+            return
+
+        with open(resolve_path(app_settings.rate_limit_file), "r", encoding="utf-8") as f:
+            config: dict = json.load(f)
+
+        for (name, rules) in config.get("blueprints", {}).items():
+            self.__rules[name] = [RateLimitRule(**rule) for rule in rules]
+        for (name, rules) in config.get("endpoints", {}).items():
+            self.__endpoint_rules[name] = [RateLimitRule(**rule) for rule in rules]
+
+        self.__table = GcraTable(resolve_path(app_settings.rate_limit_state_path), int(config.get("slots", 65536)))
+
+        return
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    def rules_of(self, blueprint: t.Optional[str], endpoint: t.Optional[str] = None) -> t.Tuple[str, t.List[RateLimitRule]]:
+        """Rules of the endpoint, or of the nearest configured blueprint
+
+        Returns:
+            t.Tuple[str, t.List[RateLimitRule]]: (configured endpoint or blueprint name, rules)
+        """
+
+        found = self.__rules_by_endpoint.get((blueprint, endpoint))
+        if found is not None:
+            return found
+
+        if endpoint is not None and endpoint in self.__endpoint_rules:
+            found = (endpoint, self.__endpoint_rules[endpoint])
+        else:
+            name = blueprint or ""
+            while name not in self.__rules and "." in name:
+                name = name.rsplit(".", 1)[0]
+            found = (name, self.__rules.get(name, []))
+
+        self.__rules_by_endpoint[(blueprint, endpoint)] = found
+
+        return found
+
+    def limit_request(self) -> t.Optional[Response]:
+        """Check the limits keyed by client address and requested username (before authentication)
+
+        Returns:
+            t.Optional[Response]: 429 response, or None if allowed
+        """
+
+        if not self.__enabled:
+            return None
+
+        (name, rules) = self.rules_of(request.blueprint, request.endpoint)
+        limits: t.List[t.Tuple[str, RateLimitRule]] = []
+        for (index, rule) in enumerate(rules):
+            if rule.key == "ip":
+                value = request.remote_addr or ""
+            elif rule.key == "username":
+                body = request.get_json(silent=True)
+                value = body.get("username") if isinstance(body, dict) else None
+                if not isinstance(value, str):
+                    continue
+            else:
+                continue
+
+            limits.append((f"{name}:{index}:{value}", rule))
+
+        return self.__acquire(name, limits)
+
+    def limit_user(self, username: str) -> t.Optional[Response]:
+        """Check the limits keyed by the authenticated user
+
+        Returns:
+            t.Optional[Response]: 429 response, or None if allowed
+        """
+
+        if not self.__enabled:
+            return None
+
+        (name, rules) = self.rules_of(request.blueprint, request.endpoint)
+        limits = [(f"{name}:{index}:{username}", rule) for (index, rule) in enumerate(rules) if rule.key == "user"]
+
+        return self.__acquire(name, limits)
+
+    def __acquire(self, name: str, limits: t.List[t.Tuple[str, RateLimitRule]]) -> t.Optional[Response]:
+        if len(limits) == 0 or self.__table is None:
+            return None
+
+        (wait, rejected_by) = self.__table.acquire([(key, rule.interval, rule.tolerance) for (key, rule) in limits])
+        if rejected_by < 0:
+            return None
+
+        self.__metrics.rate_limited.inc((name, limits[rejected_by][1].key))
+        return Response(status=429, headers={"Retry-After": str(max(1, math.ceil(wait)))})
+
+
+def register_rate_limit(app: Flask, rate_limiter: RateLimiter) -> None:
+    """Check the limits before authentication from `before_request` hook
+
+    Limits of authenticated users are checked by core.auth decorators.
+
+    Args:
+        app (Flask): application
+        rate_limiter (RateLimiter): rate limiter
+    """
+
+    if not rate_limiter.enabled:
+        return
+
+    @app.before_request
+    def limit_request() -> t.Optional[Response]:
+        return rate_limiter.limit_request()
+
+    return
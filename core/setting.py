@@ -6,15 +6,115 @@ import argparse
 import typing as t
 
 
+def resolve_path(path: str) -> str:
+    """Resolve relative path from the project root
+
+    Args:
+        path (str): absolute path or path relative to the project root
+
+    Returns:
+        str: absolute path
+    """
+
+    if os.path.isabs(path):
+        return path
+
+    root_dir_path = str(pathlib.Path(__file__).parent.parent)
+    return os.path.normpath(os.path.join(root_dir_path, path))
+
+
 class AppSettings:
     FLASK_LISTEN_PORT_KEY = "FLASK_LISTEN_PORT"
     FLASK_URL_KEY = "FLASK_URL"
     FLASK_JWT_SECRET_KEY = "FLASK_JWT_SECRET"
+    FLASK_JWT_CACHE_SIZE_KEY = "FLASK_JWT_CACHE_SIZE"
+    FLASK_JWT_JWKS_FILE_KEY = "FLASK_JWT_JWKS_FILE"
+    FLASK_JWT_SIGNING_KID_KEY = "FLASK_JWT_SIGNING_KID"
+    FLASK_INTROSPECT_MAX_TOKENS_KEY = "FLASK_INTROSPECT_MAX_TOKENS"
+    FLASK_USER_STORE_FILE_KEY = "FLASK_USER_STORE_FILE"
+    FLASK_USER_STORE_RELOAD_INTERVAL_KEY = "FLASK_USER_STORE_RELOAD_INTERVAL"
+    FLASK_USER_DB_PATH_KEY = "FLASK_USER_DB_PATH"
+    FLASK_USER_CACHE_SIZE_KEY = "FLASK_USER_CACHE_SIZE"
+    FLASK_USER_CACHE_TTL_KEY = "FLASK_USER_CACHE_TTL"
+    FLASK_USER_CACHE_NEGATIVE_TTL_KEY = "FLASK_USER_CACHE_NEGATIVE_TTL"
+    FLASK_PASSWORD_WORKERS_KEY = "FLASK_PASSWORD_WORKERS"
+    FLASK_PASSWORD_QUEUE_SIZE_KEY = "FLASK_PASSWORD_QUEUE_SIZE"
+    FLASK_PASSWORD_QUEUE_TIMEOUT_KEY = "FLASK_PASSWORD_QUEUE_TIMEOUT"
+    FLASK_PASSWORD_CACHE_SIZE_KEY = "FLASK_PASSWORD_CACHE_SIZE"
+    FLASK_PASSWORD_CACHE_TTL_KEY = "FLASK_PASSWORD_CACHE_TTL"
+    FLASK_SIMPLE_TOKEN_CACHE_SIZE_KEY = "FLASK_SIMPLE_TOKEN_CACHE_SIZE"
+    FLASK_SIMPLE_TOKEN_CACHE_TTL_KEY = "FLASK_SIMPLE_TOKEN_CACHE_TTL"
+    FLASK_WORKERS_KEY = "FLASK_WORKERS"
+    FLASK_THREADS_KEY = "FLASK_THREADS"
+    FLASK_BACKLOG_KEY = "FLASK_BACKLOG"
+    FLASK_GRACEFUL_TIMEOUT_KEY = "FLASK_GRACEFUL_TIMEOUT"
+    FLASK_METRICS_DIR_KEY = "FLASK_METRICS_DIR"
+    FLASK_METRICS_FLUSH_INTERVAL_KEY = "FLASK_METRICS_FLUSH_INTERVAL"
+    FLASK_HEALTH_CHECK_INTERVAL_KEY = "FLASK_HEALTH_CHECK_INTERVAL"
+    FLASK_PROFILE_SAMPLE_RATE_KEY = "FLASK_PROFILE_SAMPLE_RATE"
+    FLASK_PROFILE_MODE_KEY = "FLASK_PROFILE_MODE"
+    FLASK_PROFILE_SECRET_KEY = "FLASK_PROFILE_SECRET"
+    FLASK_PROFILE_DIR_KEY = "FLASK_PROFILE_DIR"
+    FLASK_WEATHER_BATCH_MAX_COUNT_KEY = "FLASK_WEATHER_BATCH_MAX_COUNT"
+    FLASK_WEATHER_STREAM_MAX_COUNT_KEY = "FLASK_WEATHER_STREAM_MAX_COUNT"
+    FLASK_REVOCATION_DB_PATH_KEY = "FLASK_REVOCATION_DB_PATH"
+    FLASK_REVOCATION_FILTER_BITS_KEY = "FLASK_REVOCATION_FILTER_BITS"
+    FLASK_REVOCATION_SYNC_INTERVAL_KEY = "FLASK_REVOCATION_SYNC_INTERVAL"
+    FLASK_JWT_ACCESS_TOKEN_TTL_KEY = "FLASK_JWT_ACCESS_TOKEN_TTL"
+    FLASK_REFRESH_TOKEN_TTL_KEY = "FLASK_REFRESH_TOKEN_TTL"
+    FLASK_REFRESH_TOKEN_DB_PATH_KEY = "FLASK_REFRESH_TOKEN_DB_PATH"
+    FLASK_RATE_LIMIT_ENABLED_KEY = "FLASK_RATE_LIMIT_ENABLED"
+    FLASK_RATE_LIMIT_FILE_KEY = "FLASK_RATE_LIMIT_FILE"
+    FLASK_RATE_LIMIT_STATE_PATH_KEY = "FLASK_RATE_LIMIT_STATE_PATH"
+    FLASK_FAST_REJECT_ENABLED_KEY = "FLASK_FAST_REJECT_ENABLED"
+    FLASK_USER_GENERATION_PATH_KEY = "FLASK_USER_GENERATION_PATH"
 
     def __init__(self) -> None:
         self.__listen_port = 5000
         self.__url = "0.0.0.0"
         self.__jwt_secret = "my_secret_key"
+        self.__jwt_cache_size = 10000
+        self.__jwt_jwks_file = ""
+        self.__jwt_signing_kid = ""
+        self.__introspect_max_tokens = 5000
+        self.__user_store_file = ""
+        self.__user_store_reload_interval = 5.0
+        self.__user_db_path = ""
+        self.__user_cache_size = 10000
+        self.__user_cache_ttl = 60.0
+        self.__user_cache_negative_ttl = 5.0
+        self.__password_workers = 2
+        self.__password_queue_size = 64
+        self.__password_queue_timeout = 1.0
+        self.__password_cache_size = 10000
+        self.__password_cache_ttl = 60.0
+        self.__simple_token_cache_size = 10000
+        self.__simple_token_cache_ttl = 30.0
+        self.__workers = 2
+        self.__threads = 4
+        self.__backlog = 2048
+        self.__graceful_timeout = 30
+        self.__metrics_dir = ""
+        self.__metrics_flush_interval = 1.0
+        self.__health_check_interval = 5.0
+        self.__profile_sample_rate = 0.0
+        self.__profile_mode = "spans"
+        self.__profile_secret = ""
+        self.__profile_dir = "logs/profiles"
+        self.__weather_batch_max_count = 1000
+        self.__weather_stream_max_count = 1000000
+        self.__revocation_db_path = "data/revocation.sqlite"
+        self.__revocation_filter_bits = 8388608
+        self.__revocation_sync_interval = 30.0
+        self.__jwt_access_token_ttl = 3600
+        self.__refresh_token_ttl = 1209600
+        self.__refresh_token_db_path = "data/refresh_token.sqlite"
+        self.__rate_limit_enabled = True
+        self.__rate_limit_file = "settings/rate_limit.json"
+        self.__rate_limit_state_path = "data/rate_limit.state"
+        self.__fast_reject_enabled = True
+        self.__user_generation_path = "data/user.generation"
+        self.__dev_server = False
 
         return
 
@@ -48,6 +148,50 @@ class AppSettings:
         self.__listen_port = app_settings.get(self.FLASK_LISTEN_PORT_KEY, self.__listen_port)
         self.__url = app_settings.get(self.FLASK_URL_KEY, self.__url)
         self.__jwt_secret = app_settings.get(self.FLASK_JWT_SECRET_KEY, self.__jwt_secret)
+        self.__jwt_cache_size = int(app_settings.get(self.FLASK_JWT_CACHE_SIZE_KEY, self.__jwt_cache_size))
+        self.__jwt_jwks_file = app_settings.get(self.FLASK_JWT_JWKS_FILE_KEY, self.__jwt_jwks_file)
+        self.__jwt_signing_kid = app_settings.get(self.FLASK_JWT_SIGNING_KID_KEY, self.__jwt_signing_kid)
+        self.__introspect_max_tokens = int(app_settings.get(self.FLASK_INTROSPECT_MAX_TOKENS_KEY, self.__introspect_max_tokens))
+        self.__user_store_file = app_settings.get(self.FLASK_USER_STORE_FILE_KEY, self.__user_store_file)
+        self.__user_store_reload_interval = float(
+            app_settings.get(self.FLASK_USER_STORE_RELOAD_INTERVAL_KEY, self.__user_store_reload_interval))
+        self.__user_db_path = app_settings.get(self.FLASK_USER_DB_PATH_KEY, self.__user_db_path)
+        self.__user_cache_size = int(app_settings.get(self.FLASK_USER_CACHE_SIZE_KEY, self.__user_cache_size))
+        self.__user_cache_ttl = float(app_settings.get(self.FLASK_USER_CACHE_TTL_KEY, self.__user_cache_ttl))
+        self.__user_cache_negative_ttl = float(app_settings.get(self.FLASK_USER_CACHE_NEGATIVE_TTL_KEY, self.__user_cache_negative_ttl))
+        self.__password_workers = int(app_settings.get(self.FLASK_PASSWORD_WORKERS_KEY, self.__password_workers))
+        self.__password_queue_size = int(app_settings.get(self.FLASK_PASSWORD_QUEUE_SIZE_KEY, self.__password_queue_size))
+        self.__password_queue_timeout = float(app_settings.get(self.FLASK_PASSWORD_QUEUE_TIMEOUT_KEY, self.__password_queue_timeout))
+        self.__password_cache_size = int(app_settings.get(self.FLASK_PASSWORD_CACHE_SIZE_KEY, self.__password_cache_size))
+        self.__password_cache_ttl = float(app_settings.get(self.FLASK_PASSWORD_CACHE_TTL_KEY, self.__password_cache_ttl))
+        self.__simple_token_cache_size = int(app_settings.get(self.FLASK_SIMPLE_TOKEN_CACHE_SIZE_KEY, self.__simple_token_cache_size))
+        self.__simple_token_cache_ttl = float(app_settings.get(self.FLASK_SIMPLE_TOKEN_CACHE_TTL_KEY, self.__simple_token_cache_ttl))
+        self.__workers = int(app_settings.get(self.FLASK_WORKERS_KEY, self.__workers))
+        self.__threads = int(app_settings.get(self.FLASK_THREADS_KEY, self.__threads))
+        self.__backlog = int(app_settings.get(self.FLASK_BACKLOG_KEY, self.__backlog))
+        self.__graceful_timeout = int(app_settings.get(self.FLASK_GRACEFUL_TIMEOUT_KEY, self.__graceful_timeout))
+        self.__metrics_dir = app_settings.get(self.FLASK_METRICS_DIR_KEY, self.__metrics_dir)
+        self.__metrics_flush_interval = float(app_settings.get(self.FLASK_METRICS_FLUSH_INTERVAL_KEY, self.__metrics_flush_interval))
+        self.__health_check_interval = float(app_settings.get(self.FLASK_HEALTH_CHECK_INTERVAL_KEY, self.__health_check_interval))
+        self.__profile_sample_rate = float(app_settings.get(self.FLASK_PROFILE_SAMPLE_RATE_KEY, self.__profile_sample_rate))
+        self.__profile_mode = app_settings.get(self.FLASK_PROFILE_MODE_KEY, self.__profile_mode)
+        self.__profile_secret = app_settings.get(self.FLASK_PROFILE_SECRET_KEY, self.__profile_secret)
+        self.__profile_dir = app_settings.get(self.FLASK_PROFILE_DIR_KEY, self.__profile_dir)
+        self.__weather_batch_max_count = int(app_settings.get(self.FLASK_WEATHER_BATCH_MAX_COUNT_KEY, self.__weather_batch_max_count))
+        self.__weather_stream_max_count = int(app_settings.get(self.FLASK_WEATHER_STREAM_MAX_COUNT_KEY, self.__weather_stream_max_count))
+        self.__revocation_db_path = app_settings.get(self.FLASK_REVOCATION_DB_PATH_KEY, self.__revocation_db_path)
+        self.__revocation_filter_bits = int(app_settings.get(self.FLASK_REVOCATION_FILTER_BITS_KEY, self.__revocation_filter_bits))
+        self.__revocation_sync_interval = float(app_settings.get(self.FLASK_REVOCATION_SYNC_INTERVAL_KEY, self.__revocation_sync_interval))
+        self.__jwt_access_token_ttl = int(app_settings.get(self.FLASK_JWT_ACCESS_TOKEN_TTL_KEY, self.__jwt_access_token_ttl))
+        self.__refresh_token_ttl = int(app_settings.get(self.FLASK_REFRESH_TOKEN_TTL_KEY, self.__refresh_token_ttl))
+        self.__refresh_token_db_path = app_settings.get(self.FLASK_REFRESH_TOKEN_DB_PATH_KEY, self.__refresh_token_db_path)
+        self.__rate_limit_enabled = str(
+            app_settings.get(self.FLASK_RATE_LIMIT_ENABLED_KEY, self.__rate_limit_enabled)).lower() in ["1", "true", "yes"]
+        self.__rate_limit_file = app_settings.get(self.FLASK_RATE_LIMIT_FILE_KEY, self.__rate_limit_file)
+        self.__rate_limit_state_path = app_settings.get(self.FLASK_RATE_LIMIT_STATE_PATH_KEY, self.__rate_limit_state_path)
+        self.__fast_reject_enabled = str(
+            app_settings.get(self.FLASK_FAST_REJECT_ENABLED_KEY, self.__fast_reject_enabled)).lower() in ["1", "true", "yes"]
+        self.__user_generation_path = app_settings.get(self.FLASK_USER_GENERATION_PATH_KEY, self.__user_generation_path)
 
         return self
 
@@ -60,6 +204,50 @@ class AppSettings:
         self.__listen_port = os.environ.get(self.FLASK_LISTEN_PORT_KEY, self.__listen_port)
         self.__url = os.environ.get(self.FLASK_URL_KEY, self.__url)
         self.__jwt_secret = os.environ.get(self.FLASK_JWT_SECRET_KEY, self.__jwt_secret)
+        self.__jwt_cache_size = int(os.environ.get(self.FLASK_JWT_CACHE_SIZE_KEY, self.__jwt_cache_size))
+        self.__jwt_jwks_file = os.environ.get(self.FLASK_JWT_JWKS_FILE_KEY, self.__jwt_jwks_file)
+        self.__jwt_signing_kid = os.environ.get(self.FLASK_JWT_SIGNING_KID_KEY, self.__jwt_signing_kid)
+        self.__introspect_max_tokens = int(os.environ.get(self.FLASK_INTROSPECT_MAX_TOKENS_KEY, self.__introspect_max_tokens))
+        self.__user_store_file = os.environ.get(self.FLASK_USER_STORE_FILE_KEY, self.__user_store_file)
+        self.__user_store_reload_interval = float(
+            os.environ.get(self.FLASK_USER_STORE_RELOAD_INTERVAL_KEY, self.__user_store_reload_interval))
+        self.__user_db_path = os.environ.get(self.FLASK_USER_DB_PATH_KEY, self.__user_db_path)
+        self.__user_cache_size = int(os.environ.get(self.FLASK_USER_CACHE_SIZE_KEY, self.__user_cache_size))
+        self.__user_cache_ttl = float(os.environ.get(self.FLASK_USER_CACHE_TTL_KEY, self.__user_cache_ttl))
+        self.__user_cache_negative_ttl = float(os.environ.get(self.FLASK_USER_CACHE_NEGATIVE_TTL_KEY, self.__user_cache_negative_ttl))
+        self.__password_workers = int(os.environ.get(self.FLASK_PASSWORD_WORKERS_KEY, self.__password_workers))
+        self.__password_queue_size = int(os.environ.get(self.FLASK_PASSWORD_QUEUE_SIZE_KEY, self.__password_queue_size))
+        self.__password_queue_timeout = float(os.environ.get(self.FLASK_PASSWORD_QUEUE_TIMEOUT_KEY, self.__password_queue_timeout))
+        self.__password_cache_size = int(os.environ.get(self.FLASK_PASSWORD_CACHE_SIZE_KEY, self.__password_cache_size))
+        self.__password_cache_ttl = float(os.environ.get(self.FLASK_PASSWORD_CACHE_TTL_KEY, self.__password_cache_ttl))
+        self.__simple_token_cache_size = int(os.environ.get(self.FLASK_SIMPLE_TOKEN_CACHE_SIZE_KEY, self.__simple_token_cache_size))
+        self.__simple_token_cache_ttl = float(os.environ.get(self.FLASK_SIMPLE_TOKEN_CACHE_TTL_KEY, self.__simple_token_cache_ttl))
+        self.__workers = int(os.environ.get(self.FLASK_WORKERS_KEY, self.__workers))
+        self.__threads = int(os.environ.get(self.FLASK_THREADS_KEY, self.__threads))
+        self.__backlog = int(os.environ.get(self.FLASK_BACKLOG_KEY, self.__backlog))
+        self.__graceful_timeout = int(os.environ.get(self.FLASK_GRACEFUL_TIMEOUT_KEY, self.__graceful_timeout))
+        self.__metrics_dir = os.environ.get(self.FLASK_METRICS_DIR_KEY, self.__metrics_dir)
+        self.__metrics_flush_interval = float(os.environ.get(self.FLASK_METRICS_FLUSH_INTERVAL_KEY, self.__metrics_flush_interval))
+        self.__health_check_interval = float(os.environ.get(self.FLASK_HEALTH_CHECK_INTERVAL_KEY, self.__health_check_interval))
+        self.__profile_sample_rate = float(os.environ.get(self.FLASK_PROFILE_SAMPLE_RATE_KEY, self.__profile_sample_rate))
+        self.__profile_mode = os.environ.get(self.FLASK_PROFILE_MODE_KEY, self.__profile_mode)
+        self.__profile_secret = os.environ.get(self.FLASK_PROFILE_SECRET_KEY, self.__profile_secret)
+        self.__profile_dir = os.environ.get(self.FLASK_PROFILE_DIR_KEY, self.__profile_dir)
+        self.__weather_batch_max_count = int(os.environ.get(self.FLASK_WEATHER_BATCH_MAX_COUNT_KEY, self.__weather_batch_max_count))
+        self.__weather_stream_max_count = int(os.environ.get(self.FLASK_WEATHER_STREAM_MAX_COUNT_KEY, self.__weather_stream_max_count))
+        self.__revocation_db_path = os.environ.get(self.FLASK_REVOCATION_DB_PATH_KEY, self.__revocation_db_path)
+        self.__revocation_filter_bits = int(os.environ.get(self.FLASK_REVOCATION_FILTER_BITS_KEY, self.__revocation_filter_bits))
+        self.__revocation_sync_interval = float(os.environ.get(self.FLASK_REVOCATION_SYNC_INTERVAL_KEY, self.__revocation_sync_interval))
+        self.__jwt_access_token_ttl = int(os.environ.get(self.FLASK_JWT_ACCESS_TOKEN_TTL_KEY, self.__jwt_access_token_ttl))
+        self.__refresh_token_ttl = int(os.environ.get(self.FLASK_REFRESH_TOKEN_TTL_KEY, self.__refresh_token_ttl))
+        self.__refresh_token_db_path = os.environ.get(self.FLASK_REFRESH_TOKEN_DB_PATH_KEY, self.__refresh_token_db_path)
+        self.__rate_limit_enabled = str(
+            os.environ.get(self.FLASK_RATE_LIMIT_ENABLED_KEY, self.__rate_limit_enabled)).lower() in ["1", "true", "yes"]
+        self.__rate_limit_file = os.environ.get(self.FLASK_RATE_LIMIT_FILE_KEY, self.__rate_limit_file)
+        self.__rate_limit_state_path = os.environ.get(self.FLASK_RATE_LIMIT_STATE_PATH_KEY, self.__rate_limit_state_path)
+        self.__fast_reject_enabled = str(
+            os.environ.get(self.FLASK_FAST_REJECT_ENABLED_KEY, self.__fast_reject_enabled)).lower() in ["1", "true", "yes"]
+        self.__user_generation_path = os.environ.get(self.FLASK_USER_GENERATION_PATH_KEY, self.__user_generation_path)
 
         return self
 
@@ -72,14 +260,23 @@ class AppSettings:
 
         parser.add_argument("-P", "--port", type=int, default=self.__listen_port, help="server listen port")
         parser.add_argument("-U", "--url", type=str, default=self.__url, help="server publical url address")
+        parser.add_argument("-W", "--workers", type=int, default=self.__workers, help="count of server worker processes")
+        parser.add_argument("-T", "--threads", type=int, default=self.__threads, help="count of request threads per worker")
+        parser.add_argument("--backlog", type=int, default=self.__backlog, help="max count of pending connections")
+        parser.add_argument("--dev", action="store_true", help="run Flask development server (debug mode)")
 
-        args = parser.parse_args()
+        # args of other commands (like gunicorn) are ignored
+        (args, _) = parser.parse_known_args()
         arg_listen_port: int = args.port
         arg_url: str = args.url
 
         # Update settings
         self.__listen_port = arg_listen_port
         self.__url = arg_url
+        self.__workers = args.workers
+        self.__threads = args.threads
+        self.__backlog = args.backlog
+        self.__dev_server = args.dev
 
         return self
 
@@ -105,6 +302,301 @@ class AppSettings:
         """
         return self.__jwt_secret
 
+    @property
+    def jwt_cache_size(self) -> int:
+        """
+        Max count of verified JWT kept in memory
+        """
+        return self.__jwt_cache_size
+
+    @property
+    def jwt_jwks_file(self) -> str:
+        """
+        JWKS file of the keys to sign and verify JWT (empty: FLASK_JWT_SECRET only)
+        """
+        return self.__jwt_jwks_file
+
+    @property
+    def jwt_signing_kid(self) -> str:
+        """
+        Key id used to sign new JWT (empty: FLASK_JWT_SECRET)
+        """
+        return self.__jwt_signing_kid
+
+    @property
+    def introspect_max_tokens(self) -> int:
+        """
+        Max count of tokens in a request of token introspection
+        """
+        return self.__introspect_max_tokens
+
+    @property
+    def user_store_file(self) -> str:
+        """
+        User file (.csv/.jsonl/.sqlite) loaded into memory (empty: built-in users)
+        """
+        return self.__user_store_file
+
+    @property
+    def user_store_reload_interval(self) -> float:
+        """
+        Interval (seconds) to check the user file is updated (0: never reload)
+        """
+        return self.__user_store_reload_interval
+
+    @property
+    def user_db_path(self) -> str:
+        """
+        SQLite database file of users (empty: not used)
+        """
+        return self.__user_db_path
+
+    @property
+    def user_cache_size(self) -> int:
+        """
+        Max count of users cached in front of the user repository (0: no cache)
+        """
+        return self.__user_cache_size
+
+    @property
+    def user_cache_ttl(self) -> float:
+        """
+        Lifetime (seconds) of a cached user
+        """
+        return self.__user_cache_ttl
+
+    @property
+    def user_cache_negative_ttl(self) -> float:
+        """
+        Lifetime (seconds) of a cached unknown username
+        """
+        return self.__user_cache_negative_ttl
+
+    @property
+    def password_workers(self) -> int:
+        """
+        Count of worker processes to hash and verify passwords (0: in request thread)
+        """
+        return self.__password_workers
+
+    @property
+    def password_queue_size(self) -> int:
+        """
+        Max count of password verifications running or waiting
+        """
+        return self.__password_queue_size
+
+    @property
+    def password_queue_timeout(self) -> float:
+        """
+        Seconds to wait for a free slot of password verification
+        """
+        return self.__password_queue_timeout
+
+    @property
+    def password_cache_size(self) -> int:
+        """
+        Max count of recently verified credentials
+        """
+        return self.__password_cache_size
+
+    @property
+    def password_cache_ttl(self) -> float:
+        """
+        Lifetime (seconds) of a verified credential
+        """
+        return self.__password_cache_ttl
+
+    @property
+    def simple_token_cache_size(self) -> int:
+        """
+        Max count of verified simple tokens kept in memory (as digest)
+        """
+        return self.__simple_token_cache_size
+
+    @property
+    def simple_token_cache_ttl(self) -> float:
+        """
+        Lifetime (seconds) of a verified simple token
+        """
+        return self.__simple_token_cache_ttl
+
+    @property
+    def workers(self) -> int:
+        """
+        Count of server worker processes
+        """
+        return self.__workers
+
+    @property
+    def threads(self) -> int:
+        """
+        Count of request threads per worker process
+        """
+        return self.__threads
+
+    @property
+    def backlog(self) -> int:
+        """
+        Max count of pending connections
+        """
+        return self.__backlog
+
+    @property
+    def graceful_timeout(self) -> int:
+        """
+        Seconds to finish running requests at shutdown
+        """
+        return self.__graceful_timeout
+
+    @property
+    def metrics_dir(self) -> str:
+        """
+        Directory of metric files shared by worker processes (empty: temporary directory)
+        """
+        return self.__metrics_dir
+
+    @property
+    def metrics_flush_interval(self) -> float:
+        """
+        Seconds between writes of metrics of a worker process to its metric file
+        """
+        return self.__metrics_flush_interval
+
+    @property
+    def health_check_interval(self) -> float:
+        """
+        Seconds between health checks of readiness probe
+        """
+        return self.__health_check_interval
+
+    @property
+    def profile_sample_rate(self) -> float:
+        """
+        Fraction of requests to profile (0: only requests with a signed profile header)
+        """
+        return self.__profile_sample_rate
+
+    @property
+    def profile_mode(self) -> str:
+        """
+        Output of profiled requests
+        ("spans": span timings to the profile log, "cprofile": cProfile stats file, "stack": collapsed stack file)
+        """
+        return self.__profile_mode
+
+    @property
+    def profile_secret(self) -> str:
+        """
+        Secret to sign X-Profile header (empty: the header is ignored)
+        """
+        return self.__profile_secret
+
+    @property
+    def profile_dir(self) -> str:
+        """
+        Directory of profile files
+        """
+        return self.__profile_dir
+
+    @property
+    def weather_batch_max_count(self) -> int:
+        """
+        Maximum count of weather datas in a JSON array response of the batch endpoint
+        """
+        return self.__weather_batch_max_count
+
+    @property
+    def weather_stream_max_count(self) -> int:
+        """
+        Maximum count of weather datas in a streamed (NDJSON) response of the batch endpoint
+        """
+        return self.__weather_stream_max_count
+
+    @property
+    def revocation_db_path(self) -> str:
+        """
+        Path of SQLite database of revoked JWT (the shared filter is created next to it with .bloom extension)
+        """
+        return self.__revocation_db_path
+
+    @property
+    def revocation_filter_bits(self) -> int:
+        """
+        Bits of the shared revocation filter (10 bits per revoked token for 1% false positives)
+        """
+        return self.__revocation_filter_bits
+
+    @property
+    def revocation_sync_interval(self) -> float:
+        """
+        Seconds to rebuild the revocation filter from the database (drops expired entries and adds revocations written by other tools)
+        """
+        return self.__revocation_sync_interval
+
+    @property
+    def jwt_access_token_ttl(self) -> int:
+        """
+        Lifetime (seconds) of JWT access token
+        """
+        return self.__jwt_access_token_ttl
+
+    @property
+    def refresh_token_ttl(self) -> int:
+        """
+        Lifetime (seconds) of refresh token (each rotation issues a new one with full lifetime)
+        """
+        return self.__refresh_token_ttl
+
+    @property
+    def refresh_token_db_path(self) -> str:
+        """
+        Path of SQLite database of refresh tokens
+        """
+        return self.__refresh_token_db_path
+
+    @property
+    def rate_limit_enabled(self) -> bool:
+        """
+        Limit request rates by the rules of `FLASK_RATE_LIMIT_FILE`
+        """
+        return self.__rate_limit_enabled
+
+    @property
+    def rate_limit_file(self) -> str:
+        """
+        Path of rate limit rules per blueprint
+        """
+        return self.__rate_limit_file
+
+    @property
+    def rate_limit_state_path(self) -> str:
+        """
+        Path of the file of rate limit state shared by worker processes
+        """
+        return self.__rate_limit_state_path
+
+    @property
+    def fast_reject_enabled(self) -> bool:
+        """
+        Answer unknown paths and protected requests without Authorization header before dispatch
+        """
+        return self.__fast_reject_enabled
+
+    @property
+    def user_generation_path(self) -> str:
+        """
+        Path of the file of user change generations shared by worker processes and the user CLI (drops cached users and tokens)
+        """
+        return self.__user_generation_path
+
+    @property
+    def dev_server(self) -> bool:
+        """
+        Run Flask development server instead of production server
+        """
+        return self.__dev_server
+
 
 class SettingLoader:
     app_settings = AppSettings()
@@ -2,9 +2,9 @@ class User:
     """user model
     """
 
-    def __init__(self, username: str, password: str) -> None:
+    def __init__(self, username: str, password_hash: str) -> None:
         self.__username = username
-        self.__password = password
+        self.__password_hash = password_hash
 
         return
 
@@ -13,5 +13,10 @@ class User:
         return self.__username
 
     @property
-    def password(self):
-        return self.__password
+    def password_hash(self):
+        """Stored password hash
+
+        "<scheme>$<parameters...>$<salt>$<hash>" (see services.password_service).
+        A value without known scheme is a legacy raw password, and it's upgraded at the next login.
+        """
+        return self.__password_hash
@@ -1,6 +1,14 @@
+import array
+import json
 import random
 import typing as t
 
+try:
+    import numpy
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
 
 class Weather:
     SUNNY = "sunny"
@@ -8,6 +16,8 @@ class Weather:
     WINDY = "windy"
     RAINY = "rainy"
 
+    FORECASTS = (SUNNY, CLOUDY, WINDY, RAINY)
+
     def __init__(self, temperature: t.Optional[float] = None, forecast: t.Optional[str] = None) -> None:
         if temperature is None:
             temperature = round(random.uniform(0.0, 35.0), 1)
@@ -16,9 +26,7 @@ class Weather:
         self.__temperature = temperature
 
         if forecast is None:
-            table = [self.SUNNY, self.CLOUDY, self.WINDY, self.RAINY]
-            index = random.randint(0, len(table) - 1)
-            forecast = table[index]
+            forecast = random.choice(self.FORECASTS)
             pass
 
         self.__forecast = forecast
@@ -42,3 +50,113 @@ class Weather:
     def forecast(self, value: str):
         self.__forecast = value
         return
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        """Fields of the response (encoded by core.json_provider)
+        """
+
+        return {"temperature": self.__temperature, "forecast": self.__forecast}
+
+
+def to_list(values: t.Sequence) -> t.List:
+    # values of numpy arrays and array.array are converted to Python numbers at once
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+class WeatherBatch:
+    """Columnar weather datas
+
+    Temperatures are a float array, and forecasts are codes (indexes of `forecasts` table) in a small int array.
+    They're numpy arrays when generated with numpy, otherwise `array.array`.
+    The batch is encoded to JSON without creating a Weather per data.
+    """
+
+    def __init__(
+            self, temperatures: t.Sequence[float], forecast_codes: t.Sequence[int], forecasts: t.Sequence[str] = Weather.FORECASTS) -> None:
+        if len(temperatures) != len(forecast_codes):
+            raise Exception("temperatures and forecast codes have different lengths.")
+
+        self.__temperatures = temperatures
+        self.__forecast_codes = forecast_codes
+        self.__forecasts = tuple(forecasts)
+        return
+
+    @property
+    def temperatures(self) -> t.Sequence[float]:
+        return self.__temperatures
+
+    @property
+    def forecast_codes(self) -> t.Sequence[int]:
+        return self.__forecast_codes
+
+    @property
+    def forecasts(self) -> t.Tuple[str, ...]:
+        return self.__forecasts
+
+    def __len__(self) -> int:
+        return len(self.__temperatures)
+
+    def __iter__(self) -> t.Iterator[Weather]:
+        for (temperature, code) in zip(to_list(self.__temperatures), to_list(self.__forecast_codes)):
+            yield Weather(temperature=temperature, forecast=self.__forecasts[code])
+
+    def encode_objects(self) -> t.List[str]:
+        """JSON object of each weather data
+        """
+
+        # the keys and forecasts are encoded once, floats by repr like json module
+        forecasts = [json.dumps(forecast) for forecast in self.__forecasts]
+        return [
+            f'{{"temperature":{temperature!r},"forecast":{forecasts[code]}}}'
+            for (temperature, code) in zip(to_list(self.__temperatures), to_list(self.__forecast_codes))
+        ]
+
+    def to_json(self) -> str:
+        """JSON array
+        """
+
+        return "[" + ",".join(self.encode_objects()) + "]"
+
+    def to_ndjson(self) -> str:
+        """NDJSON (a JSON object per line, with the last newline)
+        """
+
+        if len(self) == 0:
+            return ""
+
+        return "\n".join(self.encode_objects()) + "\n"
+
+
+class WeatherGenerator:
+    """Generator of random weather batches
+
+    Values are drawn in bulk by numpy (when it's installed and use_numpy is True) or by `random.Random`.
+    The same seed generates the same batches with the same implementation, but numpy and `random.Random`
+    generate different batches from the same seed.
+    """
+
+    MAX_TEMPERATURE = 35.0
+
+    def __init__(self, seed: t.Optional[int] = None, use_numpy: bool = True) -> None:
+        self.__use_numpy = use_numpy and HAS_NUMPY
+        if self.__use_numpy:
+            self.__numpy_rng = numpy.random.default_rng(seed)
+        else:
+            self.__rng = random.Random(seed)
+
+        return
+
+    @property
+    def use_numpy(self) -> bool:
+        return self.__use_numpy
+
+    def generate(self, count: int) -> WeatherBatch:
+        if self.__use_numpy:
+            temperatures = numpy.round(self.__numpy_rng.uniform(0.0, self.MAX_TEMPERATURE, count), 1)
+            codes = self.__numpy_rng.integers(0, len(Weather.FORECASTS), count, dtype=numpy.uint8)
+            return WeatherBatch(temperatures, codes)
+
+        rng = self.__rng
+        temperatures = array.array("d", [round(rng.random() * self.MAX_TEMPERATURE, 1) for _ in range(count)])
+        codes = array.array("B", rng.choices(range(len(Weather.FORECASTS)), k=count))
+        return WeatherBatch(temperatures, codes)
@@ -0,0 +1,154 @@
+import abc
+import os
+import sqlite3
+import threading
+from injector import inject
+import typing as t
+
+from core.setting import AppSettings, resolve_path
+
+
+ROTATE_OK = "ok"
+ROTATE_INVALID = "invalid"
+ROTATE_REUSED = "reused"
+
+
+class IRefreshTokenRepository(metaclass=abc.ABCMeta):
+    """Interface of the store of refresh tokens (by hash), grouped by token family
+
+    A family is the chain of tokens rotated from one login.
+    """
+
+    @abc.abstractmethod
+    def create(self, token_hash: str, family: str, username: str, expires_at: int) -> None:
+        """Store a new (unused) token
+        """
+        pass
+
+    @abc.abstractmethod
+    def rotate(self, token_hash: str, new_token_hash: str, now: int, expires_at: int) -> t.Tuple[str, t.Optional[str]]:
+        """Mark the token used and store the next token of its family at once
+
+        A token used again is a reuse (the token was stolen, or the client is broken), and all tokens of its family are deleted.
+
+        Returns:
+            t.Tuple[str, t.Optional[str]]: (ROTATE_OK, username), (ROTATE_INVALID, None) if it's unknown or expired,
+                or (ROTATE_REUSED, username)
+        """
+        pass
+
+    @abc.abstractmethod
+    def revoke_family(self, token_hash: str, username: str) -> bool:
+        """Delete all tokens of the family of the token, if the family is of the user
+
+        Returns:
+            bool: True if deleted
+        """
+        pass
+
+    @abc.abstractmethod
+    def purge_expired(self, now: int) -> int:
+        """Delete expired tokens
+
+        Returns:
+            int: count of deleted tokens
+        """
+        pass
+
+
+class SqliteRefreshTokenRepository(IRefreshTokenRepository):
+    """Refresh tokens on SQLite database `FLASK_REFRESH_TOKEN_DB_PATH`
+
+    Each thread (and each forked worker process) has its own connection, and the database runs in WAL mode.
+    Rotation runs in an immediate transaction, so a token is rotated once even if it's presented to two workers at once.
+    """
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS refresh_tokens ("
+        "token_hash TEXT PRIMARY KEY NOT NULL, family TEXT NOT NULL, username TEXT NOT NULL, "
+        "expires_at INTEGER NOT NULL, used INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS refresh_tokens_family ON refresh_tokens (family)",
+        "CREATE INDEX IF NOT EXISTS refresh_tokens_expires_at ON refresh_tokens (expires_at)",
+    ]
+
+    INSERT = "INSERT INTO refresh_tokens (token_hash, family, username, expires_at) VALUES (?, ?, ?, ?)"
+    SELECT = "SELECT family, username, expires_at, used FROM refresh_tokens WHERE token_hash = ?"
+    MARK_USED = "UPDATE refresh_tokens SET used = 1 WHERE token_hash = ?"
+    DELETE_FAMILY = "DELETE FROM refresh_tokens WHERE family = ?"
+    DELETE_EXPIRED = "DELETE FROM refresh_tokens WHERE expires_at < ?"
+
+    @inject
+    def __init__(self, app_settings: AppSettings) -> None:
+        self.__path = resolve_path(app_settings.refresh_token_db_path)
+        self.__local = threading.local()
+
+        os.makedirs(os.path.dirname(self.__path), exist_ok=True)
+
+        connection = self.connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        for statement in self.SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+
+        return
+
+    def connection(self) -> sqlite3.Connection:
+        """Get the connection of current thread
+        """
+
+        connection: t.Optional[sqlite3.Connection] = getattr(self.__local, "connection", None)
+
+        # a connection opened before fork must not be used in the child process
+        if connection is None or self.__local.pid != os.getpid():
+            # transactions are begun explicitly
+            connection = sqlite3.connect(self.__path, timeout=30.0, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.__local.connection = connection
+            self.__local.pid = os.getpid()
+            pass
+
+        return connection
+
+    def create(self, token_hash: str, family: str, username: str, expires_at: int) -> None:
+        self.connection().execute(self.INSERT, (token_hash, family, username, expires_at))
+        return
+
+    def rotate(self, token_hash: str, new_token_hash: str, now: int, expires_at: int) -> t.Tuple[str, t.Optional[str]]:
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(self.SELECT, (token_hash,)).fetchone()
+            if row is None or row[2] < now:
+                result: t.Tuple[str, t.Optional[str]] = (ROTATE_INVALID, None)
+            elif row[3]:
+                connection.execute(self.DELETE_FAMILY, (row[0],))
+                result = (ROTATE_REUSED, row[1])
+            else:
+                connection.execute(self.MARK_USED, (token_hash,))
+                connection.execute(self.INSERT, (new_token_hash, row[0], row[1], expires_at))
+                result = (ROTATE_OK, row[1])
+
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        return result
+
+    def revoke_family(self, token_hash: str, username: str) -> bool:
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(self.SELECT, (token_hash,)).fetchone()
+            revoked = row is not None and row[1] == username
+            if revoked:
+                connection.execute(self.DELETE_FAMILY, (row[0],))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        return revoked
+
+    def purge_expired(self, now: int) -> int:
+        return self.connection().execute(self.DELETE_EXPIRED, (now,)).rowcount
@@ -0,0 +1,131 @@
+import abc
+import os
+import sqlite3
+import threading
+from injector import inject
+import typing as t
+
+from core.setting import AppSettings, resolve_path
+
+
+class IRevocationRepository(metaclass=abc.ABCMeta):
+    """Interface of the store of revoked JWT ids (jti)
+    """
+
+    @abc.abstractmethod
+    def revoke(self, jti: str, exp: int) -> None:
+        """Store revoked token id
+
+        Args:
+            jti (str): token id
+            exp (int): unix timestamp at the token expires (the entry is not needed after it)
+        """
+        pass
+
+    @abc.abstractmethod
+    def is_revoked(self, jti: str, now: float) -> bool:
+        """Check if the token id is revoked and not expired
+        """
+        pass
+
+    @abc.abstractmethod
+    def active_jtis(self, now: float) -> t.Iterator[str]:
+        """Iterate revoked token ids which are not expired
+        """
+        pass
+
+    @abc.abstractmethod
+    def purge_expired(self, now: float) -> int:
+        """Delete entries of expired tokens
+
+        Returns:
+            int: count of deleted entries
+        """
+        pass
+
+    def ping(self) -> None:
+        """Check that the store is reachable (raise Exception if not)
+        """
+        return
+
+
+class SqliteRevocationRepository(IRevocationRepository):
+    """Revoked token ids on SQLite database `FLASK_REVOCATION_DB_PATH`
+
+    Each thread (and each forked worker process) has its own connection, and the database runs in WAL mode.
+    """
+
+    SCHEMA = "CREATE TABLE IF NOT EXISTS revoked_tokens (jti TEXT PRIMARY KEY NOT NULL, exp INTEGER NOT NULL) WITHOUT ROWID"
+    INDEX = "CREATE INDEX IF NOT EXISTS revoked_tokens_exp ON revoked_tokens (exp)"
+
+    UPSERT = "INSERT OR REPLACE INTO revoked_tokens (jti, exp) VALUES (?, ?)"
+    SELECT = "SELECT 1 FROM revoked_tokens WHERE jti = ? AND exp >= ?"
+    SELECT_ACTIVE = "SELECT jti FROM revoked_tokens WHERE exp >= ?"
+    DELETE_EXPIRED = "DELETE FROM revoked_tokens WHERE exp < ?"
+    PING = "SELECT 1 FROM revoked_tokens LIMIT 1"
+
+    @inject
+    def __init__(self, app_settings: AppSettings) -> None:
+        self.__path = resolve_path(app_settings.revocation_db_path)
+        self.__local = threading.local()
+
+        os.makedirs(os.path.dirname(self.__path), exist_ok=True)
+
+        connection = self.connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(self.SCHEMA)
+        connection.execute(self.INDEX)
+        connection.commit()
+
+        return
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    def connection(self) -> sqlite3.Connection:
+        """Get the connection of current thread
+        """
+
+        connection: t.Optional[sqlite3.Connection] = getattr(self.__local, "connection", None)
+
+        # a connection opened before fork must not be used in the child process
+        if connection is None or self.__local.pid != os.getpid():
+            connection = sqlite3.connect(self.__path, timeout=30.0)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.__local.connection = connection
+            self.__local.pid = os.getpid()
+            pass
+
+        return connection
+
+    def revoke(self, jti: str, exp: int) -> None:
+        connection = self.connection()
+        with connection:
+            connection.execute(self.UPSERT, (jti, exp))
+        return
+
+    def is_revoked(self, jti: str, now: float) -> bool:
+        return self.connection().execute(self.SELECT, (jti, int(now))).fetchone() is not None
+
+    def active_jtis(self, now: float) -> t.Iterator[str]:
+        cursor = self.connection().execute(self.SELECT_ACTIVE, (int(now),))
+        while True:
+            rows = cursor.fetchmany(10000)
+            if len(rows) == 0:
+                break
+
+            for (jti,) in rows:
+                yield jti
+
+        return
+
+    def purge_expired(self, now: float) -> int:
+        connection = self.connection()
+        with connection:
+            cursor = connection.execute(self.DELETE_EXPIRED, (int(now),))
+        return cursor.rowcount
+
+    def ping(self) -> None:
+        self.connection().execute(self.PING).fetchone()
+        return
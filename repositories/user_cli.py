@@ -0,0 +1,85 @@
+"""Bulk import/export of the SQLite user repository
+
+    python -m repositories.user_cli import users.csv
+    python -m repositories.user_cli export users.jsonl
+
+The database is `FLASK_USER_DB_PATH` of the settings, or --db.
+Files are .csv (header: username,password_hash) or .jsonl ({"username", "password_hash"} per line).
+On import, "password" field is read as a legacy raw password, and it's hashed at the user's next login.
+Users and simple tokens cached by running servers on the host are dropped after an import (by `FLASK_USER_GENERATION_PATH`).
+"""
+import argparse
+import csv
+import json
+import os
+from logging import getLogger
+
+from core.logger import LoggerBuilder
+from core.setting import AppSettings
+from repositories.user_repos import SqliteUserRepository, UserChangeNotifier, UserGenerations, read_user_file
+
+
+def write_users(path: str, repos: SqliteUserRepository) -> int:
+    """Write all users to the file
+
+    Returns:
+        int: count of exported users
+    """
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in [".csv", ".jsonl"]:
+        raise Exception(f"unsupported user file : {path}")
+
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f) if ext == ".csv" else None
+        if writer is not None:
+            writer.writerow(["username", "password_hash"])
+
+        for user in repos.export_users():
+            if writer is not None:
+                writer.writerow([user.username, user.password_hash])
+            else:
+                f.write(json.dumps({"username": user.username, "password_hash": user.password_hash}) + "\n")
+            count += 1
+
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["import", "export"], help="import users from file, or export users to file")
+    parser.add_argument("file", type=str, help="user file (.csv or .jsonl)")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database file (default: FLASK_USER_DB_PATH)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="count of users per transaction on import")
+    args = parser.parse_args()
+
+    if args.db is not None:
+        os.environ[AppSettings.FLASK_USER_DB_PATH_KEY] = args.db
+
+    app_settings = AppSettings().load_setting_file().load_environment()
+    if not app_settings.user_db_path:
+        raise Exception(f"'{AppSettings.FLASK_USER_DB_PATH_KEY}' is not set.")
+
+    LoggerBuilder.setup()
+    logger = getLogger("production")
+
+    # an import bumps the shared generations, so running servers on the host drop cached users and tokens
+    notifier = UserChangeNotifier()
+    generations = UserGenerations(app_settings=app_settings, notifier=notifier)
+    repos = SqliteUserRepository(logger=logger, app_settings=app_settings, notifier=notifier)
+
+    if args.command == "import":
+        repos.import_users(read_user_file(args.file), chunk_size=args.chunk_size)
+    else:
+        count = write_users(args.file, repos)
+        logger.info("exported %d users to '%s'", count, args.file)
+
+    repos.close()
+    generations.close()
+
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,102 @@
 import abc
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+from logging import Logger
+from injector import inject
 import typing as t
 
+from core.cache import TtlCache
+from core.generation import SharedGenerationTable
+from core.metrics import AppMetrics
+from core.setting import AppSettings, resolve_path
 from models.user import User
 
 
+def read_user_file(path: str) -> t.Iterator[t.Tuple[str, str]]:
+    """Iterate (username, password_hash) of the user file
+
+    Args:
+        path (str): .csv (header: username,password_hash) or .jsonl ({"username", "password_hash"} per line).
+            "password" field is read as a legacy raw password
+    """
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in [".csv", ".jsonl"]:
+        raise Exception(f"unsupported user file : {path}")
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if ext == ".csv":
+            for row in csv.DictReader(f):
+                yield (row["username"], row.get("password_hash", row.get("password")))
+        else:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                yield (row["username"], row.get("password_hash", row.get("password")))
+
+    return
+
+
+class UserChangeNotifier:
+    """Notify that credentials of users are changed
+
+    Caches derived from credentials subscribe it to drop their entries.
+    """
+
+    def __init__(self) -> None:
+        self.__callbacks: t.List[t.Callable[[t.Optional[str]], None]] = []
+        return
+
+    def subscribe(self, callback: t.Callable[[t.Optional[str]], None]) -> None:
+        """Add callback called with the changed username (None if any user may be changed)
+        """
+
+        self.__callbacks.append(callback)
+        return
+
+    def notify(self, username: t.Optional[str]) -> None:
+        """Notify that the user is changed
+
+        Args:
+            username (t.Optional[str]): changed username. None if any user may be changed
+        """
+
+        for callback in self.__callbacks:
+            callback(username)
+
+        return
+
+
+class UserGenerations:
+    """Generations of users shared by processes on the host (`FLASK_USER_GENERATION_PATH`)
+
+    A change notified in any process (a worker or the user CLI) bumps the generation of the user,
+    so caches of every process drop entries made before it by comparing generations.
+    """
+
+    SLOTS = 65536
+
+    @inject
+    def __init__(self, app_settings: AppSettings, notifier: UserChangeNotifier) -> None:
+        self.__table = SharedGenerationTable(resolve_path(app_settings.user_generation_path), self.SLOTS)
+        notifier.subscribe(self.__table.bump)
+        return
+
+    def get(self, username: str) -> t.Tuple[int, int]:
+        """Current generation of the user (compare it with the generation of a cached entry)
+        """
+        return self.__table.get(username)
+
+    def close(self) -> None:
+        self.__table.close()
+        return
+
+
 class IUserRepository(metaclass=abc.ABCMeta):
     """User repository interface (database client)
     """
@@ -20,25 +113,472 @@ class IUserRepository(metaclass=abc.ABCMeta):
         """
         pass
 
+    @abc.abstractmethod
+    def update_password_hash(self, username: str, password_hash: str) -> None:
+        """Replace password hash of the user
+
+        Args:
+            username (str): unique name of user
+            password_hash (str): new password hash
+        """
+        pass
+
+    def ping(self) -> None:
+        """Check the repository is reachable (in-memory repositories always are)
+
+        Raises:
+            Exception: the repository is not reachable
+        """
+        return
+
 
 class TempUserRepository(IUserRepository):
     """Temporary user repository
     """
 
     temp_users = [
+        # password: admin
         # curl <url> -H "Authorization:YWRtaW46YWRtaW4="
-        User(username="admin", password="admin"),
+        User(username="admin", password_hash="scrypt$16384$8$1$lQ4knNuauBAbNI6Po//B3w$jom91IPpcaJHhd5/9H8PAQNpce6XrXK7G5VkCqQRvd4"),
 
+        # password: temp
         # curl <url> -H "Authorization:ZXhhbXBsZTp0ZW1w"
-        User(username="example", password="temp")
+        User(username="example", password_hash="scrypt$16384$8$1$hsk8w+NXJV8IMIEDd43a3Q$V3n50aE56CMPjBoDUA7ZCg25xQi3yjgS+JfhKyJl0gE")
     ]
 
-    def __init__(self) -> None:
+    @inject
+    def __init__(self, notifier: UserChangeNotifier) -> None:
+        self.__notifier = notifier
+
+        # username -> user (per instance, updated hashes are not shared with other instances)
+        self.__index: t.Dict[str, User] = {user.username: user for user in self.temp_users}
+
+        return
+
+    def get_first_user(self, username: str) -> t.Optional[User]:
+        return self.__index.get(username)
+
+    def update_password_hash(self, username: str, password_hash: str) -> None:
+        if username in self.__index:
+            self.__index[username] = User(username=username, password_hash=password_hash)
+            self.__notifier.notify(username)
+
+        return
+
+
+class IndexedUserRepository(IUserRepository):
+    """In-memory user repository indexed by username
+
+    Users are loaded in bulk from `FLASK_USER_STORE_FILE` (.csv, .jsonl or .sqlite).
+    When the file is updated, a new index is built in a background thread and swapped in at once,
+    so lookups never wait for reloading.
+    """
+
+    @inject
+    def __init__(self, logger: Logger, app_settings: AppSettings, notifier: UserChangeNotifier) -> None:
+        self.__logger = logger
+        self.__notifier = notifier
+        self.__path = resolve_path(app_settings.user_store_file)
+        self.__reload_interval = app_settings.user_store_reload_interval
+
+        self.__reload_lock = threading.Lock()
+        self.__loaded_mtime = os.stat(self.__path).st_mtime
+        self.__index: t.Dict[str, User] = self.load_users(self.__path)
+        self.__next_check_at = time.monotonic() + self.__reload_interval
+
+        self.__logger.info("loaded %d users from '%s'", len(self.__index), self.__path)
+
+        return
+
+    def get_first_user(self, username: str) -> t.Optional[User]:
+        if self.__reload_interval > 0 and time.monotonic() >= self.__next_check_at:
+            self.__start_reload()
+
+        return self.__index.get(username)
+
+    def update_password_hash(self, username: str, password_hash: str) -> None:
+        # only in memory. the file is the source of users, so it's back at the next reload
+        if username in self.__index:
+            self.__index[username] = User(username=username, password_hash=password_hash)
+            self.__notifier.notify(username)
+
+        return
+
+    @property
+    def count(self) -> int:
+        """Count of loaded users
+        """
+        return len(self.__index)
+
+    def reload(self) -> bool:
+        """Reload users if the file is updated
+
+        Returns:
+            bool: True if the users are reloaded
+        """
+
+        if not self.__reload_lock.acquire(blocking=False):
+            # another thread is reloading
+            return False
+
+        try:
+            self.__next_check_at = time.monotonic() + self.__reload_interval
+
+            mtime = os.stat(self.__path).st_mtime
+            if mtime == self.__loaded_mtime:
+                return False
+
+            index = self.load_users(self.__path)
+
+            # replacing the reference is atomic, so readers see either the old or the new index
+            self.__index = index
+            self.__loaded_mtime = mtime
+        except Exception as e:
+            self.__logger.error("reload users error : %s", e)
+            return False
+        finally:
+            self.__reload_lock.release()
+
+        self.__logger.info("reloaded %d users from '%s'", len(index), self.__path)
+        self.__notifier.notify(None)
+
+        return True
+
+    def __start_reload(self) -> None:
+        # checked again here, so only one thread per interval starts reloading
+        if self.__reload_lock.locked():
+            return
+
+        self.__next_check_at = time.monotonic() + self.__reload_interval
+        threading.Thread(target=self.reload, name="user-store-reload", daemon=True).start()
+
+        return
+
+    @classmethod
+    def load_users(self, path: str) -> t.Dict[str, User]:
+        """Load users from file
+
+        Args:
+            path (str): .csv (header: username,password_hash), .jsonl ({"username", "password_hash"} per line)
+                or .sqlite/.db (table: users(username, password_hash))
+
+        Returns:
+            t.Dict[str, User]: username -> user
+        """
+
+        ext = os.path.splitext(path)[1].lower()
+        index: t.Dict[str, User] = {}
+
+        if ext in [".sqlite", ".sqlite3", ".db"]:
+            connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                for (username, password_hash) in connection.execute("SELECT username, password_hash FROM users"):
+                    index[username] = User(username=username, password_hash=password_hash)
+            finally:
+                connection.close()
+        else:
+            for (username, password_hash) in read_user_file(path):
+                index[username] = User(username=username, password_hash=password_hash)
+
+        return index
+
+
+class SqliteUserRepository(IUserRepository):
+    """User repository on SQLite database `FLASK_USER_DB_PATH`
+
+    Each thread (and each forked worker process) has its own connection, and the database runs in WAL mode,
+    so lookups run concurrently with writes.
+    """
+
+    SCHEMA = "CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY NOT NULL, password_hash TEXT NOT NULL) WITHOUT ROWID"
+
+    # the same sql string is reused from the statement cache of the connection, so it's prepared once
+    SELECT_USER = "SELECT username, password_hash FROM users WHERE username = ?"
+    UPSERT_USER = "INSERT OR REPLACE INTO users (username, password_hash) VALUES (?, ?)"
+    UPDATE_PASSWORD_HASH = "UPDATE users SET password_hash = ? WHERE username = ?"
+    SELECT_USERS = "SELECT username, password_hash FROM users ORDER BY username"
+    PING = "SELECT 1 FROM users LIMIT 1"
+
+    @inject
+    def __init__(self, logger: Logger, app_settings: AppSettings, notifier: UserChangeNotifier) -> None:
+        self.__logger = logger
+        self.__notifier = notifier
+        self.__path = resolve_path(app_settings.user_db_path)
+        self.__local = threading.local()
+        self.__query_hooks: t.List[t.Callable[[str, float], None]] = []
+
+        os.makedirs(os.path.dirname(self.__path), exist_ok=True)
+
+        connection = self.connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(self.SCHEMA)
+        connection.commit()
+
+        return
+
+    def connection(self) -> sqlite3.Connection:
+        """Get the connection of current thread
+        """
+
+        connection: t.Optional[sqlite3.Connection] = getattr(self.__local, "connection", None)
+
+        # a connection opened before fork must not be used in the child process
+        if connection is None or self.__local.pid != os.getpid():
+            connection = sqlite3.connect(self.__path, timeout=30.0)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.__local.connection = connection
+            self.__local.pid = os.getpid()
+            pass
+
+        return connection
+
+    def add_query_hook(self, hook: t.Callable[[str, float], None]) -> None:
+        """Add callback called with (query name, elapsed seconds) after each query
+        """
+
+        self.__query_hooks.append(hook)
+        return
+
+    def get_first_user(self, username: str) -> t.Optional[User]:
+        started_at = time.perf_counter()
+        row = self.connection().execute(self.SELECT_USER, (username,)).fetchone()
+        self.__notify_query("get_first_user", started_at)
+
+        if row is None:
+            return None
+
+        return User(username=row[0], password_hash=row[1])
+
+    def ping(self) -> None:
+        self.connection().execute(self.PING).fetchone()
+        return
+
+    def update_password_hash(self, username: str, password_hash: str) -> None:
+        started_at = time.perf_counter()
+        connection = self.connection()
+        with connection:
+            connection.execute(self.UPDATE_PASSWORD_HASH, (password_hash, username))
+        self.__notify_query("update_password_hash", started_at)
+        self.__notifier.notify(username)
+
+        return
+
+    def import_users(self, users: t.Iterable[t.Tuple[str, str]], chunk_size: int = 10000) -> int:
+        """Insert or replace users in bulk
+
+        Args:
+            users (t.Iterable[t.Tuple[str, str]]): (username, password_hash)
+            chunk_size (int, optional): count of users per transaction. Defaults to 10000.
+
+        Returns:
+            int: count of imported users
+        """
+
+        connection = self.connection()
+        count = 0
+        chunk: t.List[t.Tuple[str, str]] = []
+
+        started_at = time.perf_counter()
+        for user in users:
+            chunk.append(user)
+            if len(chunk) >= chunk_size:
+                with connection:
+                    connection.executemany(self.UPSERT_USER, chunk)
+                count += len(chunk)
+                chunk = []
+
+        if len(chunk) > 0:
+            with connection:
+                connection.executemany(self.UPSERT_USER, chunk)
+            count += len(chunk)
+
+        self.__notify_query("import_users", started_at)
+        self.__logger.info("imported %d users into '%s'", count, self.__path)
+        self.__notifier.notify(None)
+
+        return count
+
+    def export_users(self) -> t.Iterator[User]:
+        """Iterate all users in username order
+        """
+
+        cursor = self.connection().execute(self.SELECT_USERS)
+        while True:
+            rows = cursor.fetchmany(10000)
+            if len(rows) == 0:
+                break
+
+            for (username, password_hash) in rows:
+                yield User(username=username, password_hash=password_hash)
+
+        return
+
+    def close(self) -> None:
+        """Close the connection of current thread
+        """
+
+        connection: t.Optional[sqlite3.Connection] = getattr(self.__local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.__local.connection = None
+
+        return
+
+    def __notify_query(self, name: str, started_at: float) -> None:
+        if len(self.__query_hooks) == 0:
+            return
+
+        elapsed = time.perf_counter() - started_at
+        for hook in self.__query_hooks:
+            try:
+                hook(name, elapsed)
+            except Exception as e:
+                self.__logger.error("query hook error : %s", e)
+
         return
 
+
+class CachedUserRepository(IUserRepository):
+    """Read-through cache in front of another user repository
+
+    Unknown usernames are cached too (with shorter lifetime), so a flood of unknown usernames doesn't reach the backend.
+    Concurrent lookups of the same uncached username are collapsed into one backend call.
+    Entries keep the generation of the user read before the backend lookup, so a change in any process
+    (even while the lookup runs) drops them. Lookups are counted to `cache_lookups_total` metric (cache: "user").
+    """
+
+    # marks that the username is not exist in the backend
+    NOT_FOUND = object()
+
+    def __init__(
+            self, repos: IUserRepository, app_settings: AppSettings, notifier: UserChangeNotifier,
+            generations: UserGenerations, metrics: AppMetrics) -> None:
+        self.__repos = repos
+        self.__cache = TtlCache(max_size=app_settings.user_cache_size, ttl=app_settings.user_cache_ttl)
+        self.__negative_ttl = app_settings.user_cache_negative_ttl
+        self.__generations = generations
+        self.__lookups = metrics.cache_lookups
+
+        # username -> lookup running in another thread
+        self.__inflight: t.Dict[str, "_InflightLookup"] = {}
+        self.__inflight_lock = threading.Lock()
+
+        notifier.subscribe(self.__on_user_changed)
+
+        return
+
+    @property
+    def repos(self) -> IUserRepository:
+        """Backend repository
+        """
+        return self.__repos
+
     def get_first_user(self, username: str) -> t.Optional[User]:
-        for user in self.temp_users:
-            if username == user.username:
-                return user
+        # the username is a cache key, other types never match a user
+        if not isinstance(username, str):
+            return None
+
+        entry = self.__cache.get(username)
+        if entry is not None:
+            (cached, generation) = entry
+            if generation == self.__generations.get(username):
+                self.__lookups.inc(("user", "negative_hit" if cached is self.NOT_FOUND else "hit"))
+                return None if cached is self.NOT_FOUND else cached
+
+            # changed by another process
+            self.__cache.invalidate(username)
+
+        with self.__inflight_lock:
+            lookup = self.__inflight.get(username)
+            is_leader = lookup is None
+            if is_leader:
+                lookup = _InflightLookup()
+                self.__inflight[username] = lookup
+                pass
+
+        if not is_leader:
+            self.__lookups.inc(("user", "coalesced"))
+            return lookup.wait()
+
+        self.__lookups.inc(("user", "miss"))
+        generation = self.__generations.get(username)
+        try:
+            user = self.__repos.get_first_user(username)
+        except Exception as e:
+            with self.__inflight_lock:
+                self.__inflight.pop(username, None)
+            lookup.resolve(error=e)
+            raise e
+
+        if user is None:
+            self.__cache.put(username, (self.NOT_FOUND, generation), ttl=self.__negative_ttl)
+        else:
+            self.__cache.put(username, (user, generation))
+
+        with self.__inflight_lock:
+            self.__inflight.pop(username, None)
+
+        lookup.resolve(user=user)
+
+        return user
+
+    def ping(self) -> None:
+        self.__repos.ping()
+        return
+
+    def update_password_hash(self, username: str, password_hash: str) -> None:
+        try:
+            self.__repos.update_password_hash(username, password_hash)
+        finally:
+            self.__cache.invalidate(username)
+
+        return
+
+    def invalidate(self, username: str) -> None:
+        """Remove cached user (or cached unknown username)
+        """
+
+        self.__cache.invalidate(username)
+        return
+
+    def clear(self) -> None:
+        """Remove all cached users
+        """
+
+        self.__cache.clear()
+        return
+
+    def __on_user_changed(self, username: t.Optional[str]) -> None:
+        if username is None:
+            self.clear()
+        else:
+            self.invalidate(username)
+
+        return
+
+
+class _InflightLookup:
+    """Lookup which other threads wait for
+    """
+
+    def __init__(self) -> None:
+        self.__event = threading.Event()
+        self.__user: t.Optional[User] = None
+        self.__error: t.Optional[Exception] = None
+
+        return
+
+    def resolve(self, user: t.Optional[User] = None, error: t.Optional[Exception] = None) -> None:
+        self.__user = user
+        self.__error = error
+        self.__event.set()
+
+        return
+
+    def wait(self) -> t.Optional[User]:
+        self.__event.wait()
+
+        if self.__error is not None:
+            raise self.__error
 
-        return None
+        return self.__user
@@ -2,35 +2,68 @@ from flask import Flask
 from logging import Logger
 
 from core.application import AppBuilder
+from core.fast_reject import constant_response
 from core.initialize import IAppInitializer
-from core.setting import AppSettings
+from services.health_service import IHealthService
+from core.setting import SettingLoader
 
-app = Flask(__name__)
 
+INDEX_BODY = "this is index\n"
 
-@app.route("/", defaults={"path": "/"}, methods=["GET"])
-@app.route("/<path:path>")
+
+@constant_response(body=INDEX_BODY)
 def index(path):
-    return "this is index\n"
+    return INDEX_BODY
 
 
-if __name__ == "__main__":
+def create_app() -> Flask:
+    """Create application
+
+    WSGI servers can load it directly, like `gunicorn --preload "server:create_app()"`.
+    Without `--preload` each worker builds its own app, so set `FLASK_METRICS_DIR` to share metrics among them.
+    """
+
+    app = Flask(__name__)
+    app.add_url_rule("/", defaults={"path": "/"}, view_func=index, methods=["GET"])
+    app.add_url_rule("/<path:path>", view_func=index)
+
     service = AppBuilder.build(app=app).get_service()
 
-    app_settings = service.injector.get(AppSettings)
     logger = service.injector.get(Logger)
     app_initializer = service.injector.get(IAppInitializer)
 
     try:
         app_initializer.initialize()
     except Exception as e:
-        logger.error(f"failed initialize : {e}")
+        logger.error("failed initialize : %s", e)
         raise e
 
-    try:
-        app.run(host=app_settings.url, port=app_settings.listen_port, debug=True)
-    except Exception as e:
-        logger.error(f"application error : {e}")
-        raise e
+    # readiness probe passes from now
+    service.injector.get(IHealthService).set_initialized()
+
+    return app
+
+
+if __name__ == "__main__":
+    app_settings = SettingLoader.load_setting().get_setting()
+
+    if app_settings.dev_server:
+        app = create_app()
+        logger = AppBuilder.get_service().injector.get(Logger)
+
+        try:
+            app.run(host=app_settings.url, port=app_settings.listen_port, debug=True)
+        except Exception as e:
+            logger.error("application error : %s", e)
+            raise e
+        finally:
+            AppBuilder.shutdown()
+
+        exit(0)
+
+    from core.launcher import ProductionServer
+
+    ProductionServer(
+        app_factory=create_app, app_settings=app_settings, on_worker_exit=AppBuilder.shutdown, on_exit=AppBuilder.shutdown).run()
 
     exit(0)
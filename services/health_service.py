@@ -0,0 +1,191 @@
+import abc
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from logging import Logger
+from injector import inject
+import typing as t
+
+from core.logger import LoggerBuilder
+from core.setting import AppSettings
+from repositories.user_repos import IUserRepository
+from services.key_ring import IJwtKeyRing
+
+
+class IHealthService(metaclass=abc.ABCMeta):
+    """Interface of health service (liveness and readiness probes)
+    """
+
+    @abc.abstractmethod
+    def add_check(self, name: str, check: t.Callable[[], None]) -> None:
+        """Add a check of readiness
+
+        Args:
+            name (str): name of the check
+            check (t.Callable[[], None]): function which raises Exception when the dependency is not available
+        """
+        pass
+
+    @abc.abstractmethod
+    def set_initialized(self) -> None:
+        """Tell that the application has been initialized
+        """
+        pass
+
+    @abc.abstractmethod
+    def liveness(self) -> t.Tuple[bool, bytes]:
+        """Get the result of liveness probe
+
+        Returns:
+            t.Tuple[bool, bytes]: (alive, json body)
+        """
+        pass
+
+    @abc.abstractmethod
+    def readiness(self) -> t.Tuple[bool, bytes]:
+        """Get the result of readiness probe
+
+        Returns:
+            t.Tuple[bool, bytes]: (ready, json body)
+        """
+        pass
+
+
+class HealthService(IHealthService):
+    """Implement of IHealthService
+
+    Checks run on a background thread every `FLASK_HEALTH_CHECK_INTERVAL` seconds, and probes return the last result
+    (already encoded), so probing doesn't run the checks on request threads.
+    The thread is started in each worker process at the first probe.
+
+    The process is alive while the checker keeps running (a check stuck for 3 intervals fails liveness).
+    It's ready when the application has been initialized and all checks passed.
+    """
+
+    # a log queue more than this ratio full is saturated
+    LOG_QUEUE_SATURATION = 0.9
+
+    ALIVE_BODY = b'{"status": "ok"}'
+    STUCK_BODY = b'{"status": "fail", "reason": "health checks are stuck"}'
+
+    @inject
+    def __init__(self, logger: Logger, app_settings: AppSettings, user_repos: IUserRepository, key_ring: IJwtKeyRing) -> None:
+        self.__logger = logger
+        self.__interval = app_settings.health_check_interval
+        self.__key_ring = key_ring
+
+        self.__checks: t.Dict[str, t.Callable[[], None]] = {}
+        self.__initialized = False
+
+        self.__ready = False
+        self.__ready_body = self.encode({"status": "starting", "checks": {}})
+        self.__heartbeat = time.monotonic()
+
+        self.__thread_pid: t.Optional[int] = None
+        self.__thread_lock = threading.Lock()
+
+        self.add_check("user_repository", user_repos.ping)
+        self.add_check("key_ring", self.check_key_ring)
+        self.add_check("log_queue", self.check_log_queue)
+
+        return
+
+    def add_check(self, name: str, check: t.Callable[[], None]) -> None:
+        self.__checks[name] = check
+        return
+
+    def set_initialized(self) -> None:
+        self.__initialized = True
+        self.run_checks()
+        return
+
+    def liveness(self) -> t.Tuple[bool, bytes]:
+        self.__start()
+
+        if self.__interval > 0 and time.monotonic() - self.__heartbeat > self.__interval * 3:
+            return (False, self.STUCK_BODY)
+
+        return (True, self.ALIVE_BODY)
+
+    def readiness(self) -> t.Tuple[bool, bytes]:
+        self.__start()
+        return (self.__ready, self.__ready_body)
+
+    def run_checks(self) -> None:
+        """Run all checks and store the result
+        """
+
+        results: t.Dict[str, str] = {}
+        for (name, check) in list(self.__checks.items()):
+            try:
+                check()
+                results[name] = "ok"
+            except Exception as e:
+                # the error is only logged, its text may expose internals (like paths or hosts) to the probe
+                self.__logger.error("health check '%s' failed : %s", name, e)
+                results[name] = "fail"
+
+        if not self.__initialized:
+            status = "initializing"
+        elif all(result == "ok" for result in results.values()):
+            status = "ok"
+        else:
+            status = "fail"
+
+        ready = status == "ok"
+        if ready != self.__ready:
+            if ready:
+                self.__logger.info("application is ready.")
+            else:
+                self.__logger.error("application is not ready : %s", results)
+
+        self.__ready_body = self.encode({
+            "status": status,
+            "checks": results,
+            "checked_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        })
+        self.__ready = ready
+        self.__heartbeat = time.monotonic()
+
+        return
+
+    def check_key_ring(self) -> None:
+        key = self.__key_ring.current_key()
+        if key is None or not key.can_sign:
+            raise Exception("no signing key.")
+        return
+
+    def check_log_queue(self) -> None:
+        for (name, stats) in LoggerBuilder.queue_stats().items():
+            if stats["queued"] >= stats["max_size"] * self.LOG_QUEUE_SATURATION:
+                raise Exception(f"log queue of '{name}' is saturated.")
+        return
+
+    @staticmethod
+    def encode(body: t.Dict[str, t.Any]) -> bytes:
+        return json.dumps(body).encode("utf-8")
+
+    def __start(self) -> None:
+        if self.__thread_pid == os.getpid() or self.__interval <= 0:
+            return
+
+        # the checker is started in each worker process, not inherited by fork
+        with self.__thread_lock:
+            if self.__thread_pid == os.getpid():
+                return
+
+            self.__heartbeat = time.monotonic()
+            threading.Thread(target=self.__run_periodically, name="health-checker", daemon=True).start()
+            self.__thread_pid = os.getpid()
+
+        return
+
+    def __run_periodically(self) -> None:
+        while True:
+            try:
+                self.run_checks()
+            except Exception as e:
+                self.__logger.error("health check error : %s", e)
+            time.sleep(self.__interval)
@@ -4,12 +4,15 @@ from injector import inject
 import base64
 import json
 from uuid import uuid4
+import time
 from datetime import datetime, timedelta
-from hashlib import sha256
-import hmac
 import typing as t
 
+from core.cache import TtlCache
+from core.metrics import AppMetrics
 from core.setting import AppSettings
+from services.key_ring import IJwtKeyRing, JwtKey, b64url_decode
+from services.revocation_service import IRevocationService
 
 
 class JwtToken:
@@ -21,7 +24,9 @@ class JwtToken:
             nbf: t.Optional[int],
             exp: t.Optional[int],
             sub: t.Optional[str],
-            signature: t.Optional[str] = None) -> None:
+            signature: t.Optional[str] = None,
+            signing_input: t.Optional[str] = None,
+            kid: t.Optional[str] = None) -> None:
 
         self.__alg = alg
         self.__typ = typ
@@ -31,6 +36,8 @@ class JwtToken:
         self.__exp = exp
         self.__sub = sub
         self.__signature = signature
+        self.__signing_input = signing_input
+        self.__kid = kid
 
         return
 
@@ -46,12 +53,20 @@ class JwtToken:
         """
         return self.__typ
 
+    @property
+    def kid(self):
+        """Key id of the signing key
+        """
+        return self.__kid
+
     @property
     def header(self) -> dict:
         """header dict
         """
 
         header = {"alg": self.__alg, "typ": self.__typ}
+        if self.__kid is not None:
+            header["kid"] = self.__kid
 
         return header
 
@@ -91,6 +106,12 @@ class JwtToken:
         """
         return self.__signature
 
+    @property
+    def signing_input(self) -> t.Optional[str]:
+        """Original "header.payload" segments the signature was computed over (only decoded token has it)
+        """
+        return self.__signing_input
+
     @property
     def payload(self) -> dict:
         """payload dict
@@ -107,6 +128,93 @@ class JwtToken:
         return payload
 
 
+class TokenIntrospection:
+    """Result of token introspection
+    """
+
+    def __init__(self, token: str, reason: t.Optional[str], jwt_token: t.Optional[JwtToken] = None) -> None:
+        self.__token = token
+        self.__reason = reason
+        self.__jwt_token = jwt_token
+
+        return
+
+    @property
+    def token(self) -> str:
+        """Raw jwt token
+        """
+        return self.__token
+
+    @property
+    def active(self) -> bool:
+        """True if the token is valid
+        """
+        return self.__reason is None
+
+    @property
+    def reason(self) -> t.Optional[str]:
+        """Failure reason (None if the token is valid)
+        """
+        return self.__reason
+
+    @property
+    def jwt_token(self) -> t.Optional[JwtToken]:
+        """Decoded token (None if the token could not be decoded)
+        """
+        return self.__jwt_token
+
+    @property
+    def sub(self) -> t.Optional[str]:
+        """Unique property that identifies the User
+        """
+        return self.__jwt_token.sub if self.__jwt_token is not None else None
+
+    @property
+    def exp(self) -> t.Optional[int]:
+        """Unix timestamp at token expired
+        """
+        return self.__jwt_token.exp if self.__jwt_token is not None else None
+
+
+class JwtTokenCache(TtlCache):
+    """Cache of verified JWT keyed by the raw token string
+
+    Each entry expires at the token's `exp`, so an expired token is never answered from the cache.
+    """
+
+    @inject
+    def __init__(self, app_settings: AppSettings) -> None:
+        super().__init__(max_size=app_settings.jwt_cache_size)
+        return
+
+    def get_token(self, token: str) -> t.Optional[JwtToken]:
+        """Get verified token
+
+        Args:
+            token (str): raw jwt token
+
+        Returns:
+            t.Optional[JwtToken]: verified token or None
+        """
+
+        return self.get(token)
+
+    def put_token(self, token: str, jwt_token: JwtToken) -> None:
+        """Store verified token until it expires
+
+        Args:
+            token (str): raw jwt token
+            jwt_token (JwtToken): token decoded from raw token and already verified
+        """
+
+        if jwt_token.exp is None:
+            return
+
+        self.put(token, jwt_token, expires_at=jwt_token.exp)
+
+        return
+
+
 class IJwtService(metaclass=abc.ABCMeta):
     """Interface of JWT service
     """
@@ -144,21 +252,60 @@ class IJwtService(metaclass=abc.ABCMeta):
         """
         pass
 
+    @abc.abstractmethod
+    def verify_token_reason(self, token: JwtToken) -> t.Optional[str]:
+        """Verify that token is correct, and tell why it's rejected
+
+        Args:
+            token (JwtToken): token to be verified
+
+        Returns:
+            t.Optional[str]: failure reason, or None if enabled
+        """
+        pass
+
+    @abc.abstractmethod
+    def introspect_tokens(self, tokens: t.List[str], token_cache: t.Optional[JwtTokenCache] = None) -> t.List[TokenIntrospection]:
+        """Decode and verify tokens at once
+
+        Args:
+            tokens (t.List[str]): jwt tokens
+            token_cache (t.Optional[JwtTokenCache], optional): cache of verified tokens. Defaults to None.
+
+        Returns:
+            t.List[TokenIntrospection]: results in the same order as tokens
+        """
+        pass
+
 
 class JwtService(IJwtService):
     """Implement of IJwtService
     """
 
+    REASON_MALFORMED = "malformed"
+    REASON_UNKNOWN_KEY = "unknown_key"
+    REASON_ALG_MISMATCH = "alg_mismatch"
+    REASON_INVALID_SIGNATURE = "invalid_signature"
+    REASON_INVALID_CLAIMS = "invalid_claims"
+    REASON_NOT_YET_VALID = "not_yet_valid"
+    REASON_EXPIRED = "expired"
+    REASON_REVOKED = "revoked"
+
     @inject
-    def __init__(self, logger: Logger, app_settings: AppSettings) -> None:
+    def __init__(
+            self, logger: Logger, app_settings: AppSettings, key_ring: IJwtKeyRing, metrics: AppMetrics,
+            revocations: IRevocationService) -> None:
         self.__logger = logger
-        self.__app_settings = app_settings
+        self.__access_token_ttl = app_settings.jwt_access_token_ttl
+        self.__key_ring = key_ring
+        self.__metrics = metrics
+        self.__revocations = revocations
 
         return
 
     def create_token(self, username: str) -> str:
         now = datetime.now()
-        expired_at = now + timedelta(hours=1)
+        expired_at = now + timedelta(seconds=self.__access_token_ttl)
 
         jti = uuid4().hex
         iat = int(now.timestamp())
@@ -166,7 +313,8 @@ class JwtService(IJwtService):
         exp = int(expired_at.timestamp())
         sub = username
 
-        jwt_token = JwtToken(alg="HS256", typ="JWT", jti=jti, iat=iat, nbf=nbf, exp=exp, sub=sub)
+        key = self.__key_ring.current_key()
+        jwt_token = JwtToken(alg=key.alg, typ="JWT", jti=jti, iat=iat, nbf=nbf, exp=exp, sub=sub, kid=key.kid)
 
         try:
             header_b64 = self.to_base64(jwt_token.header)
@@ -175,33 +323,99 @@ class JwtService(IJwtService):
             unsigned_token = f"{header_b64}.{payload_b64}"
 
             # https://www.w2solution.co.jp/tech/2022/08/18/flaskapi%E3%81%A7jwt%E8%AA%8D%E8%A8%BC%E3%82%92%E5%AE%9F%E8%A3%85%E3%81%99%E3%82%8B%EF%BC%88%E5%89%8D%E7%B7%A8%EF%BC%89/
-            secret_key = self.__app_settings.jwt_secret.encode("utf-8")
-            signature_bytes = base64.urlsafe_b64encode(hmac.new(secret_key, unsigned_token.encode("utf-8"), sha256).digest())
-            signature = signature_bytes.decode("utf-8").rstrip("=")
+            signature = self.sign(unsigned_token, key)
         except Exception as e:
-            self.__logger.error(f"encode jwt token error : {e}")
+            self.__logger.error("encode jwt token error : %s", e)
             raise e
 
         token = f"{unsigned_token}.{signature}"
+        self.__metrics.tokens_issued.inc((key.kid or "",))
 
         return token
 
     def decode_token(self, token: str) -> JwtToken:
+        try:
+            jwt_token = self.parse_token(token)
+        except Exception as e:
+            self.__logger.error("decode jwt token error : %s", e)
+            raise e
+
+        return jwt_token
+
+    def verify_token(self, jwt_token: JwtToken) -> bool:
+        return self.verify_token_reason(jwt_token) is None
+
+    def verify_token_reason(self, jwt_token: JwtToken) -> t.Optional[str]:
+        reason = self.check_token(jwt_token)
+        if reason is None:
+            return None
+
+        # The token is out of the valid period is usual, so it isn't logged
+        if reason not in [self.REASON_NOT_YET_VALID, self.REASON_EXPIRED]:
+            self.__logger.error(
+                "jwt token is rejected. reason: %s, kid: %s, sub: %s", reason, jwt_token.kid, jwt_token.sub,
+                extra={"auth_scheme": "jwt", "user": jwt_token.sub, "auth_result": reason})
+            pass
+
+        return reason
+
+    def introspect_tokens(self, tokens: t.List[str], token_cache: t.Optional[JwtTokenCache] = None) -> t.List[TokenIntrospection]:
+        now = time.time()
+
+        # The same token is decoded and verified only once in a batch
+        results: t.Dict[str, TokenIntrospection] = {}
+        for token in tokens:
+            if token in results:
+                continue
+
+            if token_cache is not None:
+                cached_token = token_cache.get_token(token)
+                if cached_token is not None:
+                    # a cached token may be revoked after it's cached
+                    reason = self.REASON_REVOKED if self.__revocations.is_revoked(cached_token.jti) else None
+                    results[token] = TokenIntrospection(token=token, reason=reason, jwt_token=cached_token)
+                    continue
+
+            # a token which can't be checked is reported as malformed, not failing the batch
+            try:
+                jwt_token = self.parse_token(token)
+                reason = self.check_token(jwt_token, now=now)
+            except Exception:
+                results[token] = TokenIntrospection(token=token, reason=self.REASON_MALFORMED)
+                continue
+
+            results[token] = TokenIntrospection(token=token, reason=reason, jwt_token=jwt_token)
+
+            if reason is None and token_cache is not None:
+                token_cache.put_token(token, jwt_token)
+
+        return [results[token] for token in tokens]
+
+    def parse_token(self, token: str) -> JwtToken:
+        """Decode JWT without logging
+
+        Raises:
+            Exception: the token is not "header.payload.signature" of base64url json
+        """
+
         splited_token = token.split(".")
         if len(splited_token) < 3:
-            self.__logger.error(f"invalid jwt token syntax. token: {token}")
             raise Exception("invalid jwt token syntax.")
 
         header_b64 = splited_token[0]
         payload_b64 = splited_token[1]
         signature = splited_token[2]
 
-        try:
-            header_dict = self.to_dict(header_b64)
-            payload_dict = self.to_dict(payload_b64)
-        except Exception as e:
-            self.__logger.error("decode jwt token error.")
-            raise e
+        header_dict = json.loads(b64url_decode(header_b64).decode("utf-8"))
+        payload_dict = json.loads(b64url_decode(payload_b64).decode("utf-8"))
+        if not isinstance(header_dict, dict) or not isinstance(payload_dict, dict):
+            raise Exception("invalid jwt token syntax.")
+
+        # they're used as keys of lookups (key ring, revocations), so other types are malformed
+        for (name, value) in [("alg", header_dict.get("alg")), ("kid", header_dict.get("kid")), ("jti", payload_dict.get("jti")),
+                              ("sub", payload_dict.get("sub"))]:
+            if value is not None and not isinstance(value, str):
+                raise Exception(f"invalid jwt token '{name}'.")
 
         jwt_token = JwtToken(
             alg=header_dict.get("alg"),
@@ -211,44 +425,80 @@ class JwtService(IJwtService):
             nbf=payload_dict.get("nbf"),
             exp=payload_dict.get("exp"),
             sub=payload_dict.get("sub"),
-            signature=signature
+            signature=signature,
+            signing_input=f"{header_b64}.{payload_b64}",
+            kid=header_dict.get("kid")
         )
 
         return jwt_token
 
-    def verify_token(self, jwt_token: JwtToken) -> bool:
-        try:
-            header_b64 = self.to_base64(jwt_token.header)
-            payload_b64 = self.to_base64(jwt_token.payload)
-            unsigned_token = f"{header_b64}.{payload_b64}"
+    def check_token(self, jwt_token: JwtToken, now: t.Optional[float] = None) -> t.Optional[str]:
+        """Verify token without logging
 
-            secret_key = self.__app_settings.jwt_secret.encode("utf-8")
-            signature_bytes = base64.urlsafe_b64encode(hmac.new(secret_key, unsigned_token.encode("utf-8"), sha256).digest())
-            signature = signature_bytes.decode("utf-8").rstrip("=")
-        except Exception as e:
-            self.__logger.error(f"encode jwt token error : {e}")
-            return False
+        Args:
+            jwt_token (JwtToken): token to be verified
+            now (t.Optional[float], optional): unix timestamp to check the valid period. Defaults to None (current time).
 
-        if jwt_token.signature != signature:
-            self.__logger.error(f"The signature on the jwt token is incorrect. sub: {jwt_token.sub}")
-            return False
+        Returns:
+            t.Optional[str]: failure reason (REASON_XXX) or None if enabled
+        """
+
+        key = self.__key_ring.get_key(jwt_token.kid)
+        if key is None:
+            return self.REASON_UNKNOWN_KEY
+
+        # The algorithm is bound to the key, so the header cannot downgrade it
+        if key.alg != jwt_token.alg:
+            return self.REASON_ALG_MISMATCH
+
+        if jwt_token.signature is None:
+            return self.REASON_INVALID_SIGNATURE
+
+        try:
+            # The signature is checked over the segments as received, so the header and payload are not re-encoded.
+            # A token not created by decode_token has no original segments, so they are built from its claims.
+            unsigned_token = jwt_token.signing_input
+            if unsigned_token is None:
+                header_b64 = self.to_base64(jwt_token.header)
+                payload_b64 = self.to_base64(jwt_token.payload)
+                unsigned_token = f"{header_b64}.{payload_b64}"
+                pass
+
+            signature = b64url_decode(jwt_token.signature)
+            verified = key.verify(unsigned_token.encode("utf-8"), signature)
+        except Exception:
+            verified = False
+
+        if not verified:
+            return self.REASON_INVALID_SIGNATURE
 
         nbf, exp = jwt_token.nbf, jwt_token.exp
-        if nbf is None or exp is None:
-            return False
+        if not isinstance(nbf, (int, float)) or not isinstance(exp, (int, float)):
+            return self.REASON_INVALID_CLAIMS
+
+        if now is None:
+            now = time.time()
 
         # The correct token should be past the start time and not expire
-        enabled_at = datetime.fromtimestamp(nbf)
-        expired_at = datetime.fromtimestamp(exp)
-        now = datetime.now()
+        if now < nbf:
+            return self.REASON_NOT_YET_VALID
+
+        if now > exp:
+            return self.REASON_EXPIRED
 
-        if now < enabled_at:
-            return False
+        if self.__revocations.is_revoked(jwt_token.jti):
+            return self.REASON_REVOKED
+
+        return None
+
+    def sign(self, unsigned_token: str, key: JwtKey) -> str:
+        """create JWT signature of "header.payload" string
+        """
 
-        if now > expired_at:
-            return False
+        signature_bytes = key.sign(unsigned_token.encode("utf-8"))
+        signature = base64.urlsafe_b64encode(signature_bytes).decode("utf-8").rstrip("=")
 
-        return True
+        return signature
 
     def to_base64(self, data: dict) -> str:
         """convert to JWT string from dict data
@@ -258,7 +508,7 @@ class JwtService(IJwtService):
             data_bytes = json.dumps(data).encode("utf-8")
             b64_data = base64.urlsafe_b64encode(data_bytes).decode("utf-8").rstrip("=")
         except Exception as e:
-            self.__logger.error(f"base64 encode error : {e}")
+            self.__logger.error("base64 encode error : %s", e)
             raise e
 
         return b64_data
@@ -274,7 +524,7 @@ class JwtService(IJwtService):
             dict_str = base64.urlsafe_b64decode(data_with_padding).decode("utf-8")
             dict_data: dict = json.loads(dict_str)
         except Exception as e:
-            self.__logger.error(f"dict decode error : {e}")
+            self.__logger.error("dict decode error : %s", e)
             raise e
 
         return dict_data
@@ -0,0 +1,401 @@
+import abc
+import base64
+import hmac
+import json
+import os
+import hashlib
+from logging import Logger
+from injector import inject
+import typing as t
+
+from core.setting import AppSettings, resolve_path
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, padding, rsa
+    from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature, encode_dss_signature
+    HAS_CRYPTOGRAPHY = True
+except ImportError:
+    HAS_CRYPTOGRAPHY = False
+
+
+def b64url_decode(data: str) -> bytes:
+    """decode base64url string without padding
+    """
+
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def b64url_to_int(data: str) -> int:
+    """decode base64url string to unsigned big-endian integer (JWK number format)
+    """
+
+    return int.from_bytes(b64url_decode(data), "big")
+
+
+class JwtKey(metaclass=abc.ABCMeta):
+    """Key to sign and verify JWT
+    """
+
+    def __init__(self, kid: str, alg: str) -> None:
+        self.__kid = kid
+        self.__alg = alg
+
+        return
+
+    @property
+    def kid(self) -> str:
+        """Key id written in JWT header
+        """
+        return self.__kid
+
+    @property
+    def alg(self) -> str:
+        """Algorithm written in JWT header
+        """
+        return self.__alg
+
+    @property
+    @abc.abstractmethod
+    def can_sign(self) -> bool:
+        """True if the key has private (or secret) material
+        """
+        pass
+
+    @abc.abstractmethod
+    def sign(self, signing_input: bytes) -> bytes:
+        """Create signature
+
+        Args:
+            signing_input (bytes): "header.payload" bytes
+
+        Returns:
+            bytes: raw signature
+        """
+        pass
+
+    @abc.abstractmethod
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        """Verify signature
+
+        Args:
+            signing_input (bytes): "header.payload" bytes
+            signature (bytes): raw signature
+
+        Returns:
+            bool: True if the signature is correct
+        """
+        pass
+
+
+class HmacJwtKey(JwtKey):
+    """HS256/HS384/HS512 key
+    """
+
+    DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+    def __init__(self, kid: str, alg: str, secret: bytes) -> None:
+        super().__init__(kid=kid, alg=alg)
+
+        if alg not in self.DIGESTS:
+            raise Exception(f"unsupported hmac algorithm : {alg}")
+
+        # keyed once, and cloned on each signing
+        self.__prototype = hmac.new(secret, digestmod=self.DIGESTS[alg])
+
+        return
+
+    @property
+    def can_sign(self) -> bool:
+        return True
+
+    def sign(self, signing_input: bytes) -> bytes:
+        mac = self.__prototype.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        return hmac.compare_digest(self.sign(signing_input), signature)
+
+
+class RsaJwtKey(JwtKey):
+    """RS256/RS384/RS512 key
+    """
+
+    def __init__(self, kid: str, alg: str, public_key, private_key=None) -> None:
+        super().__init__(kid=kid, alg=alg)
+
+        digests = {"RS256": hashes.SHA256, "RS384": hashes.SHA384, "RS512": hashes.SHA512}
+        if alg not in digests:
+            raise Exception(f"unsupported rsa algorithm : {alg}")
+
+        self.__hash = digests[alg]()
+        self.__public_key = public_key
+        self.__private_key = private_key
+
+        return
+
+    @property
+    def can_sign(self) -> bool:
+        return self.__private_key is not None
+
+    def sign(self, signing_input: bytes) -> bytes:
+        if self.__private_key is None:
+            raise Exception(f"key '{self.kid}' has no private key.")
+        return self.__private_key.sign(signing_input, padding.PKCS1v15(), self.__hash)
+
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        try:
+            self.__public_key.verify(signature, signing_input, padding.PKCS1v15(), self.__hash)
+        except InvalidSignature:
+            return False
+        return True
+
+
+class EcJwtKey(JwtKey):
+    """ES256/ES384 key
+
+    JWS signature is fixed size "r || s", not DER.
+    """
+
+    def __init__(self, kid: str, alg: str, public_key, private_key=None) -> None:
+        super().__init__(kid=kid, alg=alg)
+
+        params = {"ES256": (hashes.SHA256, 32), "ES384": (hashes.SHA384, 48)}
+        if alg not in params:
+            raise Exception(f"unsupported ec algorithm : {alg}")
+
+        hash_class, self.__size = params[alg]
+        self.__algorithm = ec.ECDSA(hash_class())
+        self.__public_key = public_key
+        self.__private_key = private_key
+
+        return
+
+    @property
+    def can_sign(self) -> bool:
+        return self.__private_key is not None
+
+    def sign(self, signing_input: bytes) -> bytes:
+        if self.__private_key is None:
+            raise Exception(f"key '{self.kid}' has no private key.")
+
+        (r, s) = decode_dss_signature(self.__private_key.sign(signing_input, self.__algorithm))
+        return r.to_bytes(self.__size, "big") + s.to_bytes(self.__size, "big")
+
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        if len(signature) != self.__size * 2:
+            return False
+
+        r = int.from_bytes(signature[:self.__size], "big")
+        s = int.from_bytes(signature[self.__size:], "big")
+        try:
+            self.__public_key.verify(encode_dss_signature(r, s), signing_input, self.__algorithm)
+        except InvalidSignature:
+            return False
+        return True
+
+
+class EdDsaJwtKey(JwtKey):
+    """EdDSA (Ed25519) key
+    """
+
+    def __init__(self, kid: str, public_key, private_key=None) -> None:
+        super().__init__(kid=kid, alg="EdDSA")
+
+        self.__public_key = public_key
+        self.__private_key = private_key
+
+        return
+
+    @property
+    def can_sign(self) -> bool:
+        return self.__private_key is not None
+
+    def sign(self, signing_input: bytes) -> bytes:
+        if self.__private_key is None:
+            raise Exception(f"key '{self.kid}' has no private key.")
+        return self.__private_key.sign(signing_input)
+
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        try:
+            self.__public_key.verify(signature, signing_input)
+        except InvalidSignature:
+            return False
+        return True
+
+
+def load_jwk(jwk: t.Dict[str, t.Any]) -> JwtKey:
+    """Parse a JWK (RFC 7517) into JwtKey
+
+    Args:
+        jwk (t.Dict[str, t.Any]): one element of JWKS "keys"
+
+    Returns:
+        JwtKey: parsed key
+    """
+
+    kty = jwk.get("kty")
+    kid = jwk.get("kid")
+    if kid is None:
+        raise Exception("jwk has no 'kid'.")
+
+    if kty == "oct":
+        return HmacJwtKey(kid=kid, alg=jwk.get("alg", "HS256"), secret=b64url_decode(jwk["k"]))
+
+    if not HAS_CRYPTOGRAPHY:
+        raise Exception(f"'cryptography' package is required to load '{kty}' key : {kid}")
+
+    if kty == "RSA":
+        public_numbers = rsa.RSAPublicNumbers(e=b64url_to_int(jwk["e"]), n=b64url_to_int(jwk["n"]))
+        private_key = None
+        if "d" in jwk:
+            private_key = rsa.RSAPrivateNumbers(
+                p=b64url_to_int(jwk["p"]),
+                q=b64url_to_int(jwk["q"]),
+                d=b64url_to_int(jwk["d"]),
+                dmp1=b64url_to_int(jwk["dp"]),
+                dmq1=b64url_to_int(jwk["dq"]),
+                iqmp=b64url_to_int(jwk["qi"]),
+                public_numbers=public_numbers,
+            ).private_key()
+            pass
+
+        return RsaJwtKey(kid=kid, alg=jwk.get("alg", "RS256"), public_key=public_numbers.public_key(), private_key=private_key)
+
+    if kty == "EC":
+        curves = {"P-256": (ec.SECP256R1, "ES256"), "P-384": (ec.SECP384R1, "ES384")}
+        if jwk.get("crv") not in curves:
+            raise Exception(f"unsupported ec curve : {jwk.get('crv')}")
+
+        (curve_class, default_alg) = curves[jwk["crv"]]
+        public_numbers = ec.EllipticCurvePublicNumbers(x=b64url_to_int(jwk["x"]), y=b64url_to_int(jwk["y"]), curve=curve_class())
+        private_key = None
+        if "d" in jwk:
+            private_key = ec.EllipticCurvePrivateNumbers(private_value=b64url_to_int(jwk["d"]), public_numbers=public_numbers).private_key()
+            pass
+
+        return EcJwtKey(kid=kid, alg=jwk.get("alg", default_alg), public_key=public_numbers.public_key(), private_key=private_key)
+
+    if kty == "OKP":
+        if jwk.get("crv") != "Ed25519":
+            raise Exception(f"unsupported okp curve : {jwk.get('crv')}")
+
+        public_key = ed25519.Ed25519PublicKey.from_public_bytes(b64url_decode(jwk["x"]))
+        private_key = None
+        if "d" in jwk:
+            private_key = ed25519.Ed25519PrivateKey.from_private_bytes(b64url_decode(jwk["d"]))
+            pass
+
+        return EdDsaJwtKey(kid=kid, public_key=public_key, private_key=private_key)
+
+    raise Exception(f"unsupported jwk type : {kty}")
+
+
+class IJwtKeyRing(metaclass=abc.ABCMeta):
+    """Interface of the keys to sign and verify JWT
+    """
+
+    @abc.abstractmethod
+    def current_key(self) -> JwtKey:
+        """Get the key new tokens are signed with
+
+        Returns:
+            JwtKey: signing key
+        """
+        pass
+
+    @abc.abstractmethod
+    def get_key(self, kid: t.Optional[str]) -> t.Optional[JwtKey]:
+        """Get the key by "kid" header
+
+        Args:
+            kid (t.Optional[str]): key id. None for the token issued without "kid"
+
+        Returns:
+            t.Optional[JwtKey]: key or None if not found
+        """
+        pass
+
+    @abc.abstractmethod
+    def get_keys(self) -> t.List[JwtKey]:
+        """Get all active keys
+
+        Returns:
+            t.List[JwtKey]: keys
+        """
+        pass
+
+
+class JwtKeyRing(IJwtKeyRing):
+    """Implement of IJwtKeyRing
+
+    Holds `FLASK_JWT_SECRET` as HS256 key (kid: "secret") and the keys of the JWKS file `FLASK_JWT_JWKS_FILE`.
+    Keys are parsed once when the ring is created (at startup, by create_app), so a key which can't be loaded,
+    like a RSA key without the optional `cryptography` package, stops the app from starting.
+    """
+
+    SECRET_KID = "secret"
+
+    @inject
+    def __init__(self, logger: Logger, app_settings: AppSettings) -> None:
+        self.__logger = logger
+        self.__keys: t.Dict[t.Optional[str], JwtKey] = {}
+
+        secret_key = HmacJwtKey(kid=self.SECRET_KID, alg="HS256", secret=app_settings.jwt_secret.encode("utf-8"))
+        self.__keys[secret_key.kid] = secret_key
+
+        # tokens issued before key ring was introduced have no "kid"
+        self.__keys[None] = secret_key
+
+        if app_settings.jwt_jwks_file:
+            for key in self.load_jwks_file(app_settings.jwt_jwks_file):
+                # a key of the same kid would silently replace the secret key (or another key)
+                if key.kid in self.__keys:
+                    raise Exception(
+                        f"duplicate jwt key id '{key.kid}' in '{app_settings.jwt_jwks_file}' (\"{self.SECRET_KID}\" is reserved).")
+                self.__keys[key.kid] = key
+
+        signing_kid = app_settings.jwt_signing_kid or self.SECRET_KID
+        current_key = self.__keys.get(signing_kid)
+        if current_key is None:
+            raise Exception(f"signing key '{signing_kid}' is not found in key ring.")
+        if not current_key.can_sign:
+            raise Exception(f"signing key '{signing_kid}' has no private key.")
+
+        self.__current_key = current_key
+
+        return
+
+    def load_jwks_file(self, path: str) -> t.List[JwtKey]:
+        """Load keys from JWKS json file
+
+        Args:
+            path (str): JWKS file path. relative path is resolved from the project root
+        """
+
+        jwks_file_path = resolve_path(path)
+
+        if not os.path.exists(jwks_file_path):
+            raise FileNotFoundError(f"'{jwks_file_path}' is not found.")
+
+        with open(jwks_file_path, "r", encoding="utf-8") as f:
+            jwks: dict = json.load(f)
+            pass
+
+        keys = [load_jwk(jwk) for jwk in jwks.get("keys", [])]
+        self.__logger.info("loaded jwt keys : %s", [key.kid for key in keys])
+
+        return keys
+
+    def current_key(self) -> JwtKey:
+        return self.__current_key
+
+    def get_key(self, kid: t.Optional[str]) -> t.Optional[JwtKey]:
+        if kid is not None and not isinstance(kid, str):
+            return None
+        return self.__keys.get(kid)
+
+    def get_keys(self) -> t.List[JwtKey]:
+        return [key for kid, key in self.__keys.items() if kid is not None]
@@ -0,0 +1,254 @@
+import abc
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from logging import Logger
+from injector import inject
+import typing as t
+
+from core.cache import TtlCache
+from core.metrics import AppMetrics
+from core.setting import AppSettings
+from models.user import User
+
+
+SCRYPT_SCHEME = "scrypt"
+PBKDF2_SCHEME = "pbkdf2_sha256"
+
+# current hash policy. a stored hash with other parameters is upgraded at the next login
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 600000
+
+
+def b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def hash_password(password: str) -> str:
+    """Hash password by the current policy
+
+    Format: "scrypt$<n>$<r>$<p>$<salt>$<hash>"
+
+    Args:
+        password (str): raw password
+
+    Returns:
+        str: password hash
+    """
+
+    salt = os.urandom(16)
+    derived = hashlib.scrypt(password.encode("utf-8"), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, maxmem=2 ** 26, dklen=32)
+
+    return f"{SCRYPT_SCHEME}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${b64encode(salt)}${b64encode(derived)}"
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """Verify password against password hash
+
+    A stored value without known scheme is a legacy raw password.
+
+    Args:
+        password (str): raw password
+        password_hash (str): stored password hash
+
+    Returns:
+        bool: True if the password is correct
+    """
+
+    fields = password_hash.split("$")
+    scheme = fields[0]
+
+    if scheme == SCRYPT_SCHEME and len(fields) == 6:
+        (n, r, p) = (int(fields[1]), int(fields[2]), int(fields[3]))
+        expected = b64decode(fields[5])
+        derived = hashlib.scrypt(password.encode("utf-8"), salt=b64decode(fields[4]), n=n, r=r, p=p, maxmem=2 ** 26, dklen=len(expected))
+        return hmac.compare_digest(derived, expected)
+
+    if scheme == PBKDF2_SCHEME and len(fields) == 4:
+        expected = b64decode(fields[3])
+        derived = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), b64decode(fields[2]), int(fields[1]), dklen=len(expected))
+        return hmac.compare_digest(derived, expected)
+
+    return hmac.compare_digest(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True if the password hash is not by the current policy
+    """
+
+    return not password_hash.startswith(f"{SCRYPT_SCHEME}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+
+def is_legacy(password_hash: str) -> bool:
+    """True if the stored value is a legacy raw password
+    """
+
+    scheme = password_hash.split("$", 1)[0]
+    return scheme not in [SCRYPT_SCHEME, PBKDF2_SCHEME]
+
+
+class PasswordServiceBusyError(Exception):
+    """Too many password verifications are waiting
+    """
+    pass
+
+
+class IPasswordService(metaclass=abc.ABCMeta):
+    """Interface of password service
+    """
+
+    @abc.abstractmethod
+    def hash_password(self, password: str) -> str:
+        """Hash password
+
+        Args:
+            password (str): raw password
+
+        Returns:
+            str: password hash
+
+        Raises:
+            PasswordServiceBusyError: too many requests are waiting
+        """
+        pass
+
+    @abc.abstractmethod
+    def verify_password(self, user: User, password: str) -> bool:
+        """Verify password of the user
+
+        Args:
+            user (User): user model
+            password (str): raw password
+
+        Returns:
+            bool: True if the password is correct (False for a password which is not str)
+
+        Raises:
+            PasswordServiceBusyError: too many requests are waiting
+        """
+        pass
+
+    @abc.abstractmethod
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Check the password hash should be upgraded
+
+        Args:
+            password_hash (str): stored password hash
+
+        Returns:
+            bool: True if the hash is not by the current policy
+        """
+        pass
+
+
+class PasswordService(IPasswordService):
+    """Implement of IPasswordService
+
+    KDF runs on a bounded process pool, so it doesn't hold request threads on CPU.
+    When `FLASK_PASSWORD_QUEUE_SIZE` requests are already waiting, new requests are rejected.
+    Recently verified credentials are cached by keyed digest (never the raw password).
+    Cache lookups are counted to `cache_lookups_total` metric (cache: "password").
+    """
+
+    @inject
+    def __init__(self, logger: Logger, app_settings: AppSettings, metrics: AppMetrics) -> None:
+        self.__logger = logger
+        self.__lookups = metrics.cache_lookups
+        self.__workers = app_settings.password_workers
+        self.__queue_timeout = app_settings.password_queue_timeout
+        self.__slots = threading.BoundedSemaphore(app_settings.password_queue_size)
+
+        # random key per process. digests are meaningless outside of this process
+        self.__cache_key = os.urandom(32)
+        self.__cache = TtlCache(max_size=app_settings.password_cache_size, ttl=app_settings.password_cache_ttl)
+
+        self.__executor: t.Optional[ProcessPoolExecutor] = None
+        self.__executor_pid: t.Optional[int] = None
+        self.__executor_lock = threading.Lock()
+
+        return
+
+    def hash_password(self, password: str) -> str:
+        return self.__run(hash_password, password)
+
+    def verify_password(self, user: User, password: str) -> bool:
+        # a password of other type (like a number of JSON body) never matches
+        if not isinstance(password, str):
+            return False
+
+        password_hash = user.password_hash
+
+        # legacy raw password is compared in place
+        if is_legacy(password_hash):
+            return verify_password(password, password_hash)
+
+        # the stored hash is a part of the key, so a changed password doesn't hit
+        digest = hmac.new(self.__cache_key, digestmod=hashlib.sha256)
+        for part in [user.username, password, password_hash]:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        cache_key = digest.digest()
+
+        if self.__cache.get(cache_key) is not None:
+            self.__lookups.inc(("password", "hit"))
+            return True
+        self.__lookups.inc(("password", "miss"))
+
+        verified: bool = self.__run(verify_password, password, password_hash)
+        if verified:
+            self.__cache.put(cache_key, True)
+
+        return verified
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        return needs_rehash(password_hash)
+
+    def shutdown(self) -> None:
+        """Stop worker processes
+        """
+
+        with self.__executor_lock:
+            if self.__executor is not None and self.__executor_pid == os.getpid():
+                self.__executor.shutdown(wait=True)
+            self.__executor = None
+
+        return
+
+    def __run(self, func: t.Callable, *args) -> t.Any:
+        if not self.__slots.acquire(timeout=self.__queue_timeout):
+            self.__logger.error("password verification is busy.")
+            raise PasswordServiceBusyError("password verification is busy.")
+
+        try:
+            executor = self.__get_executor()
+            if executor is None:
+                return func(*args)
+
+            return executor.submit(func, *args).result()
+        finally:
+            self.__slots.release()
+
+    def __get_executor(self) -> t.Optional[ProcessPoolExecutor]:
+        if self.__workers <= 0:
+            return None
+
+        # the pool is created in each worker process at the first use, not inherited by fork
+        if self.__executor is None or self.__executor_pid != os.getpid():
+            with self.__executor_lock:
+                if self.__executor is None or self.__executor_pid != os.getpid():
+                    self.__executor = ProcessPoolExecutor(
+                        max_workers=self.__workers,
+                        mp_context=multiprocessing.get_context("spawn"))
+                    self.__executor_pid = os.getpid()
+
+        return self.__executor
@@ -0,0 +1,119 @@
+import abc
+import hashlib
+import secrets
+import threading
+import time
+from logging import Logger
+from uuid import uuid4
+from injector import inject
+import typing as t
+
+from core.setting import AppSettings
+from repositories.refresh_token_repos import IRefreshTokenRepository, ROTATE_OK, ROTATE_REUSED
+
+
+class IRefreshTokenService(metaclass=abc.ABCMeta):
+    """Interface of refresh token service
+    """
+
+    @abc.abstractmethod
+    def issue(self, username: str) -> str:
+        """Issue a refresh token of a new family (at login)
+
+        Args:
+            username (str): username (unique)
+
+        Returns:
+            str: refresh token
+        """
+        pass
+
+    @abc.abstractmethod
+    def rotate(self, refresh_token: str) -> t.Tuple[str, t.Optional[str], t.Optional[str]]:
+        """Use a refresh token once, and issue the next token of its family
+
+        Args:
+            refresh_token (str): refresh token
+
+        Returns:
+            t.Tuple[str, t.Optional[str], t.Optional[str]]: (outcome, username, next refresh token).
+                outcome is "ok", "invalid" (unknown or expired) or "reused" (the family is revoked).
+        """
+        pass
+
+    @abc.abstractmethod
+    def revoke(self, refresh_token: str, username: str) -> bool:
+        """Revoke the family of a refresh token of the user (logout)
+
+        Returns:
+            bool: True if revoked
+        """
+        pass
+
+
+class RefreshTokenService(IRefreshTokenService):
+    """Implement of IRefreshTokenService
+
+    Refresh tokens are random strings, and only their SHA-256 hashes are stored.
+    Each token can be used once: rotation marks it used and issues the next token of the same family.
+    A used token presented again means that it was copied, so the whole family is revoked
+    and both the client and the copier have to log in again.
+    """
+
+    TOKEN_BYTES = 32
+
+    # expired tokens are deleted at most once per this seconds (at login)
+    PURGE_INTERVAL = 60.0
+
+    @inject
+    def __init__(self, logger: Logger, app_settings: AppSettings, repos: IRefreshTokenRepository) -> None:
+        self.__logger = logger
+        self.__repos = repos
+        self.__ttl = app_settings.refresh_token_ttl
+
+        self.__next_purge_at = 0.0
+        self.__purge_lock = threading.Lock()
+
+        return
+
+    def issue(self, username: str) -> str:
+        self.__purge_expired()
+
+        refresh_token = secrets.token_urlsafe(self.TOKEN_BYTES)
+        self.__repos.create(self.hash_token(refresh_token), uuid4().hex, username, int(time.time()) + self.__ttl)
+
+        return refresh_token
+
+    def rotate(self, refresh_token: str) -> t.Tuple[str, t.Optional[str], t.Optional[str]]:
+        next_token = secrets.token_urlsafe(self.TOKEN_BYTES)
+        now = int(time.time())
+        (outcome, username) = self.__repos.rotate(self.hash_token(refresh_token), self.hash_token(next_token), now, now + self.__ttl)
+
+        if outcome == ROTATE_REUSED:
+            self.__logger.error(
+                "refresh token is reused, and its family is revoked. username: '%s'", username,
+                extra={"auth_scheme": "refresh", "user": username, "auth_result": outcome})
+
+        return (outcome, username, next_token if outcome == ROTATE_OK else None)
+
+    def revoke(self, refresh_token: str, username: str) -> bool:
+        return self.__repos.revoke_family(self.hash_token(refresh_token), username)
+
+    @staticmethod
+    def hash_token(refresh_token: str) -> str:
+        # tokens are random enough, so a fast hash without salt is enough
+        return hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+
+    def __purge_expired(self) -> None:
+        if time.monotonic() < self.__next_purge_at or not self.__purge_lock.acquire(blocking=False):
+            return
+
+        try:
+            self.__next_purge_at = time.monotonic() + self.PURGE_INTERVAL
+            self.__repos.purge_expired(int(time.time()))
+        except Exception as e:
+            self.__logger.error("purge refresh tokens error : %s", e)
+        finally:
+            self.__purge_lock.release()
+
+        return
@@ -0,0 +1,124 @@
+import abc
+import os
+import threading
+import time
+from logging import Logger
+from injector import inject
+import typing as t
+
+from core.bloom import SharedBloomFilter
+from core.setting import AppSettings, resolve_path
+from repositories.revocation_repos import IRevocationRepository
+
+
+class IRevocationService(metaclass=abc.ABCMeta):
+    """Interface of JWT revocation service
+    """
+
+    @abc.abstractmethod
+    def revoke(self, jti: str, exp: int) -> None:
+        """Revoke a token until it expires
+
+        Args:
+            jti (str): token id
+            exp (int): unix timestamp at the token expires
+        """
+        pass
+
+    @abc.abstractmethod
+    def is_revoked(self, jti: t.Optional[str]) -> bool:
+        """Check if the token is revoked
+
+        Args:
+            jti (t.Optional[str]): token id (a token without id is never revoked)
+
+        Returns:
+            bool: True if revoked
+        """
+        pass
+
+
+class RevocationService(IRevocationService):
+    """Implement of IRevocationService
+
+    Revoked token ids are stored in the repository (until the token expires) and added to a Bloom filter
+    in a file shared by all worker processes, so a revocation is seen by every worker at once.
+    Most tokens are not revoked, and the filter answers them by one in-memory probe;
+    only a possibly revoked token (revoked or a false positive) is looked up in the repository.
+
+    The filter is rebuilt from the repository every `FLASK_REVOCATION_SYNC_INTERVAL` seconds (by one of the workers),
+    to drop expired entries and to add revocations written to the database by other tools.
+    """
+
+    @inject
+    def __init__(self, logger: Logger, app_settings: AppSettings, repos: IRevocationRepository) -> None:
+        self.__logger = logger
+        self.__repos = repos
+        self.__interval = app_settings.revocation_sync_interval
+
+        path = os.path.splitext(resolve_path(app_settings.revocation_db_path))[0] + ".bloom"
+        self.__filter = SharedBloomFilter(path, app_settings.revocation_filter_bits)
+        self.sync(force=True)
+
+        self.__thread_pid: t.Optional[int] = None
+        self.__thread_lock = threading.Lock()
+
+        return
+
+    def revoke(self, jti: str, exp: int) -> None:
+        # stored before it's added to the filter, so a concurrent rebuild doesn't lose it
+        self.__repos.revoke(jti, exp)
+        self.__filter.add(jti)
+        self.__logger.info("jwt token is revoked. jti: %s", jti, extra={"auth_scheme": "jwt", "jti": jti})
+        return
+
+    def is_revoked(self, jti: t.Optional[str]) -> bool:
+        if jti is None:
+            return False
+
+        self.__start()
+
+        if jti not in self.__filter:
+            return False
+
+        return self.__repos.is_revoked(jti, time.time())
+
+    def sync(self, force: bool = False) -> bool:
+        """Rebuild the filter from the repository
+
+        Args:
+            force (bool, optional): rebuild even if another process rebuilt it recently. Defaults to False.
+
+        Returns:
+            bool: True if rebuilt
+        """
+
+        def load_jtis() -> t.Iterator[str]:
+            now = time.time()
+            self.__repos.purge_expired(now)
+            return self.__repos.active_jtis(now)
+
+        # a little shorter than the interval, so the worker which rebuilt last time doesn't skip it by jitter
+        return self.__filter.rebuild(load_jtis, max_age=None if force else self.__interval * 0.9)
+
+    def __start(self) -> None:
+        if self.__thread_pid == os.getpid() or self.__interval <= 0:
+            return
+
+        # the syncer is started in each worker process, not inherited by fork
+        with self.__thread_lock:
+            if self.__thread_pid == os.getpid():
+                return
+
+            threading.Thread(target=self.__run_periodically, name="revocation-sync", daemon=True).start()
+            self.__thread_pid = os.getpid()
+
+        return
+
+    def __run_periodically(self) -> None:
+        while True:
+            time.sleep(self.__interval)
+            try:
+                self.sync()
+            except Exception as e:
+                self.__logger.error("revocation sync error : %s", e)
@@ -1,9 +1,17 @@
 import abc
 import base64
+import hashlib
+import hmac
+import os
 from logging import Logger
 import typing as t
 from injector import inject
 
+from core.cache import TtlCache
+from core.setting import AppSettings
+from models.user import User
+from repositories.user_repos import UserGenerations
+
 
 class ISimpleTokenService(metaclass=abc.ABCMeta):
     """Interface of simple token service
@@ -63,3 +71,71 @@ class SimpleTokenService(ISimpleTokenService):
             raise e
 
         return (username, password)
+
+
+class SimpleTokenCache(TtlCache):
+    """Cache of verified simple tokens
+
+    The token (raw credentials) is never stored. Entries are keyed by HMAC digest of the token with a random key per process.
+    Entries of a user are dropped when the user's credentials are changed, in any worker process or by the user CLI
+    (by UserGenerations).
+    """
+
+    @inject
+    def __init__(self, app_settings: AppSettings, generations: UserGenerations) -> None:
+        super().__init__(max_size=app_settings.simple_token_cache_size, ttl=app_settings.simple_token_cache_ttl)
+
+        self.__prototype = hmac.new(os.urandom(32), digestmod=hashlib.sha256)
+
+        # an entry made before the generation of its user (or all users) is changed is stale
+        self.__generations = generations
+
+        return
+
+    def get_user(self, token: str) -> t.Optional[User]:
+        """Get the user the token was verified for
+
+        Args:
+            token (str): value of Authorization header
+
+        Returns:
+            t.Optional[User]: verified user or None
+        """
+
+        key = self.digest(token)
+        entry = self.get(key)
+        if entry is None:
+            return None
+
+        (user, generation) = entry
+        if generation != self.__generations.get(user.username):
+            self.invalidate(key)
+            return None
+
+        return user
+
+    def generation(self, username: str) -> t.Tuple[int, int]:
+        """Current generation of the user. Read it before the user is looked up and verified
+        """
+        return self.__generations.get(username)
+
+    def put_user(self, token: str, user: User, generation: t.Tuple[int, int]) -> None:
+        """Store the user verified by the token
+
+        Args:
+            token (str): value of Authorization header
+            user (User): verified user
+            generation (t.Tuple[int, int]): generation of the user read before the verification,
+                so a change during the verification drops the entry
+        """
+
+        self.put(self.digest(token), (user, generation))
+        return
+
+    def digest(self, token: str) -> bytes:
+        """Keyed digest of the token
+        """
+
+        mac = self.__prototype.copy()
+        mac.update(token.encode("utf-8"))
+        return mac.digest()
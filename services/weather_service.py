@@ -1,7 +1,8 @@
 import abc
+import array
 import typing as t
 
-from models.weather import Weather
+from models.weather import Weather, WeatherBatch, WeatherGenerator
 
 
 class IWeatherService(metaclass=abc.ABCMeta):
@@ -29,6 +30,47 @@ class IWeatherService(metaclass=abc.ABCMeta):
         """
         pass
 
+    @abc.abstractmethod
+    def iter_weathers(self, count: int) -> t.Iterator[Weather]:
+        """Create weather datas one by one
+
+        Args:
+            count (int): count of created datas
+
+        Returns:
+            t.Iterator[Weather]: Weather model iterator (each data is created when it's taken)
+        """
+        pass
+
+    @abc.abstractmethod
+    def create_weather_batch(self, count: int, seed: t.Optional[int] = None) -> WeatherBatch:
+        """Create weather datas in columnar batch
+
+        Args:
+            count (int): count of created datas
+            seed (t.Optional[int], optional): seed of random values. Defaults to None (not reproducible).
+
+        Returns:
+            WeatherBatch: columnar weather datas
+        """
+        pass
+
+    @abc.abstractmethod
+    def iter_weather_batches(self, count: int, batch_size: int, seed: t.Optional[int] = None) -> t.Iterator[WeatherBatch]:
+        """Create weather datas in batches of batch_size (the last one may be smaller)
+
+        Each batch is created when it's taken, so memory doesn't grow with the count.
+
+        Args:
+            count (int): count of created datas
+            batch_size (int): count of datas per batch
+            seed (t.Optional[int], optional): seed of random values. Defaults to None (not reproducible).
+
+        Returns:
+            t.Iterator[WeatherBatch]: columnar weather datas iterator
+        """
+        pass
+
 
 class WeatherService(IWeatherService):
     """Implement IWeatherService interface
@@ -46,6 +88,18 @@ class WeatherService(IWeatherService):
 
         return weathers
 
+    def iter_weathers(self, count: int) -> t.Iterator[Weather]:
+        for _ in range(count):
+            yield Weather()
+
+    def create_weather_batch(self, count: int, seed: t.Optional[int] = None) -> WeatherBatch:
+        return WeatherGenerator(seed).generate(count)
+
+    def iter_weather_batches(self, count: int, batch_size: int, seed: t.Optional[int] = None) -> t.Iterator[WeatherBatch]:
+        generator = WeatherGenerator(seed)
+        for start in range(0, count, batch_size):
+            yield generator.generate(min(batch_size, count - start))
+
 
 class WeatherServiceSimple(IWeatherService):
     """another implement
@@ -62,3 +116,14 @@ class WeatherServiceSimple(IWeatherService):
             weathers.append(weather)
 
         return weathers
+
+    def iter_weathers(self, count: int) -> t.Iterator[Weather]:
+        for _ in range(count):
+            yield Weather(temperature=54.3, forecast="nice")
+
+    def create_weather_batch(self, count: int, seed: t.Optional[int] = None) -> WeatherBatch:
+        return WeatherBatch(array.array("d", [54.3]) * count, array.array("B", [0]) * count, forecasts=["nice"])
+
+    def iter_weather_batches(self, count: int, batch_size: int, seed: t.Optional[int] = None) -> t.Iterator[WeatherBatch]:
+        for start in range(0, count, batch_size):
+            yield self.create_weather_batch(min(batch_size, count - start))